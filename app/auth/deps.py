@@ -0,0 +1,11 @@
+"""Request dependencies that need the authenticated user (kept out of app.core)."""
+from fastapi import Depends
+
+from app.auth.jwt import get_current_user_id
+from app.core.database import read_session_scope
+
+
+async def get_read_db(user_id: int = Depends(get_current_user_id)):
+    """Dependency: a DB session for analytics reads, routed as read_session_scope for this user."""
+    async with read_session_scope(user_id) as session:
+        yield session
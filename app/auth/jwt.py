@@ -1,15 +1,33 @@
-"""JWT token creation and validation."""
+"""
+JWT token creation and validation.
+
+Verified tokens are remembered per worker in a bounded LRU keyed by the
+token's sha256 digest, mapping to (user_id, exp), so the 3-5 calls a page
+load makes with the same token verify it once. Entries never outlive the
+token's exp. With JWT_FAST_DECODE set and PyJWT installed, cache misses are
+verified with PyJWT instead of python-jose.
+"""
 from datetime import datetime, timedelta
+import hashlib
 import logging
+import time
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from app.core.config import settings
+from app.utils.redis_client import LocalCache
+
+try:  # optional fast path
+    import jwt as pyjwt
+except ImportError:
+    pyjwt = None
 
 logger = logging.getLogger(__name__)
 security = HTTPBearer(auto_error=False)
 
+_verified_tokens = LocalCache(settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TTL)
+
 
 def create_access_token(data: dict) -> str:
     """Create JWT access token."""
@@ -21,6 +39,12 @@ def create_access_token(data: dict) -> str:
 
 def decode_token(token: str) -> dict | None:
     """Decode and validate JWT. Returns payload or None."""
+    if pyjwt is not None and settings.JWT_FAST_DECODE:
+        try:
+            return pyjwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except pyjwt.PyJWTError as e:
+            logger.warning("JWT decode error: %s", e)
+            return None
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         return payload
@@ -42,6 +66,13 @@ async def get_current_user_id(
             detail="Not authenticated",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    use_cache = settings.AUTH_TOKEN_CACHE_SIZE > 0
+    if use_cache:
+        digest = hashlib.sha256(credentials.credentials.encode("utf-8")).hexdigest()
+        cached = _verified_tokens.get(digest)
+        if cached is not None and cached[1] > time.time():
+            return cached[0]
+
     payload = decode_token(credentials.credentials)
     if not payload:
         raise HTTPException(
@@ -53,6 +84,13 @@ async def get_current_user_id(
     if user_id is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
     try:
-        return int(user_id)
+        user_id = int(user_id)
     except (TypeError, ValueError):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid user id")
+
+    exp = payload.get("exp")
+    if use_cache and isinstance(exp, (int, float)):
+        remaining = exp - time.time()
+        if remaining > 0:
+            _verified_tokens.set(digest, (user_id, exp), ttl_seconds=remaining)
+    return user_id
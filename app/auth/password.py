@@ -1,12 +1,79 @@
-"""Password hashing with bcrypt."""
+"""
+Password hashing with bcrypt.
+
+bcrypt is deliberately slow (~100-300 ms per call at the default cost), so
+request handlers use the awaitable hash_password_async / verify_password_async,
+which run on a small bounded thread pool: bcrypt releases the GIL while
+hashing, so threads give real parallelism without process-pool pickling, and
+the pool size caps how many CPU cores a login burst can take from the rest of
+the worker. The sync functions remain for scripts and Celery tasks.
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
 import bcrypt
 
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_executor: ThreadPoolExecutor | None = None
+
 
 def hash_password(password: str) -> str:
-    """Hash password with bcrypt. Returns string suitable for DB."""
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    """Hash password with bcrypt at the configured cost. Returns string suitable for DB."""
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
 
 
 def verify_password(plain: str, hashed: str) -> bool:
     """Verify plain password against hashed. Returns True if match."""
-    return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
+    try:
+        return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
+    except ValueError:  # malformed hash in the DB
+        logger.warning("Stored password hash is not a valid bcrypt hash")
+        return False
+
+
+def needs_rehash(hashed: str) -> bool:
+    """True if the hash was made with a different cost than BCRYPT_ROUNDS."""
+    try:
+        return int(hashed.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+def _get_executor() -> ThreadPoolExecutor | None:
+    """Shared hashing pool; None when PASSWORD_HASH_WORKERS is 0 (hash inline)."""
+    global _executor
+    if _executor is None and settings.PASSWORD_HASH_WORKERS > 0:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+        )
+    return _executor
+
+
+async def _run(fn, *args):
+    executor = _get_executor()
+    if executor is None:
+        return fn(*args)
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password on the hashing pool, without blocking the event loop."""
+    return await _run(hash_password, password)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    """verify_password on the hashing pool, without blocking the event loop."""
+    return await _run(verify_password, plain, hashed)
+
+
+def shutdown_password_pool() -> None:
+    """Stop the hashing pool (app shutdown); it is recreated lazily if used again."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -13,6 +13,16 @@ if _env_file.exists():
     load_dotenv(_env_file)
 
 
+def _async_db_url(url: str | None) -> str | None:
+    """Fix for SQLAlchemy asyncpg: it needs postgresql+asyncpg://"""
+    if url:
+        if url.startswith("postgres://"):
+            url = url.replace("postgres://", "postgresql+asyncpg://", 1)
+        elif url.startswith("postgresql://"):
+            url = url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+
 class Settings:
     """App settings loaded from env."""
 
@@ -21,25 +31,67 @@ class Settings:
     DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
 
     # Database
-    _db_url = os.getenv("DATABASE_URL")
-    if _db_url:
-        # Fix for SQLAlchemy asyncpg: it needs postgresql+asyncpg://
-        if _db_url.startswith("postgres://"):
-            _db_url = _db_url.replace("postgres://", "postgresql+asyncpg://", 1)
-        elif _db_url.startswith("postgresql://"):
-            _db_url = _db_url.replace("postgresql://", "postgresql+asyncpg://", 1)
-    
+    _db_url = _async_db_url(os.getenv("DATABASE_URL"))
+
     DATABASE_URL: str = _db_url or (
         "sqlite+aiosqlite:///./creator_analytics.db" if not os.getenv("VERCEL") else "sqlite+aiosqlite:////tmp/creator_analytics.db"
     )
 
+    # Read replicas for analytics reads (comma-separated URLs; empty = primary only)
+    _replica_env = os.getenv("DATABASE_REPLICA_URLS", "")
+    DATABASE_REPLICA_URLS: List[str] = [_async_db_url(u.strip()) for u in _replica_env.split(",") if u.strip()]
+    REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))  # lagging replicas are skipped
+    REPLICA_LAG_CHECK_SECONDS: float = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "5"))
+    # After a user's own write, their reads stay on the primary this long (read-your-writes)
+    REPLICA_STICKY_SECONDS: float = float(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+
+    # Connection pool (PostgreSQL; SQLite keeps SQLAlchemy's defaults). Sizes are per
+    # process: keep workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) under the server's
+    # max_connections (or PgBouncer's client limit). /health/db-pool shows usage.
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a connection
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds; -1 = never
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))  # asyncpg prepared statements
+    # Behind PgBouncer in transaction mode: no server-side statement cache, unique statement names
+    DB_PGBOUNCER: bool = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+    # Celery/CLI sync engine: a prefork child runs one task at a time
+    WORKER_DB_POOL_SIZE: int = int(os.getenv("WORKER_DB_POOL_SIZE", "2"))
+
     # Redis (optional when running without Docker; use localhost if Redis is local)
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    # In-process cache tier in front of Redis (per worker)
+    LOCAL_CACHE_MAX_ENTRIES: int = int(os.getenv("LOCAL_CACHE_MAX_ENTRIES", "2048"))
+    LOCAL_CACHE_TTL_SECONDS: float = float(os.getenv("LOCAL_CACHE_TTL_SECONDS", "30"))
+    # Analytics responses are invalidated on commit, so the TTL can be long
+    ANALYTICS_CACHE_TTL: int = int(os.getenv("ANALYTICS_CACHE_TTL", "3600"))
 
     # JWT
     SECRET_KEY: str = os.getenv("SECRET_KEY", "change-me-in-production-secret-key")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
+    # Verified tokens cached per worker (sha256 digest -> user id, honouring exp); 0 disables
+    AUTH_TOKEN_CACHE_SIZE: int = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+    AUTH_TOKEN_CACHE_TTL: float = float(os.getenv("AUTH_TOKEN_CACHE_TTL", "300"))
+    # Verify with PyJWT instead of python-jose when it is installed (see benchmarks/bench_auth.py)
+    JWT_FAST_DECODE: bool = os.getenv("JWT_FAST_DECODE", "false").lower() == "true"
+
+    # Password hashing: bcrypt cost (log2 rounds) and the thread pool it runs on.
+    # Changing the cost rehashes each user's password on their next login.
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))  # 0 = inline
+
+    # Prometheus /metrics (request, cache, SQL, pool and Celery task metrics)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    CELERY_METRICS_PORT: int = int(os.getenv("CELERY_METRICS_PORT", "0"))  # 0 = don't serve from workers
+
+    # SQL profiler / N+1 detector (development or canary use; adds per-statement bookkeeping)
+    SQL_PROFILE_ENABLED: bool = os.getenv("SQL_PROFILE_ENABLED", "false").lower() == "true"
+    SQL_PROFILE_MAX_QUERIES: int = int(os.getenv("SQL_PROFILE_MAX_QUERIES", "10"))  # per request
+    SQL_PROFILE_MAX_DB_MS: float = float(os.getenv("SQL_PROFILE_MAX_DB_MS", "100"))  # total per request
+    SQL_PROFILE_SLOW_QUERY_MS: float = float(os.getenv("SQL_PROFILE_SLOW_QUERY_MS", "50"))  # single statement
+    SQL_PROFILE_DUPLICATE_THRESHOLD: int = int(os.getenv("SQL_PROFILE_DUPLICATE_THRESHOLD", "3"))  # same SQL n times
 
     # CORS
     # If CORS_ORIGINS is set, split it. Strip whitespace and trailing slashes to strict match Origin header.
@@ -49,5 +101,32 @@ class Settings:
     # Celery (use localhost when running without Docker)
     CELERY_BROKER_URL: str = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/1")
 
+    # Daily sync
+    SYNC_PROVIDER: str = os.getenv("SYNC_PROVIDER", "mock")
+    SYNC_ACCOUNT_BATCH: int = int(os.getenv("SYNC_ACCOUNT_BATCH", "200"))  # accounts per Celery subtask
+    SYNC_VIDEO_BATCH: int = int(os.getenv("SYNC_VIDEO_BATCH", "500"))  # videos per provider call / flush
+    SYNC_MIN_INTERVAL_HOURS: float = float(os.getenv("SYNC_MIN_INTERVAL_HOURS", "20"))
+
+    # Weekly AI insights
+    AI_INSIGHTS_CHUNK: int = int(os.getenv("AI_INSIGHTS_CHUNK", "1000"))  # users per insert/commit
+    AI_INSIGHTS_SHARDS: int = int(os.getenv("AI_INSIGHTS_SHARDS", "1"))  # parallel id-range subtasks
+
+    # Snapshot compaction: daily rows -> weekly/monthly rollups, then pruned
+    SNAPSHOT_DAILY_RETENTION_DAYS: int = int(os.getenv("SNAPSHOT_DAILY_RETENTION_DAYS", "90"))
+    SNAPSHOT_WEEKLY_RETENTION_DAYS: int = int(os.getenv("SNAPSHOT_WEEKLY_RETENTION_DAYS", "730"))  # monthly rows are kept
+    SNAPSHOT_COMPACTION_BATCH: int = int(os.getenv("SNAPSHOT_COMPACTION_BATCH", "200"))  # accounts per subtask
+    GROWTH_MAX_PERIOD_DAYS: int = int(os.getenv("GROWTH_MAX_PERIOD_DAYS", "3650"))
+    # PostgreSQL only, for newly created tables: daily rows in month partitions, dropped whole
+    SNAPSHOT_PARTITIONING: bool = os.getenv("SNAPSHOT_PARTITIONING", "true").lower() == "true"
+    SNAPSHOT_PARTITION_MONTHS_AHEAD: int = int(os.getenv("SNAPSHOT_PARTITION_MONTHS_AHEAD", "3"))
+
+    # Peer benchmarking (percentile sketches per metric and subscriber cohort)
+    PEER_BENCHMARK_BATCH: int = int(os.getenv("PEER_BENCHMARK_BATCH", "500"))  # accounts per transaction
+    PEER_BENCHMARK_CACHE_TTL: int = int(os.getenv("PEER_BENCHMARK_CACHE_TTL", "3600"))  # peers move, own data doesn't
+
+    # Bulk export (/analytics/export and the export Celery job)
+    EXPORT_CHUNK_ROWS: int = int(os.getenv("EXPORT_CHUNK_ROWS", "5000"))  # rows per cursor fetch / encoded chunk
+    EXPORT_DIR: str = os.getenv("EXPORT_DIR", "./exports")  # where the Celery job writes files
+
 
 settings = Settings()
@@ -1,16 +1,130 @@
 """
 Async database session and engine using SQLAlchemy.
+
+Writes and most reads use the primary engine. Analytics reads can go to read
+replicas (DATABASE_REPLICA_URLS) through read_session_scope (routes use
+app.auth.deps.get_read_db): the least busy healthy replica is picked
+(round-robin among equals), replicas lagging more than REPLICA_MAX_LAG_SECONDS
+are skipped, and a user whose own write committed within REPLICA_STICKY_SECONDS
+reads from the primary.
 """
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import exc, text
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
 
 from app.core.config import settings
+from app.core.metrics import instrument_engine, register_pool
+from app.utils.redis_client import wrote_recently
+
+logger = logging.getLogger(__name__)
+
+# Set while a checkout is being timed (QueuePool._do_get may call itself)
+_in_checkout: ContextVar[bool] = ContextVar("in_checkout", default=False)
+
+
+class _TimedCheckoutMixin:
+    """Records how long checkouts wait for a connection, for pool_status()."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        if _in_checkout.get():
+            return super()._do_get()
+        token = _in_checkout.set(True)
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            _in_checkout.reset(token)
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+                self.timeouts += timed_out
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    """QueuePool with checkout wait statistics (sync engines)."""
+
+
+class TimedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool with checkout wait statistics (async engines)."""
+
+
+def engine_options(url: str, async_engine: bool = True, pool_size: int | None = None) -> dict:
+    """create_engine / create_async_engine kwargs from the DB_* settings."""
+    if url.startswith("sqlite"):
+        return {}  # local dev: SQLAlchemy's default SQLite pooling
+    options = {
+        "poolclass": TimedAsyncQueuePool if async_engine else TimedQueuePool,
+        "pool_size": pool_size or settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if "+asyncpg" in url:
+        # PgBouncer (transaction mode) hands each transaction a different server
+        # connection, so prepared statements can't be cached or reuse names.
+        cache_size = 0 if settings.DB_PGBOUNCER else settings.DB_STATEMENT_CACHE_SIZE
+        connect_args = {"prepared_statement_cache_size": cache_size, "statement_cache_size": cache_size}
+        if settings.DB_PGBOUNCER:
+            connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+        options["connect_args"] = connect_args
+    return options
+
+
+def pool_status(pool: Pool) -> dict:
+    """Point-in-time pool gauges: size, checked out, overflow, checkout waits."""
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+        )
+    if isinstance(pool, _TimedCheckoutMixin):
+        status.update(
+            checkouts=pool.checkouts,
+            wait_seconds_total=round(pool.wait_seconds_total, 6),
+            wait_seconds_avg=round(pool.wait_seconds_total / pool.checkouts, 6) if pool.checkouts else 0.0,
+            wait_seconds_max=round(pool.wait_seconds_max, 6),
+            timeouts=pool.timeouts,
+        )
+    return status
+
 
 # Async engine for PostgreSQL
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
+    **engine_options(settings.DATABASE_URL),
 )
+instrument_engine(engine.sync_engine, "primary")
+register_pool("primary", lambda: pool_status(engine.sync_engine.pool))
 
 # Session factory
 async_session_maker = async_sessionmaker(
@@ -27,14 +141,135 @@ class Base(DeclarativeBase):
     pass
 
 
-async def get_db():
-    """Dependency: yield a DB session."""
+@asynccontextmanager
+async def session_scope():
+    """A session that commits on success and rolls back on error (for work outside get_db)."""
     async with async_session_maker() as session:
         try:
             yield session
             await session.commit()
+            # Post-commit work queued by session hooks (e.g. cache invalidation)
+            for task in session.info.pop("after_commit_tasks", []):
+                await task
         except Exception:
             await session.rollback()
             raise
         finally:
             await session.close()
+
+
+async def get_db():
+    """Dependency: yield a DB session."""
+    async with session_scope() as session:
+        yield session
+
+
+# --- Read replicas ------------------------------------------------------------
+
+# Seconds since the last replayed transaction; 0 when the replica has replayed all it received
+_REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class Replica:
+    """One read replica: its engine plus the load and lag used to pick it."""
+
+    def __init__(self, url: str):
+        self.engine = create_async_engine(url, echo=settings.DEBUG, **engine_options(url))
+        self.sessionmaker = async_sessionmaker(
+            self.engine, class_=AsyncSession, expire_on_commit=False, autoflush=False,
+        )
+        self.in_flight = 0
+        self.lag_seconds: float | None = None  # None until the first successful check
+        self.healthy = False
+
+    @property
+    def usable(self) -> bool:
+        return self.healthy and self.lag_seconds is not None and self.lag_seconds <= settings.REPLICA_MAX_LAG_SECONDS
+
+    async def check(self) -> None:
+        """Measure replication lag; an unreachable replica is marked unhealthy."""
+        try:
+            async with self.engine.connect() as conn:
+                if conn.dialect.name == "postgresql":
+                    self.lag_seconds = float((await conn.execute(_REPLICA_LAG_SQL)).scalar() or 0)
+                else:
+                    await conn.execute(text("SELECT 1"))
+                    self.lag_seconds = 0.0
+            self.healthy = True
+        except Exception as e:
+            if self.healthy:
+                logger.warning("Replica %s unavailable: %s", self.engine.url.render_as_string(), e)
+            self.healthy = False
+
+
+replicas = [Replica(url) for url in settings.DATABASE_REPLICA_URLS]
+for _i, _replica in enumerate(replicas):
+    instrument_engine(_replica.engine.sync_engine, f"replica{_i}")
+    register_pool(f"replica{_i}", lambda r=_replica: pool_status(r.engine.sync_engine.pool))
+_next_replica = 0
+_replica_monitor: asyncio.Task | None = None
+
+
+def choose_replica() -> Replica | None:
+    """Least in-flight usable replica, rotating the start so ties spread round-robin."""
+    global _next_replica
+    usable = [r for r in replicas if r.usable]
+    if not usable:
+        return None
+    _next_replica = (_next_replica + 1) % len(usable)
+    rotated = usable[_next_replica:] + usable[:_next_replica]
+    return min(rotated, key=lambda r: r.in_flight)
+
+
+async def _monitor_replicas() -> None:
+    while True:
+        await asyncio.gather(*(r.check() for r in replicas))
+        await asyncio.sleep(settings.REPLICA_LAG_CHECK_SECONDS)
+
+
+def start_replica_monitor() -> None:
+    """Start measuring replica lag in the background (no-op without replicas)."""
+    global _replica_monitor
+    if replicas and (_replica_monitor is None or _replica_monitor.done()):
+        _replica_monitor = asyncio.get_running_loop().create_task(_monitor_replicas())
+
+
+async def stop_replica_monitor() -> None:
+    global _replica_monitor
+    if _replica_monitor is not None:
+        _replica_monitor.cancel()
+        try:
+            await _replica_monitor
+        except asyncio.CancelledError:
+            pass
+        _replica_monitor = None
+
+
+@asynccontextmanager
+async def read_session_scope(user_id: int | None = None):
+    """Session for read-only work: a replica when one is usable, else the primary."""
+    replica = choose_replica()
+    if replica is None or (user_id is not None and await wrote_recently(user_id)):
+        async with session_scope() as session:
+            yield session
+        return
+    replica.in_flight += 1
+    try:
+        async with replica.sessionmaker() as session:
+            session.info["replica"] = True
+            try:
+                yield session
+            finally:
+                await session.rollback()  # nothing to commit on a replica
+    finally:
+        replica.in_flight -= 1
+
+
+def dialect_insert(bind, table):
+    """INSERT construct with ON CONFLICT (upsert) support for the bind's dialect."""
+    if bind.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
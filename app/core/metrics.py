@@ -0,0 +1,195 @@
+"""
+Prometheus metrics.
+
+- http_request_duration_seconds: per route template (/analytics/videos, not
+  the raw path), method and status, recorded by a plain ASGI middleware
+- cache_requests_total: per key prefix ("analytics:overview") and result
+- db_query_duration_seconds: per engine and statement verb, from SQLAlchemy
+  cursor events
+- db_pool_*: pool gauges, read from the pools at scrape time
+- celery_task_duration_seconds: per task and final state
+
+With several worker processes (uvicorn --workers, Celery prefork) set
+PROMETHEUS_MULTIPROC_DIR so /metrics aggregates every process on the host.
+"""
+import os
+import time
+from typing import Callable
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, start_http_server,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+
+from app.core.config import settings
+
+# Request latencies span cached hits (sub-ms) to cold dashboards (seconds)
+_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+_VERBS = frozenset(("select", "insert", "update", "delete", "with"))
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route", "status"), buckets=_LATENCY_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by key prefix and result (local_hit, hit, miss, error)",
+    ("prefix", "result"),
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time",
+    ("engine", "verb"), buckets=_QUERY_BUCKETS,
+)
+CELERY_TASK_DURATION = Histogram(
+    "celery_task_duration_seconds", "Celery task run time by final state",
+    ("task", "state"), buckets=_LATENCY_BUCKETS + (30.0, 60.0, 300.0, 900.0, 3600.0),
+)
+
+
+# --- HTTP ---------------------------------------------------------------------
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request under its route template."""
+
+    def __init__(self, app):
+        self.app = app
+        self._children: dict[tuple, Histogram] = {}  # skip labels() lookups on the hot path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners can't explode cardinality
+            path = route.path if route is not None else "unmatched"
+            key = (scope["method"], path, status)
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = HTTP_REQUEST_DURATION.labels(*key)
+            child.observe(time.perf_counter() - started)
+
+
+# --- Cache --------------------------------------------------------------------
+
+def cache_prefix(key: str) -> str:
+    """First two key segments: analytics:overview:1:30 -> analytics:overview."""
+    parts = key.split(":", 2)
+    return ":".join(parts[:2])
+
+
+def record_cache(key: str, result: str) -> None:
+    if settings.METRICS_ENABLED:
+        CACHE_REQUESTS.labels(cache_prefix(key), result).inc()
+
+
+# --- SQL ----------------------------------------------------------------------
+
+def instrument_engine(sync_engine, name: str) -> None:
+    """Time every statement on the engine (pass engine.sync_engine for async engines)."""
+    if not settings.METRICS_ENABLED:
+        return
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    # Labelled children resolved once per statement prefix instead of labels() per query
+    children: dict[str, Histogram] = {}
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is None:
+            return
+        prefix = statement[:8]
+        child = children.get(prefix)
+        if child is None:
+            verb = (statement.lstrip()[:7].split(None, 1) or ("",))[0].lower()
+            child = DB_QUERY_DURATION.labels(name, verb if verb in _VERBS else "other")
+            if len(children) < 256:
+                children[prefix] = child
+        child.observe(time.perf_counter() - started)
+
+
+# --- Pools --------------------------------------------------------------------
+
+_pools: dict[str, Callable[[], dict]] = {}
+
+
+def register_pool(name: str, status: Callable[[], dict]) -> None:
+    """Expose a pool's status dict (app.core.database.pool_status) as db_pool_* gauges."""
+    _pools[name] = status
+
+
+class _PoolCollector:
+    _GAUGES = ("size", "checked_in", "checked_out", "overflow")
+    _COUNTERS = ("checkouts", "wait_seconds_total", "timeouts")
+
+    def collect(self):
+        gauges = {k: GaugeMetricFamily(f"db_pool_{k}", f"Connection pool {k}", labels=["engine"]) for k in self._GAUGES}
+        counters = {
+            k: CounterMetricFamily(f"db_pool_{k.removesuffix('_total')}", f"Connection pool {k}", labels=["engine"])
+            for k in self._COUNTERS
+        }
+        for name, status in _pools.items():
+            values = status()
+            for k, family in (*gauges.items(), *counters.items()):
+                if k in values:
+                    family.add_metric([name], values[k])
+        yield from gauges.values()
+        yield from counters.values()
+
+
+_pool_collector = _PoolCollector()
+REGISTRY.register(_pool_collector)
+
+
+# --- Celery -------------------------------------------------------------------
+
+_task_started: dict[str, float] = {}
+
+
+def task_started(task_id: str) -> None:
+    _task_started[task_id] = time.perf_counter()
+
+
+def task_finished(task_id: str, task_name: str, state: str | None) -> None:
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        CELERY_TASK_DURATION.labels(task_name, state or "UNKNOWN").observe(time.perf_counter() - started)
+
+
+# --- Exposition ---------------------------------------------------------------
+
+def _registry() -> CollectorRegistry:
+    """This process's registry, or one aggregating every process in multiprocess mode."""
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    from prometheus_client import multiprocess
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(_pool_collector)
+    return registry
+
+
+def render() -> tuple[bytes, str]:
+    """Body and content type for /metrics."""
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+
+def serve(port: int) -> None:
+    """Serve /metrics from a background thread (processes without an HTTP app, e.g. Celery)."""
+    start_http_server(port, registry=_registry())
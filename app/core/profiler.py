@@ -0,0 +1,163 @@
+"""
+Opt-in SQL profiler and N+1 detector (SQL_PROFILE_ENABLED).
+
+Every statement a request executes, on any engine, is recorded against that
+request through a ContextVar (concurrent section tasks inherit it). When the
+response starts, the request is checked against the thresholds: too many
+statements, too much total DB time, one slow statement, or the same
+statement repeated (the N+1 signature). Flagged requests are logged with the
+offending statements. A per-route summary is kept in process and served at
+/debug/sql-profile. Responses carry a Server-Timing header with the DB time.
+"""
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RequestProfile:
+    """Statements executed while handling one request."""
+
+    __slots__ = ("statements", "db_seconds", "slowest", "slowest_seconds")
+
+    def __init__(self):
+        self.statements: Counter[str] = Counter()
+        self.db_seconds = 0.0
+        self.slowest: str | None = None
+        self.slowest_seconds = 0.0
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.statements[statement] += 1
+        self.db_seconds += seconds
+        if seconds > self.slowest_seconds:
+            self.slowest, self.slowest_seconds = statement, seconds
+
+    @property
+    def count(self) -> int:
+        return sum(self.statements.values())
+
+    def duplicates(self) -> dict[str, int]:
+        return {s: n for s, n in self.statements.items() if n >= settings.SQL_PROFILE_DUPLICATE_THRESHOLD}
+
+    def problems(self) -> list[str]:
+        """Threshold violations, empty when the request looks fine."""
+        found = []
+        if self.count > settings.SQL_PROFILE_MAX_QUERIES:
+            found.append(f"{self.count} statements > {settings.SQL_PROFILE_MAX_QUERIES}")
+        if self.db_seconds * 1000 > settings.SQL_PROFILE_MAX_DB_MS:
+            found.append(f"{self.db_seconds * 1000:.1f} ms DB > {settings.SQL_PROFILE_MAX_DB_MS:g} ms")
+        if self.slowest_seconds * 1000 > settings.SQL_PROFILE_SLOW_QUERY_MS:
+            found.append(f"slow statement {self.slowest_seconds * 1000:.1f} ms")
+        if self.duplicates():
+            found.append(f"{len(self.duplicates())} repeated statement(s), possible N+1")
+        return found
+
+
+class RouteSummary:
+    """Aggregate over all profiled requests of one route."""
+
+    __slots__ = ("requests", "statements", "db_seconds", "max_statements", "flagged", "repeated")
+
+    def __init__(self):
+        self.requests = 0
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.max_statements = 0
+        self.flagged = 0
+        self.repeated: Counter[str] = Counter()
+
+    def add(self, profile: RequestProfile, flagged: bool) -> None:
+        self.requests += 1
+        self.statements += profile.count
+        self.db_seconds += profile.db_seconds
+        self.max_statements = max(self.max_statements, profile.count)
+        self.flagged += flagged
+        self.repeated.update(profile.duplicates())
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "avg_statements": round(self.statements / self.requests, 2),
+            "max_statements": self.max_statements,
+            "avg_db_ms": round(self.db_seconds * 1000 / self.requests, 3),
+            "total_db_ms": round(self.db_seconds * 1000, 3),
+            "flagged": self.flagged,
+            "top_repeated": [{"statement": s, "count": n} for s, n in self.repeated.most_common(5)],
+        }
+
+
+_current: ContextVar[RequestProfile | None] = ContextVar("sql_profile", default=None)
+_routes: dict[str, RouteSummary] = {}
+_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    started = getattr(context, "_profile_started", None)
+    if profile is not None and started is not None:
+        profile.record(statement, time.perf_counter() - started)
+
+
+def install() -> None:
+    """Listen on every Engine (primary, replicas, workers). Idempotent."""
+    global _installed
+    if not _installed:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _installed = True
+
+
+def route_summary() -> dict:
+    """Per-route aggregates, most total DB time first."""
+    ordered = sorted(_routes.items(), key=lambda item: item[1].db_seconds, reverse=True)
+    return {route: summary.as_dict() for route, summary in ordered}
+
+
+def _finish(method: str, route: str, profile: RequestProfile) -> None:
+    problems = profile.problems()
+    _routes.setdefault(f"{method} {route}", RouteSummary()).add(profile, bool(problems))
+    if problems:
+        logger.warning(
+            "SQL profile %s %s: %d statements, %.1f ms DB (%s); repeated: %s; slowest: %s",
+            method, route, profile.count, profile.db_seconds * 1000, "; ".join(problems),
+            {s[:200]: n for s, n in profile.duplicates().items()} or "none",
+            (profile.slowest or "")[:200],
+        )
+
+
+class SqlProfilerMiddleware:
+    """ASGI middleware opening a RequestProfile per HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        profile = RequestProfile()
+        token = _current.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                timing = f'db;dur={profile.db_seconds * 1000:.2f};desc="{profile.count} statements"'
+                message["headers"] = [*message.get("headers", []), (b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            _finish(scope["method"], route.path if route is not None else "unmatched", profile)
@@ -5,13 +5,18 @@ Entry point and app configuration.
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.core import metrics, profiler
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core.database import engine, Base, pool_status, replicas, start_replica_monitor, stop_replica_monitor
 from app import models  # noqa: F401 - register models with Base
+from app.services import rollups, invalidation, accounts  # noqa: F401 - register session hooks
+from app.services.schema_upgrade import upgrade_schema
 from app.routers import auth, user, youtube, analytics, ai_suggestions
+from app.auth.password import shutdown_password_pool
+from app.utils.redis_client import start_invalidation_listener, stop_invalidation_listener
 
 # Configure logging
 logging.basicConfig(
@@ -23,11 +28,13 @@ logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Create DB tables and seed dummy data if empty."""
+    """Create DB tables, seed dummy data if empty, and listen for cache invalidations."""
     try:
         logger.info("Creating database tables...")
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            # Tables from older versions: constraints and indexes create_all doesn't add
+            await conn.run_sync(upgrade_schema)
         logger.info("Database ready.")
     except Exception as e:
         logger.error("Database initialization failed: %s", e)
@@ -37,8 +44,13 @@ async def lifespan(app: FastAPI):
         await seed_if_empty()
     except Exception as e:
         logger.warning("Seed skipped or failed: %s", e)
+    start_invalidation_listener()
+    start_replica_monitor()
     yield
     logger.info("Shutting down...")
+    await stop_invalidation_listener()
+    await stop_replica_monitor()
+    shutdown_password_pool()
 
 
 app = FastAPI(
@@ -57,6 +69,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.SQL_PROFILE_ENABLED:
+    profiler.install()
+    app.add_middleware(profiler.SqlProfilerMiddleware)
+
+# Outermost, so latency includes the other middleware
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # Routers
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(user.router, prefix="/user", tags=["user"])
@@ -71,6 +91,33 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/health/db-pool")
+async def health_db_pool():
+    """Connection pool gauges for this worker (size pools from checked_out / wait time)."""
+    status = pool_status(engine.sync_engine.pool)
+    if replicas:
+        status["replicas"] = [
+            {**pool_status(r.engine.sync_engine.pool), "in_flight": r.in_flight,
+             "lag_seconds": r.lag_seconds, "usable": r.usable}
+            for r in replicas
+        ]
+    return status
+
+
+if settings.SQL_PROFILE_ENABLED:
+    @app.get("/debug/sql-profile", include_in_schema=False)
+    async def sql_profile():
+        """Per-route SQL statement counts and DB time recorded by the profiler (this worker)."""
+        return profiler.route_summary()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint."""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/")
 async def root():
     """Root endpoint to check API status."""
@@ -4,5 +4,22 @@ from app.models.connected_account import ConnectedAccount
 from app.models.video import Video
 from app.models.analytics_snapshot import AnalyticsSnapshot
 from app.models.ai_insight import AIInsight
+from app.models.channel_rollup import ChannelRollup
+from app.models.video_daily_stat import VideoDailyStat
+from app.models.account_sync_state import AccountSyncState
+from app.models.peer_benchmark import PeerSketch, PeerMetricValue
+from app.models.task_checkpoint import TaskCheckpoint
 
-__all__ = ["User", "ConnectedAccount", "Video", "AnalyticsSnapshot", "AIInsight"]
+__all__ = [
+    "User",
+    "ConnectedAccount",
+    "Video",
+    "AnalyticsSnapshot",
+    "AIInsight",
+    "ChannelRollup",
+    "VideoDailyStat",
+    "AccountSyncState",
+    "PeerSketch",
+    "PeerMetricValue",
+    "TaskCheckpoint",
+]
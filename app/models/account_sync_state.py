@@ -0,0 +1,17 @@
+"""Per-account sync bookkeeping (high-water marks)."""
+from sqlalchemy import DateTime, ForeignKey, Integer, Column, String
+
+from app.core.database import Base
+
+
+class AccountSyncState(Base):
+    """Where the last successful sync of a connected account left off."""
+
+    __tablename__ = "account_sync_states"
+
+    connected_account_id = Column(
+        Integer, ForeignKey("connected_accounts.id", ondelete="CASCADE"), primary_key=True
+    )
+    last_synced_at = Column(DateTime, nullable=True, index=True)  # provider changes before this are applied
+    last_error = Column(String(512), nullable=True)
+    videos_updated = Column(Integer, default=0)  # rows touched by the last run
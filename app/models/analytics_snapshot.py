@@ -1,20 +1,41 @@
-"""Analytics snapshot (daily/weekly aggregates)."""
+"""Analytics snapshot (daily aggregates, plus weekly/monthly rollups from compaction)."""
 from datetime import datetime
-from sqlalchemy import String, DateTime, ForeignKey, Integer, BigInteger, Column
+from sqlalchemy import (
+    String, DateTime, ForeignKey, Integer, BigInteger, Column, Index, PrimaryKeyConstraint, UniqueConstraint, event,
+)
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import relationship
 
+from app.core.config import settings
 from app.core.database import Base
+from app.services.partitions import create_partition_tree
+
+# PostgreSQL: LIST by period_type, daily rows by month (app.services.partitions)
+_PARTITIONED = {"postgresql_partition_by": "LIST (period_type)"} if settings.SNAPSHOT_PARTITIONING else {}
 
 
 class AnalyticsSnapshot(Base):
-    """Daily or weekly snapshot of channel analytics."""
+    """Daily snapshot of channel analytics, or the closing values of a week/month."""
 
     __tablename__ = "analytics_snapshots"
+    __table_args__ = (
+        # Upsert key for bulk ingestion
+        UniqueConstraint(
+            "connected_account_id", "snapshot_date", "period_type", name="uq_snapshots_account_date_period"
+        ),
+        # Growth reads: one account, one granularity, a date range; the values are in
+        # the index on PostgreSQL (INCLUDE), so those reads are index-only
+        Index(
+            "ix_snapshots_account_period_date", "connected_account_id", "period_type", "snapshot_date",
+            postgresql_include=["total_views", "total_likes", "total_comments", "subscriber_count"],
+        ),
+        _PARTITIONED,
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     connected_account_id = Column(Integer, ForeignKey("connected_accounts.id"), nullable=False)
-    snapshot_date = Column(DateTime, nullable=False)  # date of snapshot
-    period_type = Column(String(20), nullable=False)  # "daily" or "weekly"
+    snapshot_date = Column(DateTime, nullable=False)  # date of snapshot; period start for rollups
+    period_type = Column(String(20), nullable=False)  # "daily", "weekly" or "monthly"
     total_views = Column(BigInteger, default=0)
     total_likes = Column(BigInteger, default=0)
     total_comments = Column(BigInteger, default=0)
@@ -22,3 +43,17 @@ class AnalyticsSnapshot(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     connected_account = relationship("ConnectedAccount", back_populates="snapshots")
+
+
+@compiles(PrimaryKeyConstraint, "postgresql")
+def _partitioned_primary_key(constraint, compiler, **kw):
+    # A partitioned table's keys must contain the partition columns; id stays unique via its sequence
+    if _PARTITIONED and constraint.table is AnalyticsSnapshot.__table__:
+        return "PRIMARY KEY (id, period_type, snapshot_date)"
+    return compiler.visit_primary_key_constraint(constraint, **kw)
+
+
+@event.listens_for(AnalyticsSnapshot.__table__, "after_create")
+def _create_partitions(table, connection, **kw):
+    if _PARTITIONED and connection.dialect.name == "postgresql":
+        create_partition_tree(connection)
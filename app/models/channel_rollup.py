@@ -0,0 +1,22 @@
+"""Per-account analytics rollup (maintained incrementally)."""
+from datetime import datetime
+from sqlalchemy import DateTime, ForeignKey, Integer, BigInteger, Column
+
+from app.core.database import Base
+
+
+class ChannelRollup(Base):
+    """Running totals for a connected account, kept in sync on every flush."""
+
+    __tablename__ = "channel_rollups"
+
+    connected_account_id = Column(
+        Integer, ForeignKey("connected_accounts.id", ondelete="CASCADE"), primary_key=True
+    )
+    total_views = Column(BigInteger, nullable=False, default=0)
+    total_likes = Column(BigInteger, nullable=False, default=0)
+    total_comments = Column(BigInteger, nullable=False, default=0)
+    total_videos = Column(Integer, nullable=False, default=0)
+    subscriber_count = Column(BigInteger, nullable=False, default=0)
+    latest_snapshot_date = Column(DateTime, nullable=True)  # snapshot the subscriber count came from
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
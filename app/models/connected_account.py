@@ -1,6 +1,6 @@
 """Connected account (e.g. YouTube channel)."""
 from datetime import datetime
-from sqlalchemy import String, DateTime, ForeignKey, Integer, Column
+from sqlalchemy import String, DateTime, ForeignKey, Integer, Column, Index
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
@@ -10,6 +10,10 @@ class ConnectedAccount(Base):
     """Linked YouTube (or other) account."""
 
     __tablename__ = "connected_accounts"
+    __table_args__ = (
+        # Account lookup by user on every analytics request; id gives "first" without a sort
+        Index("ix_connected_accounts_user_platform", "user_id", "platform", "id"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
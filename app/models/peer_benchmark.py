@@ -0,0 +1,31 @@
+"""Peer benchmarking: per-cohort quantile sketches and the values folded into them."""
+from datetime import datetime
+from sqlalchemy import DateTime, Float, ForeignKey, Integer, BigInteger, Column, LargeBinary, String
+
+from app.core.database import Base
+
+
+class PeerSketch(Base):
+    """Serialized quantile sketch of one metric over one cohort of channels."""
+
+    __tablename__ = "peer_sketches"
+
+    metric = Column(String(50), primary_key=True)  # e.g. "avg_views"
+    cohort = Column(String(50), primary_key=True)  # subscriber band, or "all"
+    count = Column(BigInteger, nullable=False, default=0)  # channels in the sketch
+    sketch = Column(LargeBinary, nullable=False)  # app.services.sketches.DDSketch.to_bytes()
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class PeerMetricValue(Base):
+    """A channel's current value of a metric, as counted in the sketches (so it can be taken out again)."""
+
+    __tablename__ = "peer_metric_values"
+
+    connected_account_id = Column(
+        Integer, ForeignKey("connected_accounts.id", ondelete="CASCADE"), primary_key=True
+    )
+    metric = Column(String(50), primary_key=True)
+    cohort = Column(String(50), nullable=False)
+    value = Column(Float, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,15 @@
+"""Resume points of chunked batch tasks."""
+from datetime import datetime
+from sqlalchemy import DateTime, Integer, Column, String
+
+from app.core.database import Base
+
+
+class TaskCheckpoint(Base):
+    """Last id a batch task finished, committed in the same transaction as that chunk's writes."""
+
+    __tablename__ = "task_checkpoints"
+
+    name = Column(String(255), primary_key=True)  # e.g. "ai_insights:checkpoint:2026-W42:0:max"
+    last_id = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
@@ -1,7 +1,7 @@
 """Video model (from YouTube)."""
 from datetime import datetime
-from sqlalchemy import String, DateTime, ForeignKey, Integer, BigInteger, Column
-from sqlalchemy.orm import relationship
+from sqlalchemy import String, DateTime, ForeignKey, Integer, BigInteger, Column, Index, UniqueConstraint
+from sqlalchemy.orm import column_property, relationship
 
 from app.core.database import Base
 
@@ -10,9 +10,16 @@ class Video(Base):
     """Video from connected channel."""
 
     __tablename__ = "videos"
+    __table_args__ = (
+        # Upsert key for bulk ingestion
+        UniqueConstraint("connected_account_id", "external_id", name="uq_videos_account_external"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    connected_account_id = Column(Integer, ForeignKey("connected_accounts.id"), nullable=False)
+    # active_history: moving a video must know the account it leaves, even if expired (rollups)
+    connected_account_id = column_property(
+        Column(Integer, ForeignKey("connected_accounts.id"), nullable=False), active_history=True
+    )
     external_id = Column(String(255), nullable=False, index=True)  # YouTube video ID
     title = Column(String(512), nullable=True)
     published_at = Column(DateTime, nullable=True)
@@ -25,3 +32,16 @@ class Video(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     connected_account = relationship("ConnectedAccount", back_populates="videos")
+
+
+# Keyset pagination: newest first per account, undated videos last, id as tie-breaker.
+# Same order as the query, so pages are a range seek. SQLite has no NULLS LAST in
+# CREATE INDEX, but its DESC already sorts NULLs last.
+Index(
+    "ix_videos_account_published_desc",
+    Video.connected_account_id, Video.published_at.desc().nullslast(), Video.id.desc(),
+).ddl_if(dialect="postgresql")
+Index(
+    "ix_videos_account_published_desc",
+    Video.connected_account_id, Video.published_at.desc(), Video.id.desc(),
+).ddl_if(dialect="sqlite")
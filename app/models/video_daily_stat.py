@@ -0,0 +1,22 @@
+"""Daily per-video stat increments (time-bucketed for windowed totals)."""
+from sqlalchemy import Date, ForeignKey, Integer, BigInteger, Column, Index
+
+from app.core.database import Base
+
+
+class VideoDailyStat(Base):
+    """Views/likes/comments a video gained on one UTC day."""
+
+    __tablename__ = "video_daily_stats"
+    __table_args__ = (
+        Index("ix_video_daily_stats_account_bucket", "connected_account_id", "bucket_date"),
+    )
+
+    video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), primary_key=True)
+    bucket_date = Column(Date, primary_key=True)
+    connected_account_id = Column(
+        Integer, ForeignKey("connected_accounts.id", ondelete="CASCADE"), nullable=False
+    )
+    views = Column(BigInteger, nullable=False, default=0)
+    likes = Column(BigInteger, nullable=False, default=0)
+    comments = Column(BigInteger, nullable=False, default=0)
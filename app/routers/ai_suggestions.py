@@ -1,23 +1,21 @@
 """AI suggestions routes."""
-from fastapi import APIRouter, Depends, Query
+import orjson
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
-from app.core.database import get_db
 from app.models.ai_insight import AIInsight
+from app.routers.caching import CACHE_TTL, cached_response
 from app.schemas.ai import AISuggestionItem, SuggestionsResponse
+from app.auth.deps import get_read_db
 from app.auth.jwt import get_current_user_id
+from app.utils.redis_client import cache_get_or_compute, user_tag
 
 router = APIRouter()
 
 
-@router.get("/suggestions", response_model=SuggestionsResponse)
-async def get_suggestions(
-    limit: int = Query(20, ge=1, le=50),
-    user_id: int = Depends(get_current_user_id),
-    db: AsyncSession = Depends(get_db),
-):
-    """Get AI-generated suggestions for the user."""
+async def build_suggestions(db: AsyncSession, user_id: int, limit: int) -> SuggestionsResponse:
+    """Latest suggestions for the user plus the total count."""
     result = await db.execute(
         select(AIInsight)
         .where(AIInsight.user_id == user_id)
@@ -29,3 +27,20 @@ async def get_suggestions(
     total = cnt.scalar() or 0
     items = [AISuggestionItem.model_validate(i) for i in insights]
     return SuggestionsResponse(items=items, total=total)
+
+
+@router.get("/suggestions", response_model=SuggestionsResponse)
+async def get_suggestions(
+    request: Request,
+    limit: int = Query(20, ge=1, le=50),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get AI-generated suggestions for the user. Cached under the key the dashboard uses, with an ETag."""
+    async def compute():
+        return orjson.dumps((await build_suggestions(db, user_id, limit)).model_dump())
+
+    entry = await cache_get_or_compute(
+        f"ai:suggestions:{user_id}:{limit}", compute, ttl_seconds=CACHE_TTL, tags=(user_tag(user_id),)
+    )
+    return cached_response(request, entry)
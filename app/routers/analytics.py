@@ -1,151 +1,400 @@
-"""Analytics routes: overview, videos, growth."""
+"""Analytics routes: overview, videos, growth, peer benchmarks, the combined dashboard, and bulk export."""
+import asyncio
+import base64
+import hashlib
+import json
 import logging
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, Query
+import numpy as np
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, tuple_
 
-from app.core.database import get_db
-from app.models import ConnectedAccount, Video, AnalyticsSnapshot
+from app.core.config import settings
+from app.core.database import read_session_scope, session_scope
+from app.models import Video, AnalyticsSnapshot, ChannelRollup
 from app.schemas.analytics import (
     OverviewResponse,
     VideoAnalyticsItem,
     VideosListResponse,
     GrowthPoint,
     GrowthResponse,
+    DashboardResponse,
+    PeerMetric,
+    BenchmarksResponse,
 )
+from app.auth.deps import get_read_db
 from app.auth.jwt import get_current_user_id
-from app.services.youtube_mock import get_first_connected_account
-from app.utils.redis_client import cache_get, cache_set
+from app.routers.ai_suggestions import build_suggestions
+from app.routers.caching import CACHE_TTL, cached_response
+from app.services.accounts import get_first_account_id
+from app.services.compaction import closing_points, growth_granularity, period_start
+from app.services.downsample import reduce_series
+from app.services.peer_benchmarks import account_percentiles
+from app.services.export import FORMATS, open_encoder, stream_export
+from app.services.rollups import backfill_account, windowed_totals
+from app.utils.redis_client import CachedBody, cache_get_or_compute, user_tag
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Cache TTL for analytics (5 min)
-CACHE_TTL = 300
+
+async def _get_rollup(db: AsyncSession, account_id: int) -> ChannelRollup:
+    """Rollup row for the account, backfilling it on first access."""
+    rollup = await db.get(ChannelRollup, account_id)
+    if rollup is None:
+        if db.info.get("replica"):
+            # Backfill is a write: do it on the primary
+            async with session_scope() as primary:
+                await primary.run_sync(backfill_account, account_id)
+                return await primary.get(ChannelRollup, account_id)
+        await db.run_sync(backfill_account, account_id)
+        rollup = await db.get(ChannelRollup, account_id)
+    return rollup
+
+
+async def _build_overview(db: AsyncSession, account_id: int | None, period_days: int) -> OverviewResponse:
+    """Overview from the rollup row plus the daily buckets inside the window."""
+    if account_id is None:
+        return OverviewResponse(
+            total_views=0, total_likes=0, total_comments=0, total_videos=0,
+            subscriber_count=0, period_days=period_days,
+        )
+
+    # Video count and latest subscriber count come from the maintained rollup (PK read)
+    rollup = await _get_rollup(db, account_id)
+
+    # Views/likes/comments gained in the window (baselines excluded): range scan over daily buckets
+    since = (datetime.utcnow() - timedelta(days=period_days)).date()
+    win_result = await db.execute(windowed_totals(account_id, since))
+    window = win_result.one()
+
+    return OverviewResponse(
+        total_views=int(window.views),
+        total_likes=int(window.likes),
+        total_comments=int(window.comments),
+        total_videos=int(rollup.total_videos),
+        subscriber_count=int(rollup.subscriber_count),
+        period_days=period_days,
+    )
 
 
 @router.get("/overview", response_model=OverviewResponse)
 async def analytics_overview(
+    request: Request,
     period_days: int = Query(30, ge=1, le=90),
     user_id: int = Depends(get_current_user_id),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Get analytics overview for dashboard. Cached by Redis."""
+    """
+    Get analytics overview for dashboard: views/likes/comments gained in the
+    last period_days, plus all-time video and subscriber counts. Served as
+    cached JSON bytes with an ETag.
+    """
+    async def compute():
+        overview = await _build_overview(db, await get_first_account_id(db, user_id), period_days)
+        return orjson.dumps(overview.model_dump())
+
     cache_key = f"analytics:overview:{user_id}:{period_days}"
-    cached = await cache_get(cache_key)
-    if cached:
-        return OverviewResponse(**cached)
+    entry = await cache_get_or_compute(
+        cache_key, compute, ttl_seconds=CACHE_TTL, tags=(user_tag(user_id),)
+    )
+    return cached_response(request, entry)
 
-    acc = await get_first_connected_account(db, user_id)
-    if not acc:
-        return OverviewResponse(
-            total_views=0, total_likes=0, total_comments=0, total_videos=0,
-            subscriber_count=0, period_days=period_days,
-        )
 
-    since = datetime.utcnow() - timedelta(days=period_days)
-    # Sum video stats for period
-    vid_result = await db.execute(
-        select(
-            func.coalesce(func.sum(Video.view_count), 0).label("views"),
-            func.coalesce(func.sum(Video.like_count), 0).label("likes"),
-            func.coalesce(func.sum(Video.comment_count), 0).label("comments"),
-            func.count(Video.id).label("count"),
-        ).where(Video.connected_account_id == acc.id)
-    )
-    row = vid_result.one()
-    # Latest subscriber count from snapshot
-    sub_result = await db.execute(
-        select(AnalyticsSnapshot.subscriber_count)
-        .where(
-            AnalyticsSnapshot.connected_account_id == acc.id,
-            AnalyticsSnapshot.snapshot_date <= datetime.utcnow(),
-        )
-        .order_by(AnalyticsSnapshot.snapshot_date.desc())
-        .limit(1)
+def _encode_cursor(video: Video) -> str:
+    """Opaque keyset cursor for the (published_at, id) position after `video`."""
+    published = video.published_at.isoformat() if video.published_at else None
+    raw = json.dumps([published, video.id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime | None, int]:
+    """Inverse of _encode_cursor. Raises 400 on anything malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        published, video_id = json.loads(raw)
+        return (datetime.fromisoformat(published) if published else None), int(video_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+async def _build_videos_page(
+    db: AsyncSession, account_id: int | None, page: int, page_size: int, cursor: str | None = None,
+) -> VideosListResponse:
+    """One page of videos, newest first: keyset after `cursor`, else OFFSET by page."""
+    if account_id is None:
+        return VideosListResponse(items=[], total=0, page=page, page_size=page_size)
+
+    # Total from the maintained rollup instead of COUNT(*) per page
+    rollup = await _get_rollup(db, account_id)
+
+    # Same order as ix_videos_account_published_desc, so a page is one index range seek
+    query = (
+        select(Video)
+        .where(Video.connected_account_id == account_id)
+        .order_by(Video.published_at.desc().nullslast(), Video.id.desc())
+        .limit(page_size + 1)
     )
-    sub_row = sub_result.scalars().first()
-    subscriber_count = int(sub_row) if sub_row is not None else 0
-
-    resp = OverviewResponse(
-        total_views=int(row.views),
-        total_likes=int(row.likes),
-        total_comments=int(row.comments),
-        total_videos=int(row.count),
-        subscriber_count=subscriber_count,
-        period_days=period_days,
+    undated = query.where(Video.published_at.is_(None))
+    if cursor:
+        published, last_id = _decode_cursor(cursor)
+        if published is None:
+            videos = (await db.execute(undated.where(Video.id < last_id))).scalars().all()
+        else:
+            # Row comparison: one seek, and NULL published_at never compares true
+            dated = query.where(tuple_(Video.published_at, Video.id) < (published, last_id))
+            videos = (await db.execute(dated)).scalars().all()
+            if len(videos) <= page_size:
+                # Past the last dated video: the page continues into the undated ones
+                tail = undated.limit(page_size + 1 - len(videos))
+                videos += (await db.execute(tail)).scalars().all()
+    else:
+        videos = (await db.execute(query.offset((page - 1) * page_size))).scalars().all()
+    next_cursor = _encode_cursor(videos[page_size - 1]) if len(videos) > page_size else None
+    items = [VideoAnalyticsItem.model_validate(v) for v in videos[:page_size]]
+    return VideosListResponse(
+        items=items, total=int(rollup.total_videos), page=page, page_size=page_size, next_cursor=next_cursor,
     )
-    await cache_set(cache_key, resp.model_dump(), ttl_seconds=CACHE_TTL)
-    return resp
 
 
 @router.get("/videos", response_model=VideosListResponse)
 async def analytics_videos(
+    request: Request,
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=50),
+    cursor: str | None = Query(None, description="next_cursor from the previous page; overrides page"),
     user_id: int = Depends(get_current_user_id),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Get paginated list of videos with analytics."""
-    acc = await get_first_connected_account(db, user_id)
-    if not acc:
-        return VideosListResponse(items=[], total=0, page=page, page_size=page_size)
+    """
+    Get paginated list of videos with analytics.
+    Prefer `cursor` (keyset on published_at, id): cost stays flat however deep the client scrolls.
+    The first page is cached (shared with /dashboard).
+    """
+    if page > 1 or cursor:
+        return await _build_videos_page(db, await get_first_account_id(db, user_id), page, page_size, cursor)
 
-    count_result = await db.execute(
-        select(func.count(Video.id)).where(Video.connected_account_id == acc.id)
-    )
-    total = count_result.scalar() or 0
-    offset = (page - 1) * page_size
-    result = await db.execute(
-        select(Video)
-        .where(Video.connected_account_id == acc.id)
-        .order_by(Video.published_at.desc().nullslast())
-        .offset(offset)
-        .limit(page_size)
-    )
-    videos = result.scalars().all()
-    items = [VideoAnalyticsItem.model_validate(v) for v in videos]
-    return VideosListResponse(items=items, total=total, page=page, page_size=page_size)
+    async def compute():
+        videos = await _build_videos_page(db, await get_first_account_id(db, user_id), 1, page_size)
+        return orjson.dumps(videos.model_dump())
 
+    cache_key = f"analytics:videos:{user_id}:{page_size}"
+    entry = await cache_get_or_compute(
+        cache_key, compute, ttl_seconds=CACHE_TTL, tags=(user_tag(user_id),)
+    )
+    return cached_response(request, entry)
 
-@router.get("/growth", response_model=GrowthResponse)
-async def analytics_growth(
-    period_days: int = Query(30, ge=1, le=90),
-    user_id: int = Depends(get_current_user_id),
-    db: AsyncSession = Depends(get_db),
-):
-    """Get growth chart data (daily snapshots). Cached."""
-    cache_key = f"analytics:growth:{user_id}:{period_days}"
-    cached = await cache_get(cache_key)
-    if cached:
-        return GrowthResponse(**cached)
 
-    acc = await get_first_connected_account(db, user_id)
-    if not acc:
-        return GrowthResponse(data=[], period_days=period_days)
+async def _build_growth(
+    db: AsyncSession, account_id: int | None, period_days: int, max_points: int | None = None,
+) -> GrowthResponse:
+    """
+    Snapshot series for the window, daily or (for long windows) weekly/monthly closing values.
+    With max_points, longer series are reduced by LTTB over all four metrics.
+    """
+    granularity = growth_granularity(period_days)
+    if account_id is None:
+        return GrowthResponse(data=[], period_days=period_days, granularity=granularity)
 
     since = datetime.utcnow() - timedelta(days=period_days)
-    result = await db.execute(
-        select(AnalyticsSnapshot)
-        .where(
-            AnalyticsSnapshot.connected_account_id == acc.id,
-            AnalyticsSnapshot.snapshot_date >= since,
-            AnalyticsSnapshot.period_type == "daily",
-        )
-        .order_by(AnalyticsSnapshot.snapshot_date.asc())
+    # Only columns in ix_snapshots_account_period_date: index-only scans on PostgreSQL
+    columns = (
+        AnalyticsSnapshot.snapshot_date, AnalyticsSnapshot.period_type, AnalyticsSnapshot.total_views,
+        AnalyticsSnapshot.total_likes, AnalyticsSnapshot.total_comments, AnalyticsSnapshot.subscriber_count,
     )
-    snapshots = result.scalars().all()
+    if granularity == "daily":
+        result = await db.execute(
+            select(*columns)
+            .where(
+                AnalyticsSnapshot.connected_account_id == account_id,
+                AnalyticsSnapshot.snapshot_date >= since,
+                AnalyticsSnapshot.period_type == "daily",
+            )
+            .order_by(AnalyticsSnapshot.snapshot_date.asc())
+        )
+        points = [(s.snapshot_date, s) for s in result.all()]
+    else:
+        # Compacted periods have only rollup rows, recent ones only daily rows
+        result = await db.execute(
+            select(*columns)
+            .where(
+                AnalyticsSnapshot.connected_account_id == account_id,
+                AnalyticsSnapshot.snapshot_date >= period_start(granularity, since),
+                AnalyticsSnapshot.period_type.in_((granularity, "daily")),
+            )
+            .order_by(AnalyticsSnapshot.snapshot_date.asc())
+        )
+        points = closing_points(result.all(), granularity)
+    if max_points and len(points) > max_points:
+        points = _reduce_points(points, max_points)
     data = [
         GrowthPoint(
-            date=s.snapshot_date.strftime("%Y-%m-%d"),
+            date=date.strftime("%Y-%m-%d"),
             views=int(s.total_views),
             likes=int(s.total_likes),
             comments=int(s.total_comments),
             subscribers=int(s.subscriber_count),
         )
-        for s in snapshots
+        for date, s in points
+    ]
+    return GrowthResponse(data=data, period_days=period_days, granularity=granularity)
+
+
+def _reduce_points(points: list, max_points: int) -> list:
+    first = points[0][0]
+    x = np.array([(date - first).total_seconds() for date, _ in points])
+    columns = [
+        np.array([float(getattr(s, field) or 0) for _, s in points])
+        for field in ("total_views", "total_likes", "total_comments", "subscriber_count")
     ]
-    resp = GrowthResponse(data=data, period_days=period_days)
-    await cache_set(cache_key, resp.model_dump(), ttl_seconds=CACHE_TTL)
-    return resp
+    return [points[i] for i in reduce_series(x, columns, max_points)]
+
+
+@router.get("/growth", response_model=GrowthResponse)
+async def analytics_growth(
+    request: Request,
+    period_days: int = Query(30, ge=1, le=settings.GROWTH_MAX_PERIOD_DAYS),
+    max_points: int | None = Query(None, ge=12, le=5000, description="reduce the series to at most this many points"),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Get growth chart data. Served as cached JSON bytes with an ETag.
+    Windows beyond the daily retention return weekly, then monthly points;
+    `max_points` caps the series (LTTB), e.g. at the chart's pixel width.
+    """
+    async def compute():
+        growth = await _build_growth(db, await get_first_account_id(db, user_id), period_days, max_points)
+        return orjson.dumps(growth.model_dump())
+
+    cache_key = f"analytics:growth:{user_id}:{period_days}"
+    if max_points:
+        cache_key += f":{max_points}"
+    entry = await cache_get_or_compute(
+        cache_key, compute, ttl_seconds=CACHE_TTL, tags=(user_tag(user_id),)
+    )
+    return cached_response(request, entry)
+
+
+@router.get("/benchmarks", response_model=BenchmarksResponse)
+async def analytics_benchmarks(
+    request: Request,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    How the user's channel compares with channels of similar size: percentile of
+    average views, engagement rate and 30-day subscriber growth, read from the
+    precomputed peer sketches (app.services.peer_benchmarks).
+    """
+    async def compute():
+        account_id = await get_first_account_id(db, user_id)
+        cohort, metrics = await account_percentiles(db, account_id) if account_id else (None, [])
+        response = BenchmarksResponse(cohort=cohort, metrics=[PeerMetric(**m) for m in metrics])
+        return orjson.dumps(response.model_dump())
+
+    cache_key = f"analytics:benchmarks:{user_id}"
+    entry = await cache_get_or_compute(
+        cache_key, compute, ttl_seconds=settings.PEER_BENCHMARK_CACHE_TTL, tags=(user_tag(user_id),)
+    )
+    return cached_response(request, entry)
+
+
+@router.get("/dashboard", response_model=DashboardResponse)
+async def analytics_dashboard(
+    request: Request,
+    period_days: int = Query(30, ge=1, le=90),
+    page_size: int = Query(10, ge=1, le=50),
+    suggestions_limit: int = Query(5, ge=1, le=50),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Overview, growth, first page of videos and AI suggestions in one round trip.
+    Each section is cached under the same key as its own endpoint. Misses are
+    computed concurrently, each on its own pooled session, and share a single
+    account lookup; a fully cached dashboard touches no connection at all.
+    """
+    account_lookup: asyncio.Future | None = None
+
+    async def account_id() -> int | None:
+        nonlocal account_lookup
+        if account_lookup is None:
+            account_lookup = asyncio.ensure_future(_lookup_account_id(user_id))
+        return await account_lookup
+
+    async def overview(db):
+        return await _build_overview(db, await account_id(), period_days)
+
+    async def growth(db):
+        return await _build_growth(db, await account_id(), period_days)
+
+    async def videos(db):
+        return await _build_videos_page(db, await account_id(), 1, page_size)
+
+    async def suggestions(db):
+        return await build_suggestions(db, user_id, suggestions_limit)
+
+    sections = {
+        "overview": (f"analytics:overview:{user_id}:{period_days}", overview),
+        "growth": (f"analytics:growth:{user_id}:{period_days}", growth),
+        "videos": (f"analytics:videos:{user_id}:{page_size}", videos),
+        "suggestions": (f"ai:suggestions:{user_id}:{suggestions_limit}", suggestions),
+    }
+    entries = await asyncio.gather(*(
+        cache_get_or_compute(key, _in_own_session(build, user_id), ttl_seconds=CACHE_TTL, tags=(user_tag(user_id),))
+        for key, build in sections.values()
+    ))
+
+    # Splice the cached JSON bodies; the ETag changes whenever any section does
+    body = b"{" + b",".join(b'"%s":%s' % (name.encode(), e.body) for name, e in zip(sections, entries)) + b"}"
+    etag = '"' + hashlib.blake2b("".join(e.etag for e in entries).encode(), digest_size=16).hexdigest() + '"'
+    return cached_response(request, CachedBody(body, etag, 0.0, 0.0))
+
+
+async def _lookup_account_id(user_id: int) -> int | None:
+    async with read_session_scope(user_id) as db:
+        return await get_first_account_id(db, user_id)
+
+
+def _in_own_session(build, user_id: int):
+    """cache_get_or_compute callback running build(db) on a fresh read session and returning JSON bytes."""
+    async def compute() -> bytes:
+        async with read_session_scope(user_id) as db:
+            return orjson.dumps((await build(db)).model_dump())
+    return compute
+
+
+@router.get("/export")
+async def analytics_export(
+    dataset: str = Query("videos", pattern="^(videos|snapshots)$"),
+    fmt: str = Query("csv", alias="format", pattern="^(csv|ndjson|parquet)$"),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Stream every video or snapshot row of the user's account as CSV, NDJSON or Parquet.
+    Rows are read through a server-side cursor and encoded chunk by chunk, so
+    the response starts at once and memory stays flat for any account size.
+    """
+    try:
+        encoder = open_encoder(dataset, fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    account_id = await _lookup_account_id(user_id)
+    if account_id is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No connected account")
+
+    async def body():
+        # The request's dependency session is gone once streaming starts: hold our own
+        async with read_session_scope(user_id) as db:
+            async for chunk in stream_export(db, dataset, account_id, encoder):
+                if chunk:
+                    yield chunk
+
+    media_type, extension = FORMATS[fmt]
+    return StreamingResponse(
+        body(), media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{dataset}-{account_id}.{extension}"'},
+    )
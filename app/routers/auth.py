@@ -7,7 +7,7 @@ from sqlalchemy import select
 from app.core.database import get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin, UserResponse, TokenResponse
-from app.auth.password import hash_password, verify_password
+from app.auth.password import hash_password_async, verify_password_async, needs_rehash
 from app.auth.jwt import create_access_token
 
 logger = logging.getLogger(__name__)
@@ -22,7 +22,7 @@ async def register(data: UserCreate, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
     user = User(
         email=data.email,
-        hashed_password=hash_password(data.password),
+        hashed_password=await hash_password_async(data.password),
         full_name=data.full_name,
     )
     db.add(user)
@@ -40,11 +40,14 @@ async def login(data: UserLogin, db: AsyncSession = Depends(get_db)):
     """Login. Returns JWT and user."""
     result = await db.execute(select(User).where(User.email == data.email))
     user = result.scalars().first()
-    if not user or not verify_password(data.password, user.hashed_password):
+    if not user or not await verify_password_async(data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
         )
+    if needs_rehash(user.hashed_password):
+        # BCRYPT_ROUNDS changed since this hash was made; upgrade it while we have the password
+        user.hashed_password = await hash_password_async(data.password)
     token = create_access_token(data={"sub": str(user.id)})
     return TokenResponse(
         access_token=token,
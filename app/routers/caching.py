@@ -0,0 +1,19 @@
+"""Serving cached JSON bodies (app.utils.redis_client.cache_get_or_compute) as HTTP responses."""
+from fastapi import Request, Response, status
+
+from app.core.config import settings
+from app.utils.redis_client import CachedBody
+
+# Cache TTL for analytics; entries are dropped on data changes (app.services.invalidation)
+CACHE_TTL = settings.ANALYTICS_CACHE_TTL
+
+
+def cached_response(request: Request, entry: CachedBody) -> Response:
+    """Return cached JSON bytes as-is (already validated at fill time); 304 if the client has them."""
+    headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if entry.etag in tags or "*" in tags:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
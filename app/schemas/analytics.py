@@ -1,16 +1,23 @@
 """Analytics API schemas."""
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 
+from app.schemas.ai import SuggestionsResponse
+
 
 class OverviewResponse(BaseModel):
-    """Analytics overview for dashboard."""
-    total_views: int
-    total_likes: int
-    total_comments: int
-    total_videos: int
-    subscriber_count: int
+    """
+    Analytics overview for dashboard: engagement gained in the last period_days
+    next to current channel totals. Gains count from when syncs started
+    recording a video's counters; what a video had when first seen is not
+    attributed to any window.
+    """
+    total_views: int = Field(description="Views gained in the window")
+    total_likes: int = Field(description="Likes gained in the window")
+    total_comments: int = Field(description="Comments gained in the window")
+    total_videos: int = Field(description="Videos on the channel now (all time)")
+    subscriber_count: int = Field(description="Latest subscriber count (all time)")
     period_days: int
 
 
@@ -30,15 +37,16 @@ class VideoAnalyticsItem(BaseModel):
 
 
 class VideosListResponse(BaseModel):
-    """Paginated list of videos."""
+    """Paginated list of videos. Pass next_cursor back as `cursor` for the next page."""
     items: list[VideoAnalyticsItem]
     total: int
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
 
 
 class GrowthPoint(BaseModel):
-    """Single point in growth chart."""
+    """Single point in growth chart (closing values of the day, week or month starting at `date`)."""
     date: str
     views: int
     likes: int
@@ -47,6 +55,32 @@ class GrowthPoint(BaseModel):
 
 
 class GrowthResponse(BaseModel):
-    """Growth chart data."""
+    """Growth chart data. Longer windows come back weekly or monthly (see `granularity`)."""
     data: list[GrowthPoint]
     period_days: int
+    granularity: str = "daily"
+
+
+class PeerMetric(BaseModel):
+    """A channel's value of one metric and where it ranks (percentiles 0-100)."""
+    metric: str
+    value: float | None
+    percentile: float | None  # among channels in the same subscriber cohort
+    overall_percentile: float | None  # among all channels
+    cohort_size: int
+    cohort_median: float | None
+    cohort_p90: float | None
+
+
+class BenchmarksResponse(BaseModel):
+    """Peer benchmarks for the user's channel (cohort is None until the first benchmark run)."""
+    cohort: str | None
+    metrics: list[PeerMetric]
+
+
+class DashboardResponse(BaseModel):
+    """Everything the dashboard page loads, in one response."""
+    overview: OverviewResponse
+    growth: GrowthResponse
+    videos: VideosListResponse
+    suggestions: SuggestionsResponse
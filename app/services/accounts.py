@@ -0,0 +1,86 @@
+"""
+Connected-account lookups by user.
+
+Nearly every analytics request starts by resolving the user's account. Ids
+are loaded for any number of users in one indexed query, then memoized on
+the session (request scope) and in the two-tier cache under the user's tag
+(across requests); the users not memoized take one Redis MGET between them.
+Connecting or removing an account invalidates that tag on commit
+(app.services.invalidation), so the change is seen immediately.
+"""
+import logging
+from itertools import chain
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import ConnectedAccount
+from app.utils.redis_client import cache_get_many, cache_set_many, tag_versions, user_tag
+
+logger = logging.getLogger(__name__)
+
+_SESSION_KEY = "account_ids_by_user"
+
+
+def _cache_key(user_id: int, platform: str) -> str:
+    return f"accounts:{platform}:{user_id}"
+
+
+async def get_account_ids(
+    session: AsyncSession, user_ids, platform: str = "youtube"
+) -> dict[int, list[int]]:
+    """user_id -> that user's account ids on the platform, oldest first ([] if none)."""
+    memo: dict[tuple[int, str], list[int]] = session.sync_session.info.setdefault(_SESSION_KEY, {})
+    found: dict[int, list[int]] = {}
+    uncached = []
+    for uid in set(user_ids):
+        ids = memo.get((uid, platform))
+        if ids is None:
+            uncached.append(uid)
+        else:
+            found[uid] = ids
+    if uncached:
+        cached = await cache_get_many(_cache_key(uid, platform) for uid in uncached)
+        for uid in uncached:
+            ids = cached.get(_cache_key(uid, platform))
+            if ids is not None:
+                found[uid] = ids
+    missing = [uid for uid in uncached if uid not in found]
+
+    if missing:
+        tags = tuple(user_tag(uid) for uid in missing)
+        versions = await tag_versions(tags)
+        loaded: dict[int, list[int]] = {uid: [] for uid in missing}
+        rows = await session.execute(
+            select(ConnectedAccount.user_id, ConnectedAccount.id)
+            .where(ConnectedAccount.user_id.in_(missing), ConnectedAccount.platform == platform)
+            .order_by(ConnectedAccount.user_id, ConnectedAccount.id)
+        )
+        for uid, account_id in rows:
+            loaded[uid].append(account_id)
+        found.update(loaded)
+        # Don't cache what a concurrent connect/disconnect may already have made stale
+        if await tag_versions(tags) == versions:
+            await cache_set_many(
+                ((_cache_key(uid, platform), ids, (user_tag(uid),)) for uid, ids in loaded.items()),
+                ttl_seconds=settings.ANALYTICS_CACHE_TTL,
+            )
+
+    for uid, ids in found.items():
+        memo[(uid, platform)] = ids
+    return found
+
+
+async def get_first_account_id(session: AsyncSession, user_id: int, platform: str = "youtube") -> int | None:
+    """Id of the user's first (oldest) account on the platform, or None."""
+    ids = (await get_account_ids(session, [user_id], platform))[user_id]
+    return ids[0] if ids else None
+
+
+@event.listens_for(Session, "after_flush")
+def _forget_on_account_change(session: Session, flush_context) -> None:
+    # This session changed accounts: its memo may be wrong until it re-reads
+    if any(isinstance(obj, ConnectedAccount) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info.pop(_SESSION_KEY, None)
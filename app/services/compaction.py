@@ -0,0 +1,158 @@
+"""
+Snapshot compaction: daily snapshots -> weekly and monthly rollup rows.
+
+Snapshot values are running totals, so a period's rollup row carries the
+closing values (its newest daily row) and is dated at the period start
+(Monday for weeks, the 1st for months). Every run recomputes each complete
+period that still has daily rows, then prunes daily rows older than
+SNAPSHOT_DAILY_RETENTION_DAYS and weekly rows older than
+SNAPSHOT_WEEKLY_RETENTION_DAYS; monthly rows are kept. Growth queries pick
+the coarsest granularity whose retention covers the window, so a chart reads
+at most ~100 rows whatever the history length. When daily rows are partitioned
+by month (app.services.partitions), they are not deleted here; the
+maintenance task drops their expired partitions after compaction.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.models import AnalyticsSnapshot, ConnectedAccount
+from app.services.invalidation import mark_accounts_changed
+from app.services.partitions import daily_partitioned
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_PERIODS = ("weekly", "monthly")
+_VALUE_FIELDS = ("total_views", "total_likes", "total_comments", "subscriber_count")
+
+
+def period_start(period_type: str, when: datetime) -> datetime:
+    """Start of the day, ISO week or month containing `when`."""
+    day = when.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period_type == "weekly":
+        return day - timedelta(days=day.weekday())
+    if period_type == "monthly":
+        return day.replace(day=1)
+    return day
+
+
+def next_period_start(period_type: str, start: datetime) -> datetime:
+    if period_type == "weekly":
+        return start + timedelta(days=7)
+    if period_type == "monthly":
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def retention_cutoff(period_type: str, now: datetime) -> datetime:
+    """Rows of `period_type` dated before this are pruned (daily or weekly)."""
+    # Keep whole periods: a window reaching back N days starts at the period containing that day
+    if period_type == "daily":
+        return period_start("weekly", now - timedelta(days=settings.SNAPSHOT_DAILY_RETENTION_DAYS))
+    return period_start("monthly", now - timedelta(days=settings.SNAPSHOT_WEEKLY_RETENTION_DAYS))
+
+
+def growth_granularity(period_days: int) -> str:
+    """Coarsest granularity still needed for a window: raw daily rows only while they are retained."""
+    if period_days <= settings.SNAPSHOT_DAILY_RETENTION_DAYS:
+        return "daily"
+    if period_days <= settings.SNAPSHOT_WEEKLY_RETENTION_DAYS:
+        return "weekly"
+    return "monthly"
+
+
+def closing_points(snapshots, period_type: str) -> list:
+    """
+    One snapshot per period: the latest daily row in it, else its rollup row.
+    Rows may mix daily and `period_type` rows (recent periods are not compacted
+    yet, old ones have lost their daily rows). Returned in period order as
+    (period_start, snapshot) pairs.
+    """
+    best: dict[datetime, tuple[tuple[bool, datetime], object]] = {}
+    for s in snapshots:
+        start = period_start(period_type, s.snapshot_date)
+        rank = (s.period_type == "daily", s.snapshot_date)
+        cur = best.get(start)
+        if cur is None or rank > cur[0]:
+            best[start] = (rank, s)
+    return [(start, best[start][1]) for start in sorted(best)]
+
+
+def compact_accounts(session: Session, account_ids: list[int], now: datetime | None = None) -> dict:
+    """Roll up and prune one batch of accounts. The caller commits."""
+    now = now or datetime.utcnow()
+    # Daily rows after this belong only to periods that are still open
+    open_from = max(period_start(p, now) for p in ROLLUP_PERIODS)
+    daily = session.execute(
+        select(
+            AnalyticsSnapshot.connected_account_id, AnalyticsSnapshot.snapshot_date,
+            AnalyticsSnapshot.period_type, *(getattr(AnalyticsSnapshot, f) for f in _VALUE_FIELDS),
+        )
+        .where(
+            AnalyticsSnapshot.connected_account_id.in_(account_ids),
+            AnalyticsSnapshot.period_type == "daily",
+            AnalyticsSnapshot.snapshot_date < open_from,
+        )
+        .order_by(AnalyticsSnapshot.connected_account_id, AnalyticsSnapshot.snapshot_date)
+    ).all()
+    by_account: dict[int, list] = {}
+    for row in daily:
+        by_account.setdefault(row.connected_account_id, []).append(row)
+
+    rollups = []
+    for account_id, rows in by_account.items():
+        for period_type in ROLLUP_PERIODS:
+            complete_before = period_start(period_type, now)
+            for start, row in closing_points(rows, period_type):
+                if next_period_start(period_type, start) > complete_before:
+                    continue  # current period: rolled up once it has closed
+                rollups.append({
+                    "connected_account_id": account_id, "snapshot_date": start, "period_type": period_type,
+                    "created_at": now, **{f: getattr(row, f) for f in _VALUE_FIELDS},
+                })
+
+    if rollups:
+        table = AnalyticsSnapshot.__table__
+        conn = session.connection()
+        for i in range(0, len(rollups), 1000):
+            stmt = dialect_insert(conn, table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["connected_account_id", "snapshot_date", "period_type"],
+                set_={f: stmt.excluded[f] for f in _VALUE_FIELDS},
+            )
+            conn.execute(stmt, rollups[i:i + 1000])
+
+    pruned = 0
+    prune = ("weekly",) if daily_partitioned(session.connection()) else ("daily", "weekly")
+    for period_type in prune:
+        pruned += session.execute(
+            delete(AnalyticsSnapshot).where(
+                AnalyticsSnapshot.connected_account_id.in_(account_ids),
+                AnalyticsSnapshot.period_type == period_type,
+                AnalyticsSnapshot.snapshot_date < retention_cutoff(period_type, now),
+            )
+        ).rowcount or 0
+
+    if rollups or pruned:
+        mark_accounts_changed(session, account_ids)
+    return {"rollups": len(rollups), "pruned": pruned}
+
+
+def iter_account_id_batches(session: Session, batch_size: int):
+    """Yield lists of connected account ids, keyset-paged by id."""
+    last_id = 0
+    while True:
+        ids = session.execute(
+            select(ConnectedAccount.id)
+            .where(ConnectedAccount.id > last_id)
+            .order_by(ConnectedAccount.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return
+        last_id = ids[-1]
+        yield ids
@@ -0,0 +1,70 @@
+"""
+Point reduction for chart series (Largest-Triangle-Three-Buckets).
+
+LTTB keeps the first and last point and, from each of threshold - 2 equal
+buckets in between, the point forming the largest triangle with the point
+kept from the previous bucket and the mean of the next bucket. Peaks, dips
+and the overall shape survive while the point count is bounded. Bucket means
+come from cumulative sums and each bucket's areas are one NumPy expression,
+so the Python loop runs once per output point, not per input point.
+"""
+import numpy as np
+
+_FILL_STEPS = 4  # bisection rounds spent filling the point budget
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices (ascending) of at most `threshold` points of (x, y) chosen by LTTB."""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket k covers [edges[k], edges[k + 1]); the last "bucket" is the final point alone
+    # floor(k * (n - 2) / (threshold - 2)) in integers: a float step can round an edge down by one
+    edges = np.append(np.arange(threshold - 1, dtype=np.int64) * (n - 2) // (threshold - 2) + 1, n)
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for k in range(threshold - 2):
+        start, end, next_end = edges[k], edges[k + 1], edges[k + 2]
+        avg_x = (cum_x[next_end] - cum_x[end]) / (next_end - end)
+        avg_y = (cum_y[next_end] - cum_y[end]) / (next_end - end)
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[k + 1] = a
+    return selected
+
+
+def reduce_series(x, columns: list, max_points: int) -> np.ndarray:
+    """
+    Indices of at most max_points points to keep for several metrics sharing
+    one x axis: the union of each metric's LTTB points. Every metric starts
+    with max_points // len(columns) points (callers keep that >= 3); as
+    metrics often pick the same points, the per-metric count is then raised
+    by a short bisection while the union still fits.
+    """
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+
+    def union(per_metric: int) -> np.ndarray:
+        return np.unique(np.concatenate([lttb_indices(x, col, per_metric) for col in columns]))
+
+    lo = max_points // len(columns)
+    keep = union(lo)
+    hi = max_points + 1  # smallest per-metric count known not to fit
+    for _ in range(_FILL_STEPS):
+        if hi - lo <= max(1, lo // 10):
+            break
+        mid = (lo + hi) // 2
+        candidate = union(mid)
+        if len(candidate) <= max_points:
+            lo, keep = mid, candidate
+        else:
+            hi = mid
+    return keep
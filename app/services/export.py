@@ -0,0 +1,202 @@
+"""
+Streaming bulk export of an account's videos or snapshots.
+
+Rows come from a server-side cursor (yield_per) in chunks of
+EXPORT_CHUNK_ROWS and each chunk is encoded as soon as it arrives, so memory
+stays flat however many rows the account has. Formats: CSV, NDJSON and
+Parquet (one row group per chunk; needs pyarrow). The HTTP endpoint uses
+`stream_export` on an AsyncSession, the Celery job `iter_export` on a sync
+Session; both take an encoder from `open_encoder`.
+"""
+import csv
+import io
+from datetime import datetime
+from typing import AsyncIterator, Iterator
+
+import orjson
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import AnalyticsSnapshot, Video
+
+try:  # optional: only needed for Parquet
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+_VIDEO_COLUMNS = (
+    Video.id, Video.external_id, Video.title, Video.published_at, Video.view_count,
+    Video.like_count, Video.comment_count, Video.duration_seconds, Video.thumbnail_url, Video.updated_at,
+)
+_SNAPSHOT_COLUMNS = (
+    AnalyticsSnapshot.snapshot_date, AnalyticsSnapshot.period_type, AnalyticsSnapshot.total_views,
+    AnalyticsSnapshot.total_likes, AnalyticsSnapshot.total_comments, AnalyticsSnapshot.subscriber_count,
+)
+DATASETS = {"videos": _VIDEO_COLUMNS, "snapshots": _SNAPSHOT_COLUMNS}
+
+
+def parquet_available() -> bool:
+    return pa is not None
+
+
+def export_query(dataset: str, account_id: int) -> Select:
+    """Plain column tuples (no ORM objects) in a stable, index-backed order."""
+    if dataset == "videos":
+        return select(*_VIDEO_COLUMNS).where(Video.connected_account_id == account_id).order_by(Video.id)
+    return (
+        select(*_SNAPSHOT_COLUMNS)
+        .where(AnalyticsSnapshot.connected_account_id == account_id)
+        .order_by(AnalyticsSnapshot.snapshot_date, AnalyticsSnapshot.period_type)
+    )
+
+
+class CsvEncoder:
+    def __init__(self, columns: list[str]):
+        self.columns = columns
+        self.rows = 0
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+
+    def _drain(self) -> bytes:
+        data = self._buffer.getvalue().encode()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def begin(self) -> bytes:
+        self._writer.writerow(self.columns)
+        return self._drain()
+
+    def encode(self, rows) -> bytes:
+        self._writer.writerows(
+            [v.isoformat() if isinstance(v, datetime) else v for v in row] for row in rows
+        )
+        self.rows += len(rows)
+        return self._drain()
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class NdjsonEncoder:
+    def __init__(self, columns: list[str]):
+        self.columns = columns
+        self.rows = 0
+
+    def begin(self) -> bytes:
+        return b""
+
+    def encode(self, rows) -> bytes:
+        self.rows += len(rows)
+        return b"".join(orjson.dumps(dict(zip(self.columns, row)), option=orjson.OPT_APPEND_NEWLINE) for row in rows)
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class _Drain:
+    """Write-only file object handing bytes back as soon as pyarrow writes them."""
+
+    def __init__(self):
+        self.closed = False
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position  # parquet footer offsets are absolute
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arrow_type(column):
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return pa.timestamp("us")
+    if python_type is int:
+        return pa.int64()
+    return pa.string()
+
+
+class ParquetEncoder:
+    def __init__(self, columns: list[str], table_columns):
+        self.columns = columns
+        self.rows = 0
+        self._schema = pa.schema([(name, _arrow_type(c)) for name, c in zip(columns, table_columns)])
+        self._sink = _Drain()
+        self._writer = pq.ParquetWriter(pa.PythonFile(self._sink, mode="w"), self._schema, compression="zstd")
+
+    def begin(self) -> bytes:
+        return self._sink.take()
+
+    def encode(self, rows) -> bytes:
+        arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), self._schema)]
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))  # one row group per chunk
+        self.rows += len(rows)
+        return self._sink.take()
+
+    def finish(self) -> bytes:
+        self._writer.close()
+        return self._sink.take()
+
+
+def open_encoder(dataset: str, fmt: str):
+    """Encoder for the dataset's columns. Raises ValueError for unknown or unavailable formats."""
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset: {dataset}")
+    table_columns = DATASETS[dataset]
+    columns = [c.key for c in table_columns]
+    if fmt == "csv":
+        return CsvEncoder(columns)
+    if fmt == "ndjson":
+        return NdjsonEncoder(columns)
+    if fmt == "parquet":
+        if not parquet_available():
+            raise ValueError("Parquet export needs pyarrow installed")
+        return ParquetEncoder(columns, table_columns)
+    raise ValueError(f"Unknown format: {fmt}")
+
+
+def iter_export(
+    session: Session, dataset: str, account_id: int, encoder, chunk_rows: int | None = None,
+) -> Iterator[bytes]:
+    """Encoded chunks of the account's rows, read through a server-side cursor."""
+    stmt = export_query(dataset, account_id).execution_options(yield_per=chunk_rows or settings.EXPORT_CHUNK_ROWS)
+    yield encoder.begin()
+    for rows in session.execute(stmt).partitions():
+        yield encoder.encode(rows)
+    yield encoder.finish()
+
+
+async def stream_export(
+    session: AsyncSession, dataset: str, account_id: int, encoder, chunk_rows: int | None = None,
+) -> AsyncIterator[bytes]:
+    """Async counterpart of iter_export (AsyncSession.stream keeps the cursor open between chunks)."""
+    stmt = export_query(dataset, account_id).execution_options(yield_per=chunk_rows or settings.EXPORT_CHUNK_ROWS)
+    yield encoder.begin()
+    result = await session.stream(stmt)
+    async for rows in result.partitions():
+        yield encoder.encode(rows)
+    yield encoder.finish()
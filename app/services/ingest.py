@@ -0,0 +1,184 @@
+"""
+Bulk ingestion of videos and snapshots.
+
+Batches are written with multi-row INSERT ... ON CONFLICT DO UPDATE keyed on
+the natural keys (account + external_id for videos, account + date + period
+for snapshots) instead of one ORM object per row. Rollups, daily buckets and
+cache invalidation are applied explicitly, since Core writes skip the flush
+hooks. Functions take a sync Session; from async code use
+`await session.run_sync(upsert_videos, records)`.
+"""
+import logging
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import select, or_
+from sqlalchemy.orm import Session
+
+from app.core.database import dialect_insert
+from app.models import Video, AnalyticsSnapshot
+from app.services.invalidation import mark_accounts_changed
+from app.services.rollups import BASELINE_DATE, apply_changes
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+VIDEO_FIELDS = (
+    "connected_account_id", "external_id", "title", "published_at",
+    "view_count", "like_count", "comment_count", "duration_seconds", "thumbnail_url",
+)
+SNAPSHOT_FIELDS = (
+    "connected_account_id", "snapshot_date", "period_type",
+    "total_views", "total_likes", "total_comments", "subscriber_count",
+)
+_VIDEO_UPDATABLE = ("title", "view_count", "like_count", "comment_count", "duration_seconds", "thumbnail_url")
+_SNAPSHOT_UPDATABLE = ("total_views", "total_likes", "total_comments", "subscriber_count")
+
+
+def _batches(records, size: int):
+    it = iter(records)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def _existing_counters(session: Session, batch: list[dict]) -> dict[tuple[int, str], tuple]:
+    """(account_id, external_id) -> (id, views, likes, comments) for rows already stored."""
+    by_account: dict[int, list[str]] = {}
+    for r in batch:
+        by_account.setdefault(r["connected_account_id"], []).append(r["external_id"])
+    found = {}
+    for account_id, external_ids in by_account.items():
+        rows = session.execute(
+            select(Video.id, Video.external_id, Video.view_count, Video.like_count, Video.comment_count)
+            .where(Video.connected_account_id == account_id, Video.external_id.in_(external_ids))
+        )
+        for row in rows:
+            found[(account_id, row.external_id)] = (
+                row.id, int(row.view_count or 0), int(row.like_count or 0), int(row.comment_count or 0)
+            )
+    return found
+
+
+def _by_fields(rows, fields: tuple[str, ...]):
+    """Group rows by the fields they carry (in `fields` order), one statement per group."""
+    groups: dict[tuple[str, ...], list[dict]] = {}
+    for row in rows:
+        groups.setdefault(tuple(f for f in fields if f in row), []).append(row)
+    return groups.items()
+
+
+def upsert_videos(session: Session, records, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Insert or update videos by (connected_account_id, external_id).
+    Records are dicts with VIDEO_FIELDS keys; only account, external_id and the
+    counters are required, and optional fields a record doesn't carry keep
+    their stored value. Returns the number of rows inserted or changed.
+    """
+    conn = session.connection()
+    table = Video.__table__
+    now = datetime.utcnow()
+    written = 0
+    for batch in _batches(records, batch_size):
+        rows = {}
+        for r in batch:  # later records win within a batch, field by field
+            row = {f: r[f] for f in VIDEO_FIELDS if f in r}
+            for counter in ("view_count", "like_count", "comment_count"):
+                row[counter] = int(row.get(counter) or 0)
+            rows.setdefault((row["connected_account_id"], row["external_id"]), {}).update(row)
+
+        existing = _existing_counters(session, list(rows.values()))
+
+        ids = {}
+        # Only the fields a record carries are updated, so records with different fields go apart
+        for fields, group in _by_fields(rows.values(), VIDEO_FIELDS):
+            updatable = [c for c in _VIDEO_UPDATABLE if c in fields]
+            stmt = dialect_insert(conn, table)
+            excluded = stmt.excluded
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["connected_account_id", "external_id"],
+                set_={**{c: excluded[c] for c in updatable}, "updated_at": excluded.updated_at},
+                # Skip no-op updates so unchanged rows aren't rewritten
+                where=or_(*(table.c[c].is_distinct_from(excluded[c]) for c in updatable)),
+            ).returning(table.c.id, table.c.connected_account_id, table.c.external_id)
+            params = [{**row, "created_at": now, "updated_at": now} for row in group]
+            ids.update(
+                ((row.connected_account_id, row.external_id), row.id) for row in conn.execute(stmt, params)
+            )
+        written += len(ids)
+
+        deltas: dict[int, list[int]] = {}
+        buckets: list[dict] = []
+        for key, row in rows.items():
+            account_id = key[0]
+            new = (row["view_count"], row["like_count"], row["comment_count"])
+            old = existing.get(key)
+            if old is None:
+                changes, video_id, is_new, bucket_date = new, ids.get(key), 1, BASELINE_DATE
+            else:
+                changes = tuple(n - o for n, o in zip(new, old[1:]))
+                video_id, is_new, bucket_date = old[0], 0, now.date()
+            if video_id is None or not (is_new or any(changes)):
+                continue
+            d = deltas.setdefault(account_id, [0, 0, 0, 0])
+            for i, c in enumerate(changes):
+                d[i] += c
+            d[3] += is_new
+            buckets.append({
+                "video_id": video_id,
+                "connected_account_id": account_id,
+                "bucket_date": bucket_date,
+                "views": changes[0],
+                "likes": changes[1],
+                "comments": changes[2],
+            })
+        apply_changes(session, deltas, buckets, {})
+        mark_accounts_changed(session, deltas)
+    return written
+
+
+def upsert_snapshots(session: Session, records, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Insert or update snapshots by (connected_account_id, snapshot_date, period_type).
+    Records are dicts with SNAPSHOT_FIELDS keys; values a record doesn't carry
+    keep their stored value. Returns the number of rows sent.
+    """
+    conn = session.connection()
+    table = AnalyticsSnapshot.__table__
+    now = datetime.utcnow()
+    written = 0
+    for batch in _batches(records, batch_size):
+        rows = {}
+        for r in batch:
+            row = {f: r[f] for f in SNAPSHOT_FIELDS if f in r}
+            row["period_type"] = row.get("period_type") or "daily"
+            key = (row["connected_account_id"], row["snapshot_date"], row["period_type"])
+            rows.setdefault(key, {}).update(row)
+
+        for fields, group in _by_fields(rows.values(), SNAPSHOT_FIELDS):
+            stmt = dialect_insert(conn, table)
+            set_ = {c: stmt.excluded[c] for c in _SNAPSHOT_UPDATABLE if c in fields}
+            index_elements = ["connected_account_id", "snapshot_date", "period_type"]
+            stmt = (
+                stmt.on_conflict_do_update(index_elements=index_elements, set_=set_)
+                if set_ else stmt.on_conflict_do_nothing(index_elements=index_elements)
+            )
+            conn.execute(stmt, [{**row, "created_at": now} for row in group])
+        written += len(rows)
+
+        newest: dict[int, dict] = {}
+        for row in rows.values():
+            if row["period_type"] != "daily" or row["snapshot_date"] > now:
+                continue
+            cur = newest.get(row["connected_account_id"])
+            if cur is None or row["snapshot_date"] >= cur["snapshot_date"]:
+                newest[row["connected_account_id"]] = row
+        latest = {
+            account_id: (row["snapshot_date"], int(row["subscriber_count"] or 0))
+            for account_id, row in newest.items() if "subscriber_count" in row
+        }
+        # The newest record left the count out: the row may keep a stored one, so re-read it
+        rebuild = {account_id for account_id, row in newest.items() if "subscriber_count" not in row}
+        apply_changes(session, {}, [], latest, rebuild)
+        mark_accounts_changed(session, {r["connected_account_id"] for r in rows.values()})
+    return written
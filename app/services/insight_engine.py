@@ -0,0 +1,268 @@
+"""
+Data-driven insight engine.
+
+Loads videos and recent snapshots for a batch of connected accounts into
+columnar NumPy arrays and computes every signal for the whole batch at once
+with grouped reductions (bincount / lexsort), then turns the signals into
+insight texts. Signals:
+
+- best posting hour: mean views by publish hour vs. the channel mean
+- engagement trend: slope of (likes + comments) / views over publish time
+- title length: correlation of title length with log views
+- cadence: typical and longest gap between uploads, days since the last one
+- subscriber growth over the last 30 days of snapshots
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+import numpy as np
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from app.models import Video, AnalyticsSnapshot
+
+logger = logging.getLogger(__name__)
+
+MIN_VIDEOS = 4  # below this the per-channel statistics are noise
+BEST_HOUR_MIN_LIFT = 1.2
+ENGAGEMENT_TREND_MIN = 0.10  # relative change per 30 days
+TITLE_CORR_MIN = 0.3
+SNAPSHOT_WINDOW_DAYS = 30
+
+PRIORITY_ORDER = {"high": 0, "medium": 1, "low": 2}
+
+
+class AccountBatch(NamedTuple):
+    """Columnar data for a batch of accounts. *_idx map rows to positions in account_ids."""
+    account_ids: np.ndarray
+    v_idx: np.ndarray
+    v_days: np.ndarray  # publish time, days relative to now (<= 0)
+    v_hour: np.ndarray
+    v_views: np.ndarray
+    v_engagement: np.ndarray
+    v_title_len: np.ndarray
+    s_idx: np.ndarray
+    s_days: np.ndarray
+    s_subs: np.ndarray
+
+
+class Signals(NamedTuple):
+    """Per-account signal arrays, aligned with AccountBatch.account_ids."""
+    n_videos: np.ndarray
+    best_hour: np.ndarray
+    best_hour_lift: np.ndarray
+    engagement_trend: np.ndarray
+    title_corr: np.ndarray
+    mean_gap_days: np.ndarray
+    max_gap_days: np.ndarray
+    days_since_upload: np.ndarray
+    subscriber_growth: np.ndarray
+
+
+def _days_since(dates, now: datetime) -> np.ndarray:
+    t = np.array(dates, dtype="datetime64[s]")
+    return (t - np.datetime64(now, "s")).astype(np.float64) / 86400.0
+
+
+def load_batch(session: Session, account_ids: list[int], now: datetime | None = None) -> AccountBatch:
+    """One video query and one snapshot query for the whole batch."""
+    now = now or datetime.utcnow()
+    ids = np.unique(np.asarray(account_ids, dtype=np.int64))
+    videos = session.execute(
+        select(
+            Video.connected_account_id, Video.published_at, Video.view_count,
+            Video.like_count, Video.comment_count, func.coalesce(func.length(Video.title), 0),
+        ).where(Video.connected_account_id.in_(ids.tolist()), Video.published_at.is_not(None))
+    ).all()
+    snapshots = session.execute(
+        select(AnalyticsSnapshot.connected_account_id, AnalyticsSnapshot.snapshot_date, AnalyticsSnapshot.subscriber_count)
+        .where(
+            AnalyticsSnapshot.connected_account_id.in_(ids.tolist()),
+            AnalyticsSnapshot.period_type == "daily",
+            AnalyticsSnapshot.snapshot_date >= now - timedelta(days=SNAPSHOT_WINDOW_DAYS),
+            AnalyticsSnapshot.snapshot_date <= now,
+        )
+    ).all()
+
+    v_acc, v_pub, v_views, v_likes, v_comments, v_tlen = (list(c) for c in zip(*videos)) if videos else ([],) * 6
+    s_acc, s_date, s_subs = (list(c) for c in zip(*snapshots)) if snapshots else ([],) * 3
+
+    pub = np.array(v_pub, dtype="datetime64[s]")
+    views = np.asarray(v_views, dtype=np.float64)
+    interactions = np.asarray(v_likes, dtype=np.float64) + np.asarray(v_comments, dtype=np.float64)
+    return AccountBatch(
+        account_ids=ids,
+        v_idx=np.searchsorted(ids, np.asarray(v_acc, dtype=np.int64)),
+        v_days=_days_since(v_pub, now),
+        v_hour=(pub.astype("datetime64[h]") - pub.astype("datetime64[D]")).astype(np.int64),
+        v_views=views,
+        v_engagement=interactions / np.maximum(views, 1.0),
+        v_title_len=np.asarray(v_tlen, dtype=np.float64),
+        s_idx=np.searchsorted(ids, np.asarray(s_acc, dtype=np.int64)),
+        s_days=_days_since(s_date, now),
+        s_subs=np.asarray(s_subs, dtype=np.float64),
+    )
+
+
+def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    return np.divide(num, den, out=np.zeros_like(num, dtype=np.float64), where=den != 0)
+
+
+def _group_slope_and_corr(idx, x, y, n):
+    """Per-group OLS slope of y on x and Pearson r, from grouped sums."""
+    cnt = np.bincount(idx, minlength=n).astype(np.float64)
+    sx = np.bincount(idx, weights=x, minlength=n)
+    sy = np.bincount(idx, weights=y, minlength=n)
+    sxx = np.bincount(idx, weights=x * x, minlength=n)
+    syy = np.bincount(idx, weights=y * y, minlength=n)
+    sxy = np.bincount(idx, weights=x * y, minlength=n)
+    var_x = cnt * sxx - sx * sx
+    var_y = cnt * syy - sy * sy
+    cov = cnt * sxy - sx * sy
+    slope = _ratio(cov, var_x)
+    corr = _ratio(cov, np.sqrt(np.clip(var_x * var_y, 0, None)))
+    return slope, corr
+
+
+def compute_signals(batch: AccountBatch) -> Signals:
+    """All signals for every account in the batch, without per-account Python loops."""
+    n = len(batch.account_ids)
+    idx = batch.v_idx
+    n_videos = np.bincount(idx, minlength=n)
+
+    # Best posting hour: mean views per (account, hour) cell vs. the account mean
+    cell = idx * 24 + batch.v_hour
+    cell_cnt = np.bincount(cell, minlength=n * 24).reshape(n, 24)
+    cell_views = np.bincount(cell, weights=batch.v_views, minlength=n * 24).reshape(n, 24)
+    cell_mean = _ratio(cell_views, cell_cnt)
+    best_hour = cell_mean.argmax(axis=1)
+    overall_mean = _ratio(cell_views.sum(axis=1), n_videos.astype(np.float64))
+    best_hour_lift = _ratio(cell_mean[np.arange(n), best_hour], overall_mean)
+
+    # Engagement trend, expressed as relative change per 30 days
+    slope, _ = _group_slope_and_corr(idx, batch.v_days, batch.v_engagement, n)
+    mean_eng = _ratio(np.bincount(idx, weights=batch.v_engagement, minlength=n), n_videos.astype(np.float64))
+    engagement_trend = _ratio(slope * 30.0, mean_eng)
+
+    # Title length vs. log views
+    _, title_corr = _group_slope_and_corr(idx, batch.v_title_len, np.log1p(batch.v_views), n)
+
+    # Cadence: gaps between consecutive uploads within each account
+    order = np.lexsort((batch.v_days, idx))
+    s_idx, s_days = idx[order], batch.v_days[order]
+    same = s_idx[1:] == s_idx[:-1]
+    gaps = np.diff(s_days)[same]
+    gap_idx = s_idx[1:][same]
+    mean_gap = _ratio(np.bincount(gap_idx, weights=gaps, minlength=n), np.bincount(gap_idx, minlength=n).astype(np.float64))
+    max_gap = np.zeros(n)
+    np.maximum.at(max_gap, gap_idx, gaps)
+    last_upload = np.full(n, -np.inf)
+    np.maximum.at(last_upload, idx, batch.v_days)
+    days_since_upload = np.where(np.isfinite(last_upload), -last_upload, np.inf)
+
+    # Subscriber growth: last vs. first snapshot in the window
+    growth = np.zeros(n)
+    if len(batch.s_idx):
+        order = np.lexsort((batch.s_days, batch.s_idx))
+        g_idx, g_subs = batch.s_idx[order], batch.s_subs[order]
+        starts = np.flatnonzero(np.r_[True, g_idx[1:] != g_idx[:-1]])
+        ends = np.r_[starts[1:], len(g_idx)] - 1
+        first, last = g_subs[starts], g_subs[ends]
+        growth[g_idx[starts]] = _ratio(last - first, np.maximum(first, 1.0))
+
+    return Signals(
+        n_videos=n_videos,
+        best_hour=best_hour,
+        best_hour_lift=best_hour_lift,
+        engagement_trend=engagement_trend,
+        title_corr=title_corr,
+        mean_gap_days=mean_gap,
+        max_gap_days=max_gap,
+        days_since_upload=days_since_upload,
+        subscriber_growth=growth,
+    )
+
+
+def _format_hour(hour: int) -> str:
+    suffix = "AM" if hour < 12 else "PM"
+    return f"{hour % 12 or 12} {suffix}"
+
+
+def build_insights(batch: AccountBatch, signals: Signals) -> dict[int, list[tuple[str, str, str, str]]]:
+    """account_id -> [(insight_type, title, content, priority)], strongest first."""
+    out: dict[int, list[tuple[str, str, str, str]]] = {}
+    enough = signals.n_videos >= MIN_VIDEOS
+    for i, account_id in enumerate(batch.account_ids.tolist()):
+        items = []
+        if enough[i] and signals.best_hour_lift[i] >= BEST_HOUR_MIN_LIFT:
+            hour = _format_hour(int(signals.best_hour[i]))
+            lift = signals.best_hour_lift[i]
+            items.append((
+                "posting_time", f"Post around {hour}",
+                f"Videos published around {hour} (UTC) average {lift:.1f}x your channel's typical views.",
+                "high" if lift >= 2 else "medium",
+            ))
+        if enough[i] and abs(signals.engagement_trend[i]) >= ENGAGEMENT_TREND_MIN:
+            pct = signals.engagement_trend[i] * 100
+            if pct < 0:
+                items.append((
+                    "engagement", "Your engagement is dropping",
+                    f"Likes and comments per view are falling about {-pct:.0f}% per month across recent uploads. "
+                    "Try a question or call to action early in the video.",
+                    "high" if pct <= -25 else "medium",
+                ))
+            else:
+                items.append((
+                    "engagement", "Engagement is climbing",
+                    f"Likes and comments per view are up about {pct:.0f}% per month. Keep doing what your latest videos do.",
+                    "low",
+                ))
+        if enough[i] and abs(signals.title_corr[i]) >= TITLE_CORR_MIN:
+            shorter = signals.title_corr[i] < 0
+            items.append((
+                "titles", "Try shorter titles" if shorter else "Try more descriptive titles",
+                f"On your channel, {'shorter' if shorter else 'longer'} titles go with more views "
+                f"(correlation {signals.title_corr[i]:+.2f}).",
+                "medium",
+            ))
+        if signals.n_videos[i] >= 2:
+            since, typical = signals.days_since_upload[i], signals.mean_gap_days[i]
+            if since > max(7.0, 2 * typical):
+                items.append((
+                    "consistency", "Time for a new upload",
+                    f"It's been {since:.0f} days since your last video; you usually post every {typical:.0f} days.",
+                    "high",
+                ))
+            elif signals.max_gap_days[i] > max(21.0, 3 * typical):
+                items.append((
+                    "consistency", "Post consistently",
+                    f"Your longest break between uploads was {signals.max_gap_days[i]:.0f} days. "
+                    "Steadier schedules tend to grow faster.",
+                    "medium",
+                ))
+        growth = signals.subscriber_growth[i] * 100
+        if growth <= -1:
+            items.append((
+                "growth", "Subscribers are slipping",
+                f"You lost {-growth:.1f}% of subscribers over the last {SNAPSHOT_WINDOW_DAYS} days.",
+                "high",
+            ))
+        elif growth >= 5:
+            items.append((
+                "growth", "Strong subscriber growth",
+                f"Subscribers grew {growth:.1f}% over the last {SNAPSHOT_WINDOW_DAYS} days.",
+                "low",
+            ))
+        if items:
+            items.sort(key=lambda it: PRIORITY_ORDER[it[3]])
+            out[account_id] = items
+    return out
+
+
+def insights_for_accounts(session: Session, account_ids: list[int]) -> dict[int, list[tuple[str, str, str, str]]]:
+    """Load, compute and phrase insights for a batch of accounts."""
+    if not account_ids:
+        return {}
+    batch = load_batch(session, account_ids)
+    return build_insights(batch, compute_signals(batch))
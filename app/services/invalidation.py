@@ -0,0 +1,84 @@
+"""
+Cache invalidation driven by ORM commits.
+
+Flushes that touch Video, AnalyticsSnapshot, ConnectedAccount or AIInsight
+record the owning user ids on the session; once the transaction commits, every cache key
+tagged for those users (all period_days variants included) is dropped. Paths
+that write through Core instead of the ORM call mark_accounts_changed.
+Commits made by API requests also pin those users' reads to the primary for
+a few seconds when read replicas are configured (read-your-writes).
+"""
+import asyncio
+import logging
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.models import ConnectedAccount, Video, AnalyticsSnapshot, AIInsight
+from app.core.config import settings
+from app.utils.redis_client import invalidate_tags, invalidate_tags_sync, mark_recent_writes, user_tag
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "invalidate_user_ids"
+_background: set[asyncio.Task] = set()
+
+
+def mark_users_changed(session: Session, user_ids) -> None:
+    """Invalidate these users' cached analytics when the session commits."""
+    session.info.setdefault(_PENDING_KEY, set()).update(user_ids)
+
+
+def mark_accounts_changed(session: Session, account_ids) -> None:
+    """Like mark_users_changed, resolving owners of the given connected accounts."""
+    account_ids = set(account_ids)
+    if not account_ids:
+        return
+    user_ids = session.connection().execute(
+        select(ConnectedAccount.user_id).where(ConnectedAccount.id.in_(account_ids))
+    ).scalars()
+    mark_users_changed(session, user_ids)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session: Session, flush_context) -> None:
+    user_ids: set[int] = set()
+    account_ids: set[int] = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, (ConnectedAccount, AIInsight)):
+            user_ids.add(obj.user_id)
+        elif isinstance(obj, (Video, AnalyticsSnapshot)):
+            account_ids.add(obj.connected_account_id)
+    if user_ids:
+        mark_users_changed(session, user_ids)
+    if account_ids:
+        mark_accounts_changed(session, account_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    user_ids = session.info.pop(_PENDING_KEY, None)
+    if not user_ids:
+        return
+    tags = tuple(user_tag(uid) for uid in user_ids)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        invalidate_tags_sync(*tags)  # Celery / CLI: no event loop
+        return
+    task = loop.create_task(_after_commit(user_ids, tags))
+    # get_db awaits these before the response goes out (read-your-writes for the caller)
+    session.info.setdefault("after_commit_tasks", []).append(task)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def _after_commit(user_ids: set[int], tags: tuple[str, ...]) -> None:
+    if settings.DATABASE_REPLICA_URLS:
+        await mark_recent_writes(user_ids, settings.REPLICA_STICKY_SECONDS)
+    await invalidate_tags(*tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
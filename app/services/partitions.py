@@ -0,0 +1,142 @@
+"""
+PostgreSQL partitioning of analytics_snapshots (SNAPSHOT_PARTITIONING).
+
+    analytics_snapshots                     LIST (period_type)
+      analytics_snapshots_daily             RANGE (snapshot_date), one partition per month
+        analytics_snapshots_daily_y2026m10
+        analytics_snapshots_daily_default   dates no month partition covers yet
+      analytics_snapshots_weekly
+      analytics_snapshots_monthly
+      analytics_snapshots_other             DEFAULT (any other period_type)
+
+Growth and overview queries filter on period_type and snapshot_date, so the
+planner only touches the daily months inside the window. Month partitions are
+created SNAPSHOT_PARTITION_MONTHS_AHEAD in advance by `ensure_partitions`;
+rows that reached the default partition meanwhile are moved into the new
+month. Daily retention detaches and drops whole months
+(`drop_expired_partitions`) instead of deleting rows; a month goes once all
+of it is older than the compaction cutoff, so daily rows may be kept up to a
+month longer than SNAPSHOT_DAILY_RETENTION_DAYS. Weekly and monthly rollups
+are small and stay in one partition each.
+
+The tree is created together with the table (see the model). An existing
+unpartitioned table is left alone and keeps row-DELETE retention; convert it
+by creating the new tree under another name and copying the rows over.
+SQLite always uses the plain table.
+"""
+import logging
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TABLE = "analytics_snapshots"
+DAILY = f"{TABLE}_daily"
+DAILY_DEFAULT = f"{DAILY}_default"
+_MONTH_NAME = re.compile(rf"^{DAILY}_y(\d{{4}})m(\d{{2}})$")
+
+_partitioned: dict[str, bool] = {}  # engine url -> daily rows are month-partitioned
+
+
+def _month_name(month: datetime) -> str:
+    return f"{DAILY}_y{month.year:04d}m{month.month:02d}"
+
+
+def _next_month(month: datetime) -> datetime:
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def _exists(conn: Connection, name: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+
+
+def daily_partitioned(conn: Connection) -> bool:
+    """True when daily snapshots live in month partitions (retention drops partitions, not rows)."""
+    if conn.dialect.name != "postgresql":
+        return False
+    key = str(conn.engine.url)
+    if key not in _partitioned:
+        _partitioned[key] = bool(conn.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:name))"
+        ), {"name": DAILY}).scalar())
+    return _partitioned[key]
+
+
+def create_partition_tree(conn: Connection) -> None:
+    """Sub-tables of a freshly created (empty) partitioned analytics_snapshots."""
+    for ddl in (
+        f"CREATE TABLE {DAILY} PARTITION OF {TABLE} FOR VALUES IN ('daily') PARTITION BY RANGE (snapshot_date)",
+        f"CREATE TABLE {DAILY_DEFAULT} PARTITION OF {DAILY} DEFAULT",
+        f"CREATE TABLE {TABLE}_weekly PARTITION OF {TABLE} FOR VALUES IN ('weekly')",
+        f"CREATE TABLE {TABLE}_monthly PARTITION OF {TABLE} FOR VALUES IN ('monthly')",
+        f"CREATE TABLE {TABLE}_other PARTITION OF {TABLE} DEFAULT",
+    ):
+        conn.exec_driver_sql(ddl)
+    _partitioned[str(conn.engine.url)] = True
+    ensure_partitions(conn)
+
+
+def ensure_partitions(conn: Connection, now: datetime | None = None) -> list[str]:
+    """Create the month partitions from the retention cutoff to MONTHS_AHEAD ahead. Returns new names."""
+    if not daily_partitioned(conn):
+        return []
+    now = now or datetime.utcnow()
+    month = (now - timedelta(days=settings.SNAPSHOT_DAILY_RETENTION_DAYS)).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+    last = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    for _ in range(settings.SNAPSHOT_PARTITION_MONTHS_AHEAD):
+        last = _next_month(last)
+
+    created = []
+    while month <= last:
+        name, upper = _month_name(month), _next_month(month)
+        if not _exists(conn, name):
+            bounds = {"lo": month, "hi": upper}
+            # Attach refuses while the default partition holds rows of the range: move them first
+            conn.exec_driver_sql(f"CREATE TABLE {name} (LIKE {DAILY} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+            conn.execute(text(
+                f"WITH moved AS (DELETE FROM {DAILY_DEFAULT} WHERE snapshot_date >= :lo AND snapshot_date < :hi"
+                f" RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+            ), bounds)
+            conn.exec_driver_sql(
+                f"ALTER TABLE {DAILY} ATTACH PARTITION {name} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+            )
+            created.append(name)
+        month = upper
+    if created:
+        logger.info("Created snapshot partitions: %s", ", ".join(created))
+    return created
+
+
+def drop_expired_partitions(conn: Connection, cutoff: datetime) -> list[str]:
+    """
+    Drop the month partitions entirely before `cutoff` (compaction's daily
+    retention cutoff; run after compaction has rolled them up). Returns the
+    dropped names.
+    """
+    if not daily_partitioned(conn):
+        return []
+    children = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:parent)"
+    ), {"parent": DAILY}).scalars().all()
+
+    dropped = []
+    for name in sorted(children):
+        match = _MONTH_NAME.match(name)
+        if match and _next_month(datetime(int(match[1]), int(match[2]), 1)) <= cutoff:
+            conn.exec_driver_sql(f"ALTER TABLE {DAILY} DETACH PARTITION {name}")
+            conn.exec_driver_sql(f"DROP TABLE {name}")
+            dropped.append(name)
+    # Stragglers from before the first month partition
+    conn.execute(text(f"DELETE FROM {DAILY_DEFAULT} WHERE snapshot_date < :cutoff"), {"cutoff": cutoff})
+    if dropped:
+        logger.info("Dropped expired snapshot partitions: %s", ", ".join(dropped))
+    return dropped
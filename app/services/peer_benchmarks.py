@@ -0,0 +1,231 @@
+"""
+Peer benchmarking: where a channel stands among channels of similar size.
+
+For every account the job derives three metrics from its rollup and recent
+snapshots (no video scans): average views per video, engagement rate
+((likes + comments) / views) and 30-day subscriber growth. Each value is
+counted in a DDSketch for its cohort (subscriber band) and in the "all"
+sketch, and remembered in peer_metric_values. Runs are incremental: only
+accounts whose rollup changed since the last run are recomputed, and a
+changed value is removed from the sketches before the new one is added.
+`rebuild_sketches` recounts everything from peer_metric_values (e.g. weekly,
+to drop deleted accounts). Reading a channel's percentiles costs two indexed
+queries and a bucket walk, independent of the number of channels.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.database import dialect_insert
+from app.models import AnalyticsSnapshot, ChannelRollup, PeerMetricValue, PeerSketch
+from app.services.sketches import DDSketch
+
+logger = logging.getLogger(__name__)
+
+METRICS = ("avg_views", "engagement_rate", "subscriber_growth_30d")
+ALL_COHORT = "all"
+# (upper bound of subscriber count, cohort name)
+COHORTS = ((1_000, "<1k"), (10_000, "1k-10k"), (100_000, "10k-100k"), (1_000_000, "100k-1M"), (None, "1M+"))
+GROWTH_WINDOW_DAYS = 30
+
+
+def cohort_for(subscribers: int) -> str:
+    for upper, name in COHORTS:
+        if upper is None or subscribers < upper:
+            return name
+    return COHORTS[-1][1]
+
+
+def compute_metrics(session: Session, account_ids: list[int], now: datetime | None = None) -> dict[int, tuple]:
+    """account_id -> (cohort, {metric: value}) for accounts with a rollup; undefined metrics are left out."""
+    now = now or datetime.utcnow()
+    rollups = session.execute(
+        select(ChannelRollup).where(ChannelRollup.connected_account_id.in_(account_ids))
+    ).scalars().all()
+
+    # First and last daily subscriber count inside the growth window
+    window: dict[int, list[int]] = {}
+    for account_id, subscribers in session.execute(
+        select(AnalyticsSnapshot.connected_account_id, AnalyticsSnapshot.subscriber_count)
+        .where(
+            AnalyticsSnapshot.connected_account_id.in_(account_ids),
+            AnalyticsSnapshot.period_type == "daily",
+            AnalyticsSnapshot.snapshot_date >= now - timedelta(days=GROWTH_WINDOW_DAYS),
+            AnalyticsSnapshot.snapshot_date <= now,
+        )
+        .order_by(AnalyticsSnapshot.connected_account_id, AnalyticsSnapshot.snapshot_date)
+    ):
+        ends = window.setdefault(account_id, [int(subscribers or 0)] * 2)
+        ends[1] = int(subscribers or 0)
+
+    out = {}
+    for r in rollups:
+        values = {}
+        if r.total_videos:
+            values["avg_views"] = r.total_views / r.total_videos
+        if r.total_views:
+            values["engagement_rate"] = (r.total_likes + r.total_comments) / r.total_views
+        first, last = window.get(r.connected_account_id, (0, 0))
+        if first:
+            values["subscriber_growth_30d"] = (last - first) / first
+        out[r.connected_account_id] = (cohort_for(int(r.subscriber_count or 0)), values)
+    return out
+
+
+def _load_sketches(session: Session) -> dict[tuple[str, str], DDSketch]:
+    # FOR UPDATE serializes concurrent runs on PostgreSQL (no-op on SQLite)
+    rows = session.execute(select(PeerSketch).with_for_update()).scalars().all()
+    return {(r.metric, r.cohort): DDSketch.from_bytes(r.sketch) for r in rows}
+
+
+def _save_sketches(session: Session, sketches: dict[tuple[str, str], DDSketch], keys) -> None:
+    now = datetime.utcnow()
+    rows = [
+        {"metric": m, "cohort": c, "count": sketch.count, "sketch": sketch.to_bytes(), "updated_at": now}
+        for (m, c), sketch in ((key, sketches[key]) for key in keys)
+    ]
+    if rows:
+        stmt = dialect_insert(session.connection(), PeerSketch.__table__)
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=["metric", "cohort"],
+            set_={c: stmt.excluded[c] for c in ("count", "sketch", "updated_at")},
+        ), rows)
+
+
+def update_accounts(session: Session, account_ids: list[int]) -> int:
+    """Recompute the accounts' metrics and move changed values between sketches. The caller commits."""
+    sketches = _load_sketches(session)
+    stored = {
+        (v.connected_account_id, v.metric): (v.cohort, v.value)
+        for v in session.execute(
+            select(PeerMetricValue).where(PeerMetricValue.connected_account_id.in_(account_ids))
+        ).scalars()
+    }
+    computed = compute_metrics(session, account_ids)
+    touched: set[tuple[str, str]] = set()
+    upserts, removals = [], []
+    now = datetime.utcnow()
+    for account_id in account_ids:
+        cohort, values = computed.get(account_id, (None, {}))
+        for metric in METRICS:
+            before = stored.get((account_id, metric))
+            after = (cohort, values[metric]) if metric in values else None
+            if before == after:
+                continue
+            for state, count in ((before, -1), (after, 1)):
+                if state is None:
+                    continue
+                for c in (state[0], ALL_COHORT):
+                    sketches.setdefault((metric, c), DDSketch()).add(state[1], count)
+                    touched.add((metric, c))
+            if after is None:
+                removals.append((account_id, metric))
+            else:
+                upserts.append({
+                    "connected_account_id": account_id, "metric": metric,
+                    "cohort": after[0], "value": after[1], "updated_at": now,
+                })
+
+    if upserts:
+        stmt = dialect_insert(session.connection(), PeerMetricValue.__table__)
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=["connected_account_id", "metric"],
+            set_={c: stmt.excluded[c] for c in ("cohort", "value", "updated_at")},
+        ), upserts)
+    for account_id, metric in removals:
+        session.execute(delete(PeerMetricValue).where(
+            PeerMetricValue.connected_account_id == account_id, PeerMetricValue.metric == metric,
+        ))
+    _save_sketches(session, sketches, touched)
+    return len(upserts) + len(removals)
+
+
+def iter_changed_account_ids(session: Session, since: datetime | None, batch_size: int):
+    """Yield lists of account ids whose rollup changed at or after `since` (all if None), keyset-paged."""
+    last_id = 0
+    while True:
+        query = (
+            select(ChannelRollup.connected_account_id)
+            .where(ChannelRollup.connected_account_id > last_id)
+            .order_by(ChannelRollup.connected_account_id)
+            .limit(batch_size)
+        )
+        if since is not None:
+            query = query.where(ChannelRollup.updated_at >= since)
+        ids = session.execute(query).scalars().all()
+        if not ids:
+            return
+        last_id = ids[-1]
+        yield ids
+
+
+def rebuild_sketches(session: Session, batch_size: int = 10000) -> int:
+    """Recount every sketch from peer_metric_values. The caller commits."""
+    fresh: dict[tuple[str, str], DDSketch] = {}
+    last = (0, "")
+    while True:
+        rows = session.execute(
+            select(
+                PeerMetricValue.connected_account_id, PeerMetricValue.metric,
+                PeerMetricValue.cohort, PeerMetricValue.value,
+            )
+            .where(
+                (PeerMetricValue.connected_account_id > last[0])
+                | ((PeerMetricValue.connected_account_id == last[0]) & (PeerMetricValue.metric > last[1]))
+            )
+            .order_by(PeerMetricValue.connected_account_id, PeerMetricValue.metric)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        by_key: dict[tuple[str, str], list[float]] = {}
+        for _, metric, cohort, value in rows:
+            by_key.setdefault((metric, cohort), []).append(value)
+            by_key.setdefault((metric, ALL_COHORT), []).append(value)
+        for key, values in by_key.items():
+            fresh.setdefault(key, DDSketch()).add_many(values)
+        last = (rows[-1][0], rows[-1][1])
+
+    session.execute(delete(PeerSketch))
+    _save_sketches(session, fresh, fresh.keys())
+    return sum(s.count for (m, c), s in fresh.items() if c == ALL_COHORT)
+
+
+async def account_percentiles(db: AsyncSession, account_id: int) -> tuple[str | None, list[dict]]:
+    """The account's cohort and, per metric, its value, percentiles and cohort quantiles."""
+    values = {
+        v.metric: v for v in (
+            await db.execute(select(PeerMetricValue).where(PeerMetricValue.connected_account_id == account_id))
+        ).scalars()
+    }
+    if not values:
+        return None, []
+    cohort = next(iter(values.values())).cohort
+    sketches = {
+        (r.metric, r.cohort): DDSketch.from_bytes(r.sketch)
+        for r in (
+            await db.execute(select(PeerSketch).where(PeerSketch.cohort.in_((cohort, ALL_COHORT))))
+        ).scalars()
+    }
+    out = []
+    for metric in METRICS:
+        peers, everyone = sketches.get((metric, cohort)), sketches.get((metric, ALL_COHORT))
+        value = values[metric].value if metric in values else None
+
+        def pct(sketch):
+            rank = sketch.rank(value) if sketch is not None and value is not None else None
+            return round(rank * 100, 1) if rank is not None else None
+
+        out.append({
+            "metric": metric,
+            "value": value,
+            "percentile": pct(peers),
+            "overall_percentile": pct(everyone),
+            "cohort_size": peers.count if peers is not None else 0,
+            "cohort_median": peers.quantile(0.5) if peers is not None else None,
+            "cohort_p90": peers.quantile(0.9) if peers is not None else None,
+        })
+    return cohort, out
@@ -0,0 +1,51 @@
+"""
+Stats providers for the sync engine.
+A provider turns a connected account plus the videos we already know into
+fresh counters; `SYNC_PROVIDER` picks the implementation.
+"""
+from datetime import datetime
+from typing import NamedTuple, Protocol, Sequence
+
+from app.core.config import settings
+
+
+class VideoRef(NamedTuple):
+    """A stored video as the provider sees it (current counters included)."""
+    external_id: str
+    view_count: int
+    like_count: int
+    comment_count: int
+
+
+class VideoStats(NamedTuple):
+    """Fresh counters for one video."""
+    external_id: str
+    view_count: int
+    like_count: int
+    comment_count: int
+
+
+class VideoStatsProvider(Protocol):
+    """Source of video/channel statistics (YouTube Data API, mock, ...)."""
+
+    def fetch_video_stats(
+        self, channel_id: str | None, videos: Sequence[VideoRef], since: datetime | None
+    ) -> list[VideoStats]:
+        """
+        Counters for the given videos. Providers with a change feed may return only
+        videos that changed after `since` (None = first sync, return everything).
+        """
+        ...
+
+    def fetch_subscriber_count(self, channel_id: str | None, current: int) -> int:
+        """Current subscriber count for the channel."""
+        ...
+
+
+def get_provider(name: str | None = None) -> VideoStatsProvider:
+    """Provider instance for `name` (defaults to settings.SYNC_PROVIDER)."""
+    name = name or settings.SYNC_PROVIDER
+    if name == "mock":
+        from app.services.youtube_mock import MockYouTubeProvider
+        return MockYouTubeProvider()
+    raise ValueError(f"Unknown sync provider: {name}")
@@ -0,0 +1,416 @@
+"""
+Per-account rollups maintained incrementally from ORM flushes.
+
+`channel_rollups` holds video totals and the subscriber count of the latest
+daily snapshot for each connected account, so the overview is a primary-key
+read instead of a full aggregate over `videos`. `video_daily_stats` records what each video gained per
+UTC day, so windowed totals are a range scan on (account, bucket_date). The
+counters a video has when first recorded (backfill, first insert) were gained
+at unknown times: they go to the BASELINE_DATE bucket, before every window, so
+windows count only gains recorded since.
+Deltas are applied in the same transaction as the flush that caused them;
+`check_rollups` finds and repairs rollup drift. Accounts without a rollup yet
+are backfilled on first use, once: on PostgreSQL a per-account advisory lock
+makes concurrent first requests wait for the one doing it.
+
+Run a consistency check from the command line:
+    python -m app.services.rollups [--repair]
+"""
+import logging
+from datetime import date, datetime
+
+from sqlalchemy import and_, event, select, update, delete, func, inspect, or_, text
+from sqlalchemy.orm import Session
+
+from app.core.database import dialect_insert
+from app.models import ConnectedAccount, Video, AnalyticsSnapshot, ChannelRollup, VideoDailyStat
+
+logger = logging.getLogger(__name__)
+
+_COUNTERS = ("view_count", "like_count", "comment_count")
+# Bucket of the counters a video had when first recorded: lifetime sums include it, windows never do
+BASELINE_DATE = date(1970, 1, 1)
+_BACKFILL_LOCK = 0x524F4C4C  # pg_advisory_xact_lock(_BACKFILL_LOCK, account_id)
+
+
+def _counter_delta(obj, attr: str) -> int | None:
+    """Change of a counter since load. None if the old value is unknown."""
+    hist = inspect(obj).attrs[attr].history
+    if not hist.added:
+        return 0
+    if not hist.deleted:
+        return None  # attribute was expired/unloaded when set
+    return int(hist.added[0] or 0) - int(hist.deleted[0] or 0)
+
+
+def rebuild_rollup(session: Session, account_id: int) -> None:
+    """Recompute one account's rollup from source tables and upsert it."""
+    conn = session.connection()
+    totals = conn.execute(
+        select(
+            func.coalesce(func.sum(Video.view_count), 0),
+            func.coalesce(func.sum(Video.like_count), 0),
+            func.coalesce(func.sum(Video.comment_count), 0),
+            func.count(Video.id),
+        ).where(Video.connected_account_id == account_id)
+    ).one()
+    latest = conn.execute(
+        select(AnalyticsSnapshot.subscriber_count, AnalyticsSnapshot.snapshot_date)
+        .where(
+            AnalyticsSnapshot.connected_account_id == account_id,
+            AnalyticsSnapshot.period_type == "daily",
+            AnalyticsSnapshot.snapshot_date <= datetime.utcnow(),
+        )
+        .order_by(AnalyticsSnapshot.snapshot_date.desc())
+        .limit(1)
+    ).first()
+    values = {
+        "total_views": int(totals[0]),
+        "total_likes": int(totals[1]),
+        "total_comments": int(totals[2]),
+        "total_videos": int(totals[3]),
+        "subscriber_count": int(latest[0] or 0) if latest else 0,
+        "latest_snapshot_date": latest[1] if latest else None,
+        "updated_at": datetime.utcnow(),
+    }
+    stmt = dialect_insert(conn, ChannelRollup.__table__).values(connected_account_id=account_id, **values)
+    conn.execute(stmt.on_conflict_do_update(index_elements=["connected_account_id"], set_=values))
+
+
+def add_daily_stats(session: Session, rows: list[dict]) -> None:
+    """
+    Add increments into video_daily_stats.
+    Each row: video_id, connected_account_id, bucket_date, views, likes, comments.
+    """
+    if not rows:
+        return
+    conn = session.connection()
+    stmt = dialect_insert(conn, VideoDailyStat.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["video_id", "bucket_date"],
+        set_={
+            "views": VideoDailyStat.views + stmt.excluded.views,
+            "likes": VideoDailyStat.likes + stmt.excluded.likes,
+            "comments": VideoDailyStat.comments + stmt.excluded.comments,
+        },
+    )
+    conn.execute(stmt, rows)
+
+
+def rebuild_daily_stats(session: Session, account_id: int) -> None:
+    """
+    Backfill an account's buckets from current video counters.
+    Per-day history is unknown, so each video's totals are its baseline.
+    """
+    conn = session.connection()
+    conn.execute(delete(VideoDailyStat).where(VideoDailyStat.connected_account_id == account_id))
+    rows = [
+        {
+            "video_id": v.id,
+            "connected_account_id": account_id,
+            "bucket_date": BASELINE_DATE,
+            "views": int(v.view_count or 0),
+            "likes": int(v.like_count or 0),
+            "comments": int(v.comment_count or 0),
+        }
+        for v in conn.execute(
+            select(Video.id, Video.view_count, Video.like_count, Video.comment_count)
+            .where(Video.connected_account_id == account_id)
+        )
+    ]
+    add_daily_stats(session, rows)
+
+
+def _claim_backfill(session: Session, account_id: int) -> bool:
+    """
+    Serialize backfills of one account until commit. False if another
+    transaction created its rollup meanwhile; rebuilding again would add the
+    daily buckets a second time.
+    """
+    conn = session.connection()
+    if conn.dialect.name != "postgresql":
+        return True  # SQLite runs one write transaction at a time
+    conn.execute(text("SELECT pg_advisory_xact_lock(:ns, :id)"), {"ns": _BACKFILL_LOCK, "id": account_id})
+    return conn.execute(
+        select(ChannelRollup.connected_account_id).where(ChannelRollup.connected_account_id == account_id)
+    ).first() is None
+
+
+def backfill_account(session: Session, account_id: int) -> None:
+    """Create rollup and daily buckets for an account that predates them (no-op if already done)."""
+    if _claim_backfill(session, account_id):
+        rebuild_daily_stats(session, account_id)
+        rebuild_rollup(session, account_id)
+
+
+def windowed_totals(account_id: int, since: date):
+    """Select (views, likes, comments) an account gained on or after `since` (baselines excluded)."""
+    return select(
+        func.coalesce(func.sum(VideoDailyStat.views), 0).label("views"),
+        func.coalesce(func.sum(VideoDailyStat.likes), 0).label("likes"),
+        func.coalesce(func.sum(VideoDailyStat.comments), 0).label("comments"),
+    ).where(
+        VideoDailyStat.connected_account_id == account_id,
+        VideoDailyStat.bucket_date >= since,
+    )
+
+
+def _bucket_row(video: Video, bucket_date: date, changes) -> dict:
+    views, likes, comments = changes
+    return {
+        "video_id": video.id,
+        "connected_account_id": video.connected_account_id,
+        "bucket_date": bucket_date,
+        "views": views,
+        "likes": likes,
+        "comments": comments,
+    }
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_rollups(session: Session, flush_context) -> None:
+    """Fold this flush's Video/AnalyticsSnapshot changes into channel_rollups and video_daily_stats."""
+    deltas: dict[int, list[int]] = {}  # account_id -> [views, likes, comments, videos]
+    buckets: list[dict] = []  # video_daily_stats increments
+    latest: dict[int, tuple[datetime, int]] = {}  # account_id -> (snapshot_date, subscribers)
+    rebuild: set[int] = set()
+    removed: set[int] = set()
+    dropped_videos: set[int] = set()
+    now = datetime.utcnow()
+
+    for obj in session.deleted:
+        if isinstance(obj, ConnectedAccount):
+            removed.add(obj.id)
+
+    for obj in session.new:
+        if isinstance(obj, Video):
+            changes = [int(obj.view_count or 0), int(obj.like_count or 0), int(obj.comment_count or 0)]
+            d = deltas.setdefault(obj.connected_account_id, [0, 0, 0, 0])
+            for i, c in enumerate(changes):
+                d[i] += c
+            d[3] += 1
+            # When the counters a video arrives with were gained is unknown
+            buckets.append(_bucket_row(obj, BASELINE_DATE, changes))
+        elif isinstance(obj, AnalyticsSnapshot) and obj.period_type == "daily" and obj.snapshot_date <= now:
+            cur = latest.get(obj.connected_account_id)
+            if cur is None or obj.snapshot_date >= cur[0]:
+                latest[obj.connected_account_id] = (obj.snapshot_date, int(obj.subscriber_count or 0))
+        elif isinstance(obj, ConnectedAccount):
+            rebuild.add(obj.id)
+
+    for obj in session.dirty:
+        if isinstance(obj, Video):
+            if inspect(obj).attrs.connected_account_id.history.has_changes():
+                rebuild.update(v for v in inspect(obj).attrs.connected_account_id.history.sum() if v)
+                continue
+            changes = [_counter_delta(obj, attr) for attr in _COUNTERS]
+            if None in changes:
+                rebuild.add(obj.connected_account_id)
+                continue
+            if any(changes):
+                d = deltas.setdefault(obj.connected_account_id, [0, 0, 0, 0])
+                for i, c in enumerate(changes):
+                    d[i] += c
+                buckets.append(_bucket_row(obj, now.date(), changes))
+        elif isinstance(obj, AnalyticsSnapshot):
+            # Editing or re-dating a snapshot may demote the current latest one.
+            rebuild.add(obj.connected_account_id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Video):
+            dropped_videos.add(obj.id)
+            d = deltas.setdefault(obj.connected_account_id, [0, 0, 0, 0])
+            d[0] -= int(obj.view_count or 0)
+            d[1] -= int(obj.like_count or 0)
+            d[2] -= int(obj.comment_count or 0)
+            d[3] -= 1
+        elif isinstance(obj, AnalyticsSnapshot):
+            rebuild.add(obj.connected_account_id)
+
+    apply_changes(session, deltas, buckets, latest, rebuild, removed, dropped_videos)
+
+
+def apply_changes(
+    session: Session,
+    deltas: dict[int, list[int]],
+    buckets: list[dict],
+    latest: dict[int, tuple[datetime, int]],
+    rebuild: set[int] = frozenset(),
+    removed: set[int] = frozenset(),
+    dropped_videos: set[int] = frozenset(),
+) -> None:
+    """
+    Apply video/snapshot changes to rollups and daily buckets.
+
+    deltas: account_id -> [views, likes, comments, videos] to add.
+    buckets: video_daily_stats increments (see add_daily_stats).
+    latest: account_id -> (snapshot_date, subscribers) of the newest snapshot written.
+    rebuild / removed / dropped_videos: accounts to recompute, deleted accounts, deleted video ids.
+    Used by the flush hook and by Core bulk writers (app.services.ingest).
+    """
+    if not (deltas or buckets or latest or rebuild or removed or dropped_videos):
+        return
+    now = datetime.utcnow()
+    rebuild = set(rebuild)
+    conn = session.connection()
+    if removed:
+        conn.execute(delete(ChannelRollup).where(ChannelRollup.connected_account_id.in_(removed)))
+        conn.execute(delete(VideoDailyStat).where(VideoDailyStat.connected_account_id.in_(removed)))
+    if dropped_videos:
+        conn.execute(delete(VideoDailyStat).where(VideoDailyStat.video_id.in_(dropped_videos)))
+    touched = (set(deltas) | set(latest) | rebuild) - removed
+    if not touched:
+        return
+
+    existing = set(
+        conn.execute(
+            select(ChannelRollup.connected_account_id).where(ChannelRollup.connected_account_id.in_(touched))
+        ).scalars()
+    )
+    # Accounts without a rollup row yet (new, or created before rollups existed)
+    # are rebuilt from source, daily buckets included, unless a concurrent
+    # backfill got there first: then this flush's deltas apply as usual.
+    missing = {account_id for account_id in touched - existing if _claim_backfill(session, account_id)}
+    for account_id in missing:
+        rebuild_daily_stats(session, account_id)
+    add_daily_stats(
+        session,
+        [
+            b for b in buckets
+            if b["connected_account_id"] not in missing
+            and b["connected_account_id"] not in removed
+            and b["video_id"] not in dropped_videos
+        ],
+    )
+
+    rebuild = (rebuild | missing) & touched
+    for account_id in rebuild:
+        rebuild_rollup(session, account_id)
+
+    for account_id, (views, likes, comments, videos) in deltas.items():
+        if account_id in rebuild or account_id in removed:
+            continue
+        conn.execute(
+            update(ChannelRollup)
+            .where(ChannelRollup.connected_account_id == account_id)
+            .values(
+                total_views=ChannelRollup.total_views + views,
+                total_likes=ChannelRollup.total_likes + likes,
+                total_comments=ChannelRollup.total_comments + comments,
+                total_videos=ChannelRollup.total_videos + videos,
+                updated_at=now,
+            )
+        )
+    for account_id, (snapshot_date, subscribers) in latest.items():
+        if account_id in rebuild or account_id in removed:
+            continue
+        conn.execute(
+            update(ChannelRollup)
+            .where(
+                ChannelRollup.connected_account_id == account_id,
+                or_(
+                    ChannelRollup.latest_snapshot_date.is_(None),
+                    ChannelRollup.latest_snapshot_date <= snapshot_date,
+                ),
+            )
+            .values(subscriber_count=subscribers, latest_snapshot_date=snapshot_date, updated_at=now)
+        )
+
+
+def check_rollups(session: Session, repair: bool = False, batch_size: int = 500) -> list[int]:
+    """
+    Compare every rollup with a fresh aggregate, in account-id batches.
+    Returns ids of accounts that drifted (or had no rollup); rebuilds them if repair=True.
+    """
+    drifted: list[int] = []
+    last_id = 0
+    while True:
+        account_ids = session.execute(
+            select(ConnectedAccount.id)
+            .where(ConnectedAccount.id > last_id)
+            .order_by(ConnectedAccount.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not account_ids:
+            break
+        last_id = account_ids[-1]
+
+        actual = {
+            row.account_id: (int(row.views), int(row.likes), int(row.comments), int(row.videos))
+            for row in session.execute(
+                select(
+                    Video.connected_account_id.label("account_id"),
+                    func.coalesce(func.sum(Video.view_count), 0).label("views"),
+                    func.coalesce(func.sum(Video.like_count), 0).label("likes"),
+                    func.coalesce(func.sum(Video.comment_count), 0).label("comments"),
+                    func.count(Video.id).label("videos"),
+                )
+                .where(Video.connected_account_id.in_(account_ids))
+                .group_by(Video.connected_account_id)
+            )
+        }
+        newest = (
+            select(
+                AnalyticsSnapshot.connected_account_id,
+                func.max(AnalyticsSnapshot.snapshot_date).label("snapshot_date"),
+            )
+            .where(
+                AnalyticsSnapshot.connected_account_id.in_(account_ids),
+                AnalyticsSnapshot.period_type == "daily",
+                AnalyticsSnapshot.snapshot_date <= datetime.utcnow(),
+            )
+            .group_by(AnalyticsSnapshot.connected_account_id)
+            .subquery()
+        )
+        latest = {
+            account_id: (snapshot_date, int(subscribers or 0))
+            for account_id, snapshot_date, subscribers in session.execute(
+                select(
+                    AnalyticsSnapshot.connected_account_id, AnalyticsSnapshot.snapshot_date,
+                    AnalyticsSnapshot.subscriber_count,
+                )
+                .join(newest, and_(
+                    AnalyticsSnapshot.connected_account_id == newest.c.connected_account_id,
+                    AnalyticsSnapshot.snapshot_date == newest.c.snapshot_date,
+                ))
+                .where(AnalyticsSnapshot.period_type == "daily")
+            )
+        }
+        stored = {
+            r.connected_account_id: r
+            for r in session.execute(
+                select(ChannelRollup).where(ChannelRollup.connected_account_id.in_(account_ids))
+            ).scalars()
+        }
+        for account_id in account_ids:
+            r = stored.get(account_id)
+            expected = actual.get(account_id, (0, 0, 0, 0))
+            if (
+                r is None
+                or (r.total_views, r.total_likes, r.total_comments, r.total_videos) != expected
+                or (r.latest_snapshot_date, r.subscriber_count) != latest.get(account_id, (None, 0))
+            ):
+                drifted.append(account_id)
+                if repair:
+                    rebuild_rollup(session, account_id)
+        if repair:
+            session.commit()
+        session.expunge_all()
+
+    if drifted:
+        logger.warning("Rollup drift on %d accounts%s", len(drifted), " (repaired)" if repair else "")
+    return drifted
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from app.tasks.db import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Check channel_rollups against source tables.")
+    parser.add_argument("--repair", action="store_true", help="rebuild drifted rollups")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    with SessionLocal() as db:
+        ids = check_rollups(db, repair=args.repair)
+    print(f"{len(ids)} drifted account(s){': ' + ', '.join(map(str, ids)) if ids else ''}")
@@ -0,0 +1,111 @@
+"""
+In-place upgrade of tables created by older versions.
+
+There are no migrations: `Base.metadata.create_all` creates missing tables but
+never alters existing ones, so an older database lacks the unique constraints
+the bulk upserts rely on (ON CONFLICT needs a matching constraint) and the
+indexes added since. `upgrade_schema` runs after create_all at startup and
+adds what is missing. Before a unique constraint is added, duplicate rows are
+deleted (the highest id of each group is kept) and the rollups and daily
+buckets of the accounts involved are rebuilt.
+
+Index builds block writes to the table while they run. On large tables,
+create the index beforehand with CREATE INDEX CONCURRENTLY under the model's
+name; this step then skips it.
+
+Run it without starting the API:
+    python -m app.services.schema_upgrade
+"""
+import logging
+
+from sqlalchemy import Table, UniqueConstraint, delete, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import AddConstraint
+
+from app.core.database import Base
+from app.services.rollups import rebuild_daily_stats, rebuild_rollup
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_xact_lock key: one worker upgrades, the others wait and then find nothing to do
+_LOCK_KEY = 0x5C4E3A
+
+def _delete_duplicates(conn: Connection, table: Table, columns: list) -> set[int]:
+    """Delete every row that has a newer duplicate on `columns`. Returns the accounts involved."""
+    newer = table.alias("newer")
+    doomed = (
+        select(newer.c.id)
+        .where(*(newer.c[c.name] == c for c in columns), newer.c.id > table.c.id)
+        .exists()
+    )
+    accounts = set()
+    if "connected_account_id" in table.c:
+        accounts = set(conn.execute(select(table.c.connected_account_id).where(doomed).distinct()).scalars())
+    removed = conn.execute(delete(table).where(doomed)).rowcount or 0
+    if removed:
+        logger.warning("Removed %d duplicate rows from %s", removed, table.name)
+    return accounts
+
+
+def _add_unique(conn: Connection, constraint: UniqueConstraint) -> None:
+    if conn.dialect.name != "sqlite":
+        conn.execute(AddConstraint(constraint))
+        return
+    # SQLite has no ADD CONSTRAINT; a unique index serves ON CONFLICT the same way
+    quote = conn.dialect.identifier_preparer.quote
+    columns = ", ".join(quote(c.name) for c in constraint.columns)
+    conn.exec_driver_sql(
+        f"CREATE UNIQUE INDEX {quote(constraint.name)} ON {quote(constraint.table.name)} ({columns})"
+    )
+
+
+def upgrade_schema(conn: Connection) -> list[str]:
+    """
+    Add the models' unique constraints and indexes missing from existing
+    tables. Returns the names added.
+    """
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY})
+    inspector = inspect(conn)
+    existing = set(inspector.get_table_names())
+    added: list[str] = []
+    accounts: set[int] = set()
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            continue
+        present = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        present |= {uc["name"] for uc in inspector.get_unique_constraints(table.name)}
+        for constraint in table.constraints:
+            if isinstance(constraint, UniqueConstraint) and constraint.name not in present:
+                if "id" in table.c:
+                    accounts |= _delete_duplicates(conn, table, list(constraint.columns))
+                _add_unique(conn, constraint)
+                added.append(constraint.name)
+        # An index may be declared once per dialect under one name (ddl_if); create skips the others
+        missing = [index for index in table.indexes if index.name not in present]
+        for index in missing:
+            index.create(conn)
+        added += sorted({index.name for index in missing})
+
+    if accounts:
+        session = Session(bind=conn)
+        try:
+            for account_id in sorted(accounts):
+                rebuild_daily_stats(session, account_id)
+                rebuild_rollup(session, account_id)
+        finally:
+            session.close()
+    if added:
+        logger.info("Schema upgraded: added %s", ", ".join(added))
+    return added
+
+
+if __name__ == "__main__":
+    from app.tasks.db import engine
+
+    logging.basicConfig(level=logging.INFO)
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        names = upgrade_schema(conn)
+    print(f"Added {len(names)} constraint(s)/index(es){': ' + ', '.join(names) if names else ''}")
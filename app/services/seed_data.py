@@ -7,7 +7,8 @@ from sqlalchemy import select
 
 from app.core.database import async_session_maker
 from app.models import User, AIInsight
-from app.auth.password import hash_password
+from app.auth.password import hash_password_async
+from app.services.insight_engine import insights_for_accounts
 from app.services.youtube_mock import create_mock_channel
 
 logger = logging.getLogger(__name__)
@@ -41,7 +42,7 @@ async def seed_if_empty():
             logger.info("Creating demo user %s (login: %s / %s)", DEMO_EMAIL, DEMO_EMAIL, DEMO_PASSWORD)
             demo_user = User(
                 email=DEMO_EMAIL,
-                hashed_password=hash_password(DEMO_PASSWORD),
+                hashed_password=await hash_password_async(DEMO_PASSWORD),
                 full_name=DEMO_NAME,
             )
             session.add(demo_user)
@@ -55,10 +56,12 @@ async def seed_if_empty():
 
         # No users existed: full seed (demo + channel + videos + insights)
         logger.info("Seeding full dummy data (channel + videos + insights)...")
-        await create_mock_channel(session, demo_user.id, "Demo Creator Channel")
+        account = await create_mock_channel(session, demo_user.id, "Demo Creator Channel")
         await session.flush()
 
-        for ins_type, title, content, priority in AI_INSIGHTS_DATA:
+        # Insights from the seeded channel's own metrics; canned ones if it has none yet
+        computed = await session.run_sync(lambda s: insights_for_accounts(s, [account.id]))
+        for ins_type, title, content, priority in computed.get(account.id) or AI_INSIGHTS_DATA:
             insight = AIInsight(
                 user_id=demo_user.id,
                 insight_type=ins_type,
@@ -0,0 +1,155 @@
+"""
+Mergeable quantile sketch (DDSketch).
+
+Values are counted in logarithmic buckets: bucket i holds values in
+(gamma^(i-1), gamma^i] with gamma = (1 + a) / (1 - a), so any quantile is
+returned within relative error a (1% by default) whatever the distribution,
+with about a thousand buckets covering 1 to 10^9. Negative values use a
+mirrored store and values near zero a plain counter. Sketches merge by adding
+bucket counts, and unlike t-digest or KLL a value can be removed again by
+subtracting its count, which is what lets peer sketches follow a channel's
+metric as it changes without a rebuild.
+"""
+import math
+import zlib
+
+import numpy as np
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+_MIN_INDEXABLE = 1e-9  # |values| below this count as zero
+_FORMAT_VERSION = 1
+
+
+class DDSketch:
+    __slots__ = ("relative_accuracy", "gamma", "_log_gamma", "positive", "negative", "zero_count")
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive: dict[int, int] = {}
+        self.negative: dict[int, int] = {}  # keyed by the index of -value
+        self.zero_count = 0
+
+    # --- Updates ------------------------------------------------------------------
+
+    def _index(self, magnitude: float) -> int:
+        return math.ceil(math.log(magnitude) / self._log_gamma)
+
+    def _bucket_value(self, index: int) -> float:
+        """Value reported for a bucket: within relative_accuracy of everything in it."""
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Count a value `count` times (a negative count removes it)."""
+        if value > _MIN_INDEXABLE:
+            store, key = self.positive, self._index(value)
+        elif value < -_MIN_INDEXABLE:
+            store, key = self.negative, self._index(-value)
+        else:
+            self.zero_count += count
+            return
+        n = store.get(key, 0) + count
+        if n > 0:
+            store[key] = n
+        else:
+            store.pop(key, None)
+
+    def remove(self, value: float) -> None:
+        self.add(value, -1)
+
+    def add_many(self, values) -> None:
+        """Vectorized add of many values."""
+        values = np.asarray(values, dtype=np.float64)
+        for store, magnitudes in (
+            (self.positive, values[values > _MIN_INDEXABLE]),
+            (self.negative, -values[values < -_MIN_INDEXABLE]),
+        ):
+            if len(magnitudes):
+                indexes = np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+                keys, counts = np.unique(indexes, return_counts=True)
+                for key, n in zip(keys.tolist(), counts.tolist()):
+                    store[key] = store.get(key, 0) + n
+        self.zero_count += int(np.count_nonzero(np.abs(values) <= _MIN_INDEXABLE))
+
+    def merge(self, other: "DDSketch") -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for mine, theirs in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, n in theirs.items():
+                mine[key] = mine.get(key, 0) + n
+        self.zero_count += other.zero_count
+
+    # --- Queries ------------------------------------------------------------------
+
+    @property
+    def count(self) -> int:
+        return sum(self.positive.values()) + sum(self.negative.values()) + self.zero_count
+
+    def rank(self, value: float) -> float | None:
+        """Fraction of counted values below `value` (values in the same bucket count half)."""
+        total = self.count
+        if not total:
+            return None
+        negatives = sum(self.negative.values())
+        if value > _MIN_INDEXABLE:
+            key = self._index(value)
+            below = negatives + self.zero_count + sum(n for k, n in self.positive.items() if k < key)
+            equal = self.positive.get(key, 0)
+        elif value < -_MIN_INDEXABLE:
+            key = self._index(-value)
+            below = sum(n for k, n in self.negative.items() if k > key)
+            equal = self.negative.get(key, 0)
+        else:
+            below, equal = negatives, self.zero_count
+        return (below + equal / 2) / total
+
+    def quantile(self, q: float) -> float | None:
+        """Approximate q-quantile (0 <= q <= 1), None if the sketch is empty."""
+        total = self.count
+        if not total:
+            return None
+        target = q * (total - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > target:
+                return -self._bucket_value(key)
+        seen += self.zero_count
+        if seen > target:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > target:
+                return self._bucket_value(key)
+        return self._bucket_value(max(self.positive)) if self.positive else 0.0
+
+    # --- Storage ------------------------------------------------------------------
+
+    def to_bytes(self) -> bytes:
+        """Compact form: bucket keys and counts as int64 arrays, zlib-compressed."""
+        header = [_FORMAT_VERSION, len(self.positive), len(self.negative), self.zero_count]
+        parts = [np.array(header, dtype=np.int64)]
+        for store in (self.positive, self.negative):
+            keys = sorted(store)
+            parts.append(np.array(keys, dtype=np.int64))
+            parts.append(np.array([store[k] for k in keys], dtype=np.int64))
+        accuracy = np.array([self.relative_accuracy], dtype=np.float64).tobytes()
+        return zlib.compress(accuracy + np.concatenate(parts).tobytes())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "DDSketch":
+        raw = zlib.decompress(data)
+        accuracy = float(np.frombuffer(raw[:8], dtype=np.float64)[0])
+        ints = np.frombuffer(raw[8:], dtype=np.int64)
+        version, n_pos, n_neg, zero_count = ints[:4].tolist()
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported sketch format {version}")
+        sketch = cls(accuracy)
+        offset = 4
+        for store, n in ((sketch.positive, n_pos), (sketch.negative, n_neg)):
+            keys, counts = ints[offset:offset + n], ints[offset + n:offset + 2 * n]
+            store.update(zip(keys.tolist(), counts.tolist()))
+            offset += 2 * n
+        sketch.zero_count = zero_count
+        return sketch
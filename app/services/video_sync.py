@@ -0,0 +1,143 @@
+"""
+Incremental sync of video counters from a stats provider.
+
+Each account is synced in its own transaction: videos are walked by id in
+fixed-size batches (bounded memory), the provider is asked for changes since
+the account's high-water mark, and only rows whose counters differ are
+written, through the bulk upsert path (which also maintains rollups, daily
+buckets and cache invalidation). The account's high-water mark advances only
+when the whole account succeeds.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import ConnectedAccount, Video, AnalyticsSnapshot, AccountSyncState, ChannelRollup
+from app.services.ingest import upsert_videos
+from app.services.providers import VideoRef, VideoStatsProvider
+
+logger = logging.getLogger(__name__)
+
+
+def iter_due_account_ids(session: Session, batch_size: int, min_interval_hours: float):
+    """Yield lists of account ids not synced within min_interval_hours, keyset-paged by id."""
+    cutoff = datetime.utcnow() - timedelta(hours=min_interval_hours)
+    last_id = 0
+    while True:
+        ids = session.execute(
+            select(ConnectedAccount.id)
+            .outerjoin(AccountSyncState, AccountSyncState.connected_account_id == ConnectedAccount.id)
+            .where(
+                ConnectedAccount.id > last_id,
+                or_(AccountSyncState.last_synced_at.is_(None), AccountSyncState.last_synced_at < cutoff),
+            )
+            .order_by(ConnectedAccount.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return
+        last_id = ids[-1]
+        yield ids
+
+
+def _record_snapshot(session: Session, account: ConnectedAccount, provider: VideoStatsProvider) -> None:
+    """Write today's daily snapshot from the (just updated) rollup, once per day."""
+    now = datetime.utcnow()
+    day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    exists = session.execute(
+        select(AnalyticsSnapshot.id).where(
+            AnalyticsSnapshot.connected_account_id == account.id,
+            AnalyticsSnapshot.period_type == "daily",
+            AnalyticsSnapshot.snapshot_date >= day_start,
+        ).limit(1)
+    ).first()
+    if exists:
+        return
+    rollup = session.get(ChannelRollup, account.id)
+    if rollup is None:
+        return
+    session.add(AnalyticsSnapshot(
+        connected_account_id=account.id,
+        snapshot_date=now,
+        period_type="daily",
+        total_views=rollup.total_views,
+        total_likes=rollup.total_likes,
+        total_comments=rollup.total_comments,
+        subscriber_count=provider.fetch_subscriber_count(account.channel_id, int(rollup.subscriber_count)),
+    ))
+
+
+def sync_account(session: Session, account_id: int, provider: VideoStatsProvider, batch_size: int | None = None) -> int:
+    """Sync one account and commit. Returns the number of videos updated."""
+    batch_size = batch_size or settings.SYNC_VIDEO_BATCH
+    account = session.get(ConnectedAccount, account_id)
+    if account is None:
+        return 0
+    state = session.get(AccountSyncState, account_id)
+    if state is None:
+        state = AccountSyncState(connected_account_id=account_id)
+        session.add(state)
+    since = state.last_synced_at
+    started = datetime.utcnow()
+
+    updated = 0
+    last_video_id = 0
+    while True:
+        videos = session.execute(
+            select(Video.id, Video.external_id, Video.view_count, Video.like_count, Video.comment_count)
+            .where(Video.connected_account_id == account_id, Video.id > last_video_id)
+            .order_by(Video.id)
+            .limit(batch_size)
+        ).all()
+        if not videos:
+            break
+        last_video_id = videos[-1].id
+        known = {
+            v.external_id: VideoRef(
+                v.external_id, int(v.view_count or 0), int(v.like_count or 0), int(v.comment_count or 0)
+            )
+            for v in videos
+        }
+        changed = [
+            {
+                "connected_account_id": account_id,
+                "external_id": s.external_id,
+                "view_count": s.view_count,
+                "like_count": s.like_count,
+                "comment_count": s.comment_count,
+            }
+            for s in provider.fetch_video_stats(account.channel_id, list(known.values()), since)
+            if s.external_id in known and tuple(s[1:]) != tuple(known[s.external_id][1:])
+        ]
+        if changed:
+            updated += upsert_videos(session, changed)
+
+    _record_snapshot(session, account, provider)
+    state.last_synced_at = started
+    state.last_error = None
+    state.videos_updated = updated
+    session.commit()
+    return updated
+
+
+def sync_accounts(session: Session, account_ids: list[int], provider: VideoStatsProvider) -> dict:
+    """Sync accounts one transaction each; a failing account is recorded and skipped."""
+    synced = failed = updated = 0
+    for account_id in account_ids:
+        try:
+            updated += sync_account(session, account_id, provider)
+            synced += 1
+        except Exception as e:
+            session.rollback()
+            failed += 1
+            logger.exception("Sync failed for account %s: %s", account_id, e)
+            state = session.get(AccountSyncState, account_id) or AccountSyncState(connected_account_id=account_id)
+            state.last_error = str(e)[:512]
+            session.add(state)
+            session.commit()
+        finally:
+            session.expunge_all()
+    return {"synced": synced, "failed": failed, "videos_updated": updated}
@@ -4,12 +4,15 @@ Used when no real YouTube API is configured.
 """
 import random
 from datetime import datetime, timedelta
-from typing import List
+from typing import List, Sequence
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.models import ConnectedAccount, Video, AnalyticsSnapshot
+from app.services.accounts import get_first_account_id
+from app.services.ingest import upsert_videos, upsert_snapshots
+from app.services.providers import VideoRef, VideoStats
 
 
 def _random_views() -> int:
@@ -48,52 +51,80 @@ async def create_mock_channel(session: AsyncSession, user_id: int, channel_name:
         "Weekly Vlog #1",
         "Top 10 Tips for Growth",
     ]
+    videos = []
     for i, title in enumerate(titles[:5]):
         pub = datetime.utcnow() - timedelta(days=random.randint(7, 90))
         v = _random_views()
-        vid = Video(
-            connected_account_id=acc.id,
-            external_id=f"vid_{acc.id}_{i}",
-            title=title,
-            published_at=pub,
-            view_count=v,
-            like_count=_random_likes(v),
-            comment_count=_random_comments(v),
-            duration_seconds=random.randint(180, 1200),
-        )
-        session.add(vid)
+        videos.append({
+            "connected_account_id": acc.id,
+            "external_id": f"vid_{acc.id}_{i}",
+            "title": title,
+            "published_at": pub,
+            "view_count": v,
+            "like_count": _random_likes(v),
+            "comment_count": _random_comments(v),
+            "duration_seconds": random.randint(180, 1200),
+        })
+    await session.run_sync(upsert_videos, videos)
 
     # Create mock daily snapshots for last 30 days
     base_views = random.randint(5000, 20000)
     base_subs = random.randint(100, 5000)
+    snapshots = []
     for d in range(30):
         snap_date = datetime.utcnow() - timedelta(days=d)
         delta = random.randint(-500, 1500)
         total_views = max(0, base_views + d * 200 + delta * 10)
-        total_likes = total_views // 30
-        total_comments = total_views // 100
         subs = base_subs + d * 5 + random.randint(-2, 10)
-        snap = AnalyticsSnapshot(
-            connected_account_id=acc.id,
-            snapshot_date=snap_date,
-            period_type="daily",
-            total_views=total_views,
-            total_likes=total_likes,
-            total_comments=total_comments,
-            subscriber_count=max(0, subs),
-        )
-        session.add(snap)
+        snapshots.append({
+            "connected_account_id": acc.id,
+            "snapshot_date": snap_date,
+            "period_type": "daily",
+            "total_views": total_views,
+            "total_likes": total_views // 30,
+            "total_comments": total_views // 100,
+            "subscriber_count": max(0, subs),
+        })
+    await session.run_sync(upsert_snapshots, snapshots)
 
     await session.flush()
     return acc
 
 
 async def get_first_connected_account(session: AsyncSession, user_id: int) -> ConnectedAccount | None:
-    """Get user's first connected YouTube account."""
-    result = await session.execute(
-        select(ConnectedAccount).where(
-            ConnectedAccount.user_id == user_id,
-            ConnectedAccount.platform == "youtube",
-        ).limit(1)
-    )
-    return result.scalars().first()
+    """Get user's first connected YouTube account (id lookup is cached, see app.services.accounts)."""
+    account_id = await get_first_account_id(session, user_id)
+    return await session.get(ConnectedAccount, account_id) if account_id is not None else None
+
+
+class MockYouTubeProvider:
+    """Local stand-in for the YouTube Data API: grows known counters a little."""
+
+    # Share of videos with new activity per day since the last sync
+    DAILY_ACTIVITY = 0.6
+
+    def fetch_video_stats(
+        self, channel_id: str | None, videos: Sequence[VideoRef], since: datetime | None
+    ) -> list[VideoStats]:
+        """Return only videos that 'changed' since the high-water mark, like a change feed."""
+        if since is None:
+            p_changed = 1.0
+        else:
+            days = max((datetime.utcnow() - since).total_seconds() / 86400, 0.0)
+            p_changed = 1 - (1 - self.DAILY_ACTIVITY) ** days
+        stats = []
+        for v in videos:
+            if random.random() >= p_changed:
+                continue
+            views = v.view_count + random.randint(0, max(1, v.view_count // 50))
+            gained = views - v.view_count
+            stats.append(VideoStats(
+                external_id=v.external_id,
+                view_count=views,
+                like_count=v.like_count + random.randint(0, max(0, gained // 20)),
+                comment_count=v.comment_count + random.randint(0, max(0, gained // 100)),
+            ))
+        return stats
+
+    def fetch_subscriber_count(self, channel_id: str | None, current: int) -> int:
+        return max(0, current + random.randint(-2, 20))
@@ -1,70 +1,161 @@
 """
 Weekly AI insights generator.
-Creates mock suggestions for users who have connected accounts.
+Computes insights from each user's channel metrics (app.services.insight_engine)
+for users who have connected accounts.
 """
 import logging
-import random
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from sqlalchemy import create_engine, select
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import delete, select, insert, func
+from app.core.config import settings
+from app.core.database import dialect_insert
 from app.tasks.celery_app import celery_app
+from app.tasks.db import SessionLocal
+from app.services.insight_engine import PRIORITY_ORDER, insights_for_accounts
+from app.services.invalidation import mark_users_changed
 
-# Use sync engine for Celery (no async in worker)
-from app.core.config import settings
+logger = logging.getLogger(__name__)
 
-# Sync URL: PostgreSQL -> drop asyncpg; SQLite -> drop aiosqlite
-if "asyncpg" in settings.DATABASE_URL:
-    SYNC_DATABASE_URL = settings.DATABASE_URL.replace("+asyncpg", "").replace("postgresql+asyncpg", "postgresql")
-elif "aiosqlite" in settings.DATABASE_URL:
-    SYNC_DATABASE_URL = settings.DATABASE_URL.replace("+aiosqlite", "").replace("sqlite+aiosqlite", "sqlite")
-else:
-    SYNC_DATABASE_URL = settings.DATABASE_URL
+# Checkpoints outlive a weekly run comfortably, then are pruned
+CHECKPOINT_TTL = 8 * 24 * 3600
 
-logger = logging.getLogger(__name__)
+# Insights kept per user per run (strongest first)
+INSIGHTS_PER_USER = 3
 
-# Sync engine for Celery tasks
-engine = create_engine(SYNC_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-SUGGESTIONS = [
-    ("posting_time", "Post at 6PM", "Your audience is most active around 6 PM. Try scheduling posts then."),
-    ("engagement", "Your engagement is dropping", "Consider asking a question in the first 30 seconds to boost comments."),
-    ("titles", "Try shorter titles", "Videos with titles under 50 characters tend to get more clicks."),
-    ("thumbnail", "Update thumbnails", "A/B test thumbnails with faces vs. text to see what performs better."),
-    ("consistency", "Post consistently", "Channels that post at least once a week grow 2x faster."),
-    ("trending", "Use trending topics", "Check trending topics in your niche and create related content."),
-]
+def _default_run_id() -> str:
+    year, week, _ = datetime.utcnow().isocalendar()
+    return f"{year}-W{week:02d}"
 
 
-@celery_app.task(name="app.tasks.ai_tasks.weekly_ai_insights")
-def weekly_ai_insights():
-    """Generate AI insights for all users. Mock: insert random suggestions."""
+def _checkpoint_key(run_id: str, start_id: int | None, end_id: int | None) -> str:
+    return f"ai_insights:checkpoint:{run_id}:{start_id or 0}:{end_id or 'max'}"
+
+
+def _read_checkpoint(db, key: str) -> int:
+    from app.models.task_checkpoint import TaskCheckpoint
+
+    checkpoint = db.get(TaskCheckpoint, key)
+    return checkpoint.last_id if checkpoint else 0
+
+
+def _write_checkpoint(db, key: str, last_id: int) -> None:
+    """Upsert the checkpoint; committed with the chunk, so a crash can't separate the two."""
+    from app.models.task_checkpoint import TaskCheckpoint
+
+    now = datetime.utcnow()
+    stmt = dialect_insert(db.connection(), TaskCheckpoint.__table__).values(name=key, last_id=last_id, updated_at=now)
+    db.execute(stmt.on_conflict_do_update(index_elements=["name"], set_={"last_id": last_id, "updated_at": now}))
+
+
+def _prune_checkpoints(db) -> None:
+    from app.models.task_checkpoint import TaskCheckpoint
+
+    db.execute(delete(TaskCheckpoint).where(
+        TaskCheckpoint.name.startswith("ai_insights:"),
+        TaskCheckpoint.updated_at < datetime.utcnow() - timedelta(seconds=CHECKPOINT_TTL),
+    ))
+
+
+def iter_user_id_chunks(db, chunk_size: int, after_id: int = 0, end_id: int | None = None):
+    """Yield lists of user ids in (after_id, end_id], keyset-paged so each chunk is one short query."""
     from app.models.user import User
+
+    last_id = after_id
+    while True:
+        query = select(User.id).where(User.id > last_id).order_by(User.id).limit(chunk_size)
+        if end_id is not None:
+            query = query.where(User.id <= end_id)
+        ids = db.execute(query).scalars().all()
+        if not ids:
+            return
+        last_id = ids[-1]
+        yield ids
+
+
+def _insight_rows(db, user_ids: list[int]) -> list[dict]:
+    """Insight rows for a chunk of users: one engine pass over all their accounts."""
+    from app.models.connected_account import ConnectedAccount
+
+    owners = db.execute(
+        select(ConnectedAccount.id, ConnectedAccount.user_id).where(ConnectedAccount.user_id.in_(user_ids))
+    ).all()
+    by_account = insights_for_accounts(db, [account_id for account_id, _ in owners])
+    per_user: dict[int, list] = {}
+    for account_id, uid in owners:
+        per_user.setdefault(uid, []).extend(by_account.get(account_id, []))
+
+    now = datetime.utcnow()
+    rows = []
+    for uid, items in per_user.items():
+        items.sort(key=lambda it: PRIORITY_ORDER[it[3]])
+        for ins_type, title, content, priority in items[:INSIGHTS_PER_USER]:
+            rows.append({
+                "user_id": uid,
+                "insight_type": ins_type,
+                "title": title,
+                "content": content,
+                "priority": priority,
+                "is_read": False,
+                "created_at": now,
+            })
+    return rows
+
+
+@celery_app.task(name="app.tasks.ai_tasks.weekly_ai_insights")
+def weekly_ai_insights(start_id: int | None = None, end_id: int | None = None, run_id: str | None = None):
+    """
+    Generate AI insights for users with id in (start_id, end_id] (all users by default).
+    Inserts and commits one chunk at a time, together with a checkpoint of its
+    last user id, so a rerun with the same run_id resumes where it stopped and
+    never inserts a committed chunk twice.
+    """
     from app.models.ai_insight import AIInsight
 
+    run_id = run_id or _default_run_id()
+    key = _checkpoint_key(run_id, start_id, end_id)
+
     db = SessionLocal()
     try:
-        result = db.execute(select(User.id))
-        user_ids = [r[0] for r in result.fetchall()]
-        created = 0
-        for uid in user_ids:
-            ins_type, title, content = random.choice(SUGGESTIONS)
-            insight = AIInsight(
-                user_id=uid,
-                insight_type=ins_type,
-                title=title,
-                content=content,
-                priority=random.choice(["low", "medium", "high"]),
-            )
-            db.add(insight)
-            created += 1
+        _prune_checkpoints(db)
+        after_id = max(_read_checkpoint(db, key), start_id or 0)
         db.commit()
-        logger.info("Weekly AI insights: created %d for %d users", created, len(user_ids))
-        return {"status": "ok", "created": created}
+        created = chunks = 0
+        for user_ids in iter_user_id_chunks(db, settings.AI_INSIGHTS_CHUNK, after_id, end_id):
+            rows = _insight_rows(db, user_ids)
+            if rows:
+                db.execute(insert(AIInsight), rows)
+                mark_users_changed(db, {r["user_id"] for r in rows})  # cached dashboard suggestions
+            _write_checkpoint(db, key, user_ids[-1])
+            db.commit()
+            created += len(rows)
+            chunks += 1
+        logger.info("Weekly AI insights %s (%s..%s): created %d in %d chunks", run_id, start_id, end_id, created, chunks)
+        return {"status": "ok", "created": created, "chunks": chunks, "run_id": run_id}
     except Exception as e:
         db.rollback()
         logger.exception("Weekly AI insights failed: %s", e)
         raise
     finally:
         db.close()
+
+
+@celery_app.task(name="app.tasks.ai_tasks.weekly_ai_insights_fanout")
+def weekly_ai_insights_fanout(shards: int | None = None, run_id: str | None = None):
+    """Split the user id space into `shards` ranges and run weekly_ai_insights on each in parallel."""
+    from app.models.user import User
+
+    shards = max(1, shards or settings.AI_INSIGHTS_SHARDS)
+    run_id = run_id or _default_run_id()
+    db = SessionLocal()
+    try:
+        lo, hi = db.execute(select(func.min(User.id), func.max(User.id))).one()
+    finally:
+        db.close()
+    if lo is None:
+        return {"status": "ok", "shards": 0, "run_id": run_id}
+    step = max(1, -(-(hi - lo + 1) // shards))  # ceil
+    bounds = list(range(lo - 1, hi, step)) + [hi]
+    for start, end in zip(bounds, bounds[1:]):
+        weekly_ai_insights.delay(start, end, run_id)
+    return {"status": "ok", "shards": len(bounds) - 1, "run_id": run_id}
@@ -1,12 +1,14 @@
 """Celery app configuration."""
-from celery import Celery
+from celery import Celery, signals
+from app.core import metrics
 from app.core.config import settings
+from app.services import rollups, invalidation, accounts  # noqa: F401 - register session hooks
 
 celery_app = Celery(
     "creator_analytics",
     broker=settings.CELERY_BROKER_URL,
     backend=settings.REDIS_URL,
-    include=["app.tasks.sync_tasks", "app.tasks.ai_tasks"],
+    include=["app.tasks.sync_tasks", "app.tasks.ai_tasks", "app.tasks.export_tasks"],
 )
 celery_app.conf.update(
     task_serializer="json",
@@ -15,3 +17,22 @@ celery_app.conf.update(
     timezone="UTC",
     enable_utc=True,
 )
+
+
+@signals.task_prerun.connect
+def _task_prerun(task_id=None, **kwargs):
+    if settings.METRICS_ENABLED:
+        metrics.task_started(task_id)
+
+
+@signals.task_postrun.connect
+def _task_postrun(task_id=None, task=None, state=None, **kwargs):
+    if settings.METRICS_ENABLED:
+        metrics.task_finished(task_id, task.name, state)
+
+
+@signals.worker_ready.connect
+def _serve_metrics(**kwargs):
+    # Prefork children record into PROMETHEUS_MULTIPROC_DIR; this serves them all
+    if settings.METRICS_ENABLED and settings.CELERY_METRICS_PORT:
+        metrics.serve(settings.CELERY_METRICS_PORT)
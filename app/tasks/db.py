@@ -0,0 +1,26 @@
+"""
+Sync database engine for Celery workers and CLI maintenance commands.
+"""
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.database import engine_options, pool_status
+from app.core.metrics import instrument_engine, register_pool
+
+# Sync URL: PostgreSQL -> drop asyncpg; SQLite -> drop aiosqlite
+if "asyncpg" in settings.DATABASE_URL:
+    SYNC_DATABASE_URL = settings.DATABASE_URL.replace("+asyncpg", "").replace("postgresql+asyncpg", "postgresql")
+elif "aiosqlite" in settings.DATABASE_URL:
+    SYNC_DATABASE_URL = settings.DATABASE_URL.replace("+aiosqlite", "").replace("sqlite+aiosqlite", "sqlite")
+else:
+    SYNC_DATABASE_URL = settings.DATABASE_URL
+
+# Sync engine for Celery tasks (no async in worker)
+engine = create_engine(
+    SYNC_DATABASE_URL,
+    **engine_options(SYNC_DATABASE_URL, async_engine=False, pool_size=settings.WORKER_DB_POOL_SIZE),
+)
+instrument_engine(engine, "worker")
+register_pool("worker", lambda: pool_status(engine.pool))
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -0,0 +1,41 @@
+"""
+Bulk export job: write an account's videos or snapshots to EXPORT_DIR.
+Same streaming path as /analytics/export (server-side cursor, chunked
+encoding), so a multi-million-row account never sits in worker memory.
+"""
+import logging
+import os
+from datetime import datetime
+
+from app.core.config import settings
+from app.tasks.celery_app import celery_app
+from app.tasks.db import SessionLocal
+from app.services.export import FORMATS, iter_export, open_encoder
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="app.tasks.export_tasks.export_account_data")
+def export_account_data(account_id: int, dataset: str = "videos", fmt: str = "csv"):
+    """Export one account's dataset ("videos" or "snapshots") as csv, ndjson or parquet."""
+    encoder = open_encoder(dataset, fmt)
+    os.makedirs(settings.EXPORT_DIR, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    path = os.path.join(settings.EXPORT_DIR, f"{dataset}-{account_id}-{stamp}.{FORMATS[fmt][1]}")
+    partial = path + ".part"  # readers never see a half-written file
+    db = SessionLocal()
+    try:
+        size = 0
+        with open(partial, "wb") as f:
+            for chunk in iter_export(db, dataset, account_id, encoder):
+                f.write(chunk)
+                size += len(chunk)
+        os.replace(partial, path)
+        logger.info("Exported %d %s rows of account %d to %s", encoder.rows, dataset, account_id, path)
+        return {"status": "ok", "path": path, "rows": encoder.rows, "bytes": size}
+    except Exception:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    finally:
+        db.close()
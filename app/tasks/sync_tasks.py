@@ -1,15 +1,172 @@
 """
-Daily sync task: mock YouTube data sync.
-In production this would call YouTube Data API.
+Daily sync: refresh video counters for every connected account.
+`daily_sync` pages through due accounts and fans out one `sync_account_chunk`
+subtask per batch; each account then commits independently.
+`compact_snapshots` fans out the same way to roll old daily snapshots into
+weekly/monthly rows (app.services.compaction); once all chunks are done,
+`maintain_snapshot_partitions` creates upcoming month partitions and drops
+expired ones (app.services.partitions). `update_peer_benchmarks`
+folds accounts changed since its last run into the peer sketches.
 """
 import logging
+from datetime import datetime, timedelta
+from celery import chord
+from app.core.config import settings
 from app.tasks.celery_app import celery_app
+from app.tasks.db import SessionLocal
+from app.services.providers import get_provider
+from app.services.compaction import compact_accounts, iter_account_id_batches, retention_cutoff
+from app.services.partitions import daily_partitioned, drop_expired_partitions, ensure_partitions
+from app.services.peer_benchmarks import iter_changed_account_ids, rebuild_sketches, update_accounts
+from app.services.rollups import check_rollups
+from app.utils.redis_client import get_sync_redis
+from app.services.video_sync import iter_due_account_ids, sync_accounts
 
 logger = logging.getLogger(__name__)
 
 
 @celery_app.task(name="app.tasks.sync_tasks.daily_sync")
 def daily_sync():
-    """Daily job: sync YouTube data for all connected accounts. Mock: no-op for now."""
-    logger.info("Daily sync task ran (mock - no real API)")
-    return {"status": "ok", "message": "Mock daily sync completed"}
+    """Daily job: enqueue sync subtasks for all accounts that are due, in id-ordered chunks."""
+    db = SessionLocal()
+    try:
+        chunks = accounts = 0
+        for ids in iter_due_account_ids(db, settings.SYNC_ACCOUNT_BATCH, settings.SYNC_MIN_INTERVAL_HOURS):
+            sync_account_chunk.delay(ids)
+            chunks += 1
+            accounts += len(ids)
+        logger.info("Daily sync: queued %d accounts in %d chunks", accounts, chunks)
+        return {"status": "ok", "chunks": chunks, "accounts": accounts}
+    finally:
+        db.close()
+
+
+@celery_app.task(name="app.tasks.sync_tasks.sync_account_chunk")
+def sync_account_chunk(account_ids: list[int]):
+    """Sync a chunk of accounts (one transaction per account)."""
+    db = SessionLocal()
+    try:
+        result = sync_accounts(db, account_ids, get_provider())
+        logger.info("Synced chunk of %d accounts: %s", len(account_ids), result)
+        return {"status": "ok", **result}
+    finally:
+        db.close()
+
+
+@celery_app.task(name="app.tasks.sync_tasks.verify_channel_rollups")
+def verify_channel_rollups(repair: bool = True):
+    """Check channel_rollups against videos/snapshots and rebuild any that drifted."""
+    db = SessionLocal()
+    try:
+        drifted = check_rollups(db, repair=repair)
+        return {"status": "ok", "drifted": len(drifted)}
+    except Exception as e:
+        db.rollback()
+        logger.exception("Rollup verification failed: %s", e)
+        raise
+    finally:
+        db.close()
+
+
+@celery_app.task(name="app.tasks.sync_tasks.compact_snapshots")
+def compact_snapshots():
+    """Enqueue snapshot compaction for every account, in id-ordered chunks, then partition maintenance."""
+    db = SessionLocal()
+    try:
+        chunks = [
+            compact_snapshot_chunk.s(ids)
+            for ids in iter_account_id_batches(db, settings.SNAPSHOT_COMPACTION_BATCH)
+        ]
+    finally:
+        db.close()
+    # Partitions are only dropped once every chunk has rolled them up (a failed chunk skips the drop)
+    if chunks:
+        chord(chunks)(maintain_snapshot_partitions.si())
+    else:
+        maintain_snapshot_partitions.delay()
+    logger.info("Snapshot compaction: queued %d chunks", len(chunks))
+    return {"status": "ok", "chunks": len(chunks)}
+
+
+@celery_app.task(name="app.tasks.sync_tasks.compact_snapshot_chunk")
+def compact_snapshot_chunk(account_ids: list[int]):
+    """Roll up and prune snapshots for a chunk of accounts (one transaction)."""
+    db = SessionLocal()
+    try:
+        result = compact_accounts(db, account_ids)
+        db.commit()
+        return {"status": "ok", **result}
+    except Exception as e:
+        db.rollback()
+        logger.exception("Snapshot compaction failed for %d accounts: %s", len(account_ids), e)
+        raise
+    finally:
+        db.close()
+
+
+@celery_app.task(name="app.tasks.sync_tasks.maintain_snapshot_partitions")
+def maintain_snapshot_partitions():
+    """Create the coming months' snapshot partitions and drop those past daily retention."""
+    db = SessionLocal()
+    try:
+        conn = db.connection()
+        if not daily_partitioned(conn):
+            return {"status": "skipped", "reason": "analytics_snapshots is not partitioned"}
+        now = datetime.utcnow()
+        created = ensure_partitions(conn, now)
+        dropped = drop_expired_partitions(conn, retention_cutoff("daily", now))
+        db.commit()
+        return {"status": "ok", "created": created, "dropped": dropped}
+    except Exception as e:
+        db.rollback()
+        logger.exception("Snapshot partition maintenance failed: %s", e)
+        raise
+    finally:
+        db.close()
+
+
+PEER_WATERMARK_KEY = "peer_benchmarks:watermark"
+# Rollups stamped by other hosts' clocks: re-read a little before the last run started
+PEER_WATERMARK_OVERLAP = timedelta(minutes=5)
+
+
+def _read_peer_watermark() -> datetime | None:
+    try:
+        raw = get_sync_redis().get(PEER_WATERMARK_KEY)
+        return datetime.fromisoformat(raw) - PEER_WATERMARK_OVERLAP if raw else None
+    except Exception as e:
+        logger.warning("Peer benchmark watermark read failed (%s); processing all accounts", e)
+        return None
+
+
+@celery_app.task(name="app.tasks.sync_tasks.update_peer_benchmarks")
+def update_peer_benchmarks(full: bool = False):
+    """
+    Update peer sketches for accounts whose rollup changed since the last run.
+    full=True recomputes every account and recounts the sketches from scratch.
+    Runs sequentially (sketch rows are shared); schedule one at a time.
+    """
+    started = datetime.utcnow()
+    since = None if full else _read_peer_watermark()
+    db = SessionLocal()
+    try:
+        accounts = changed = 0
+        for ids in iter_changed_account_ids(db, since, settings.PEER_BENCHMARK_BATCH):
+            changed += update_accounts(db, ids)
+            db.commit()
+            accounts += len(ids)
+        if full:
+            rebuild_sketches(db)
+            db.commit()
+        try:
+            get_sync_redis().set(PEER_WATERMARK_KEY, started.isoformat())
+        except Exception as e:
+            logger.warning("Peer benchmark watermark write failed: %s", e)
+        logger.info("Peer benchmarks: %d accounts checked, %d values changed", accounts, changed)
+        return {"status": "ok", "accounts": accounts, "changed": changed}
+    except Exception as e:
+        db.rollback()
+        logger.exception("Peer benchmark update failed: %s", e)
+        raise
+    finally:
+        db.close()
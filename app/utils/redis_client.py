@@ -1,11 +1,20 @@
 """Redis client for caching."""
+import asyncio
+import hashlib
 import json
 import logging
-from typing import Any
+import math
+import random
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, NamedTuple
 
+import redis
 import redis.asyncio as aioredis
 
 from app.core.config import settings
+from app.core.metrics import record_cache
 
 logger = logging.getLogger(__name__)
 _redis: aioredis.Redis | None = None
@@ -19,32 +28,491 @@ async def get_redis() -> aioredis.Redis:
     return _redis
 
 
+# --- In-process tier -----------------------------------------------------------
+# Small LRU with TTL in front of Redis, so hot keys cost no network hop. Other
+# workers are told to drop a key via pub/sub when it is deleted; the short local
+# TTL bounds staleness if an invalidation message is ever missed.
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+class LocalCache:
+    """Size-bounded LRU with per-entry expiry. Not shared across processes."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl_seconds: float | None = None) -> None:
+        ttl = min(ttl_seconds, self.ttl_seconds) if ttl_seconds else self.ttl_seconds
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+_local = LocalCache(settings.LOCAL_CACHE_MAX_ENTRIES, settings.LOCAL_CACHE_TTL_SECONDS)
+_listener: asyncio.Task | None = None
+
+
+async def _listen_for_invalidations() -> None:
+    """Evict keys other workers deleted. Reconnects with backoff if Redis drops."""
+    backoff = 1.0
+    while True:
+        try:
+            r = await get_redis()
+            pubsub = r.pubsub()
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            backoff = 1.0
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                key = message["data"]
+                if key == "*":
+                    _local.clear()
+                else:
+                    _local.delete(key)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Cache invalidation listener error: %s", e)
+            _local.clear()  # we may have missed messages
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+
+def start_invalidation_listener() -> None:
+    """Start the pub/sub listener for this process (call once at startup)."""
+    global _listener
+    if _listener is None or _listener.done():
+        _listener = asyncio.get_running_loop().create_task(_listen_for_invalidations())
+
+
+async def stop_invalidation_listener() -> None:
+    """Cancel the pub/sub listener (call at shutdown)."""
+    global _listener
+    if _listener is not None:
+        _listener.cancel()
+        try:
+            await _listener
+        except asyncio.CancelledError:
+            pass
+        _listener = None
+
+
 async def cache_get(key: str) -> Any | None:
-    """Get value from cache. Returns None if miss or error."""
+    """Get value from cache (local tier, then Redis). Returns None if miss or error."""
+    val = _local.get(key)
+    if val is not None:
+        record_cache(key, "local_hit")
+        return val
     try:
         r = await get_redis()
-        val = await r.get(key)
-        if val is None:
+        raw = await r.get(key)
+        if raw is None:
+            record_cache(key, "miss")
             return None
-        return json.loads(val)
+        val = json.loads(raw)
+        _local.set(key, val)
+        record_cache(key, "hit")
+        return val
     except Exception as e:
         logger.warning("Redis get error: %s", e)
+        record_cache(key, "error")
         return None
 
 
-async def cache_set(key: str, value: Any, ttl_seconds: int = 300) -> None:
-    """Set value in cache with optional TTL."""
+async def cache_get_many(keys) -> dict[str, Any]:
+    """cache_get for several keys: local tier, then one Redis MGET for the rest. Misses are left out."""
+    found: dict[str, Any] = {}
+    remote = []
+    for key in dict.fromkeys(keys):
+        val = _local.get(key)
+        if val is not None:
+            record_cache(key, "local_hit")
+            found[key] = val
+        else:
+            remote.append(key)
+    if not remote:
+        return found
     try:
         r = await get_redis()
-        await r.set(key, json.dumps(value, default=str), ex=ttl_seconds)
+        raws = await r.mget(remote)
+    except Exception as e:
+        logger.warning("Redis mget error: %s", e)
+        for key in remote:
+            record_cache(key, "error")
+        return found
+    for key, raw in zip(remote, raws):
+        if raw is None:
+            record_cache(key, "miss")
+            continue
+        found[key] = json.loads(raw)
+        _local.set(key, found[key])
+        record_cache(key, "hit")
+    return found
+
+
+def _tag_set_key(tag: str) -> str:
+    return f"cache:tag:{tag}"
+
+
+def _tag_version_key(tag: str) -> str:
+    return f"cache:tagver:{tag}"
+
+
+def user_tag(user_id: int) -> str:
+    """Tag carried by every cache key derived from one user's data."""
+    return f"user:{user_id}"
+
+
+# Set a TTL only if it is longer than the current one (EXPIRE GT needs Redis 7 and skips keys without a TTL)
+_EXTEND_TTL = """
+if redis.call('ttl', KEYS[1]) < tonumber(ARGV[1]) then
+    return redis.call('expire', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+
+def _track_tags(pipe, key: str, tags: tuple[str, ...], ttl_seconds: int) -> None:
+    # One tag set serves keys of different TTLs: it must outlive the longest-lived of them
+    for tag in tags:
+        pipe.sadd(_tag_set_key(tag), key)
+        pipe.eval(_EXTEND_TTL, 1, _tag_set_key(tag), ttl_seconds)
+
+
+async def cache_set(key: str, value: Any, ttl_seconds: int = 300, tags: tuple[str, ...] = ()) -> None:
+    """
+    Set value in both tiers with optional TTL.
+    Tagged keys are tracked in a Redis set per tag so invalidate_tags can find them.
+    """
+    _local.set(key, value, ttl_seconds)
+    try:
+        r = await get_redis()
+        async with r.pipeline(transaction=False) as pipe:
+            pipe.set(key, json.dumps(value, default=str), ex=ttl_seconds)
+            _track_tags(pipe, key, tags, ttl_seconds)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning("Redis set error: %s", e)
+
+
+async def cache_set_many(entries, ttl_seconds: int = 300) -> None:
+    """cache_set for (key, value, tags) entries in one Redis round trip."""
+    entries = list(entries)
+    for key, value, _ in entries:
+        _local.set(key, value, ttl_seconds)
+    if not entries:
+        return
+    try:
+        r = await get_redis()
+        async with r.pipeline(transaction=False) as pipe:
+            for key, value, tags in entries:
+                pipe.set(key, json.dumps(value, default=str), ex=ttl_seconds)
+                _track_tags(pipe, key, tags, ttl_seconds)
+            await pipe.execute()
     except Exception as e:
         logger.warning("Redis set error: %s", e)
 
 
+async def tag_versions(tags: tuple[str, ...]) -> list[str | None]:
+    """Current invalidation counters for tags; compare before/after a compute to detect races."""
+    if not tags:
+        return []
+    try:
+        r = await get_redis()
+        return await r.mget([_tag_version_key(t) for t in tags])
+    except Exception as e:
+        logger.warning("Redis mget error: %s", e)
+        return [None] * len(tags)
+
+
+async def invalidate_tags(*tags: str) -> None:
+    """Delete every key carrying any of the tags, in Redis and in every worker's local tier."""
+    if not tags:
+        return
+    try:
+        r = await get_redis()
+        for tag in tags:
+            keys = await r.smembers(_tag_set_key(tag))
+            async with r.pipeline(transaction=False) as pipe:
+                if keys:
+                    pipe.delete(*keys)
+                pipe.delete(_tag_set_key(tag))
+                pipe.incr(_tag_version_key(tag))
+                pipe.expire(_tag_version_key(tag), 86400)
+                for key in keys:
+                    pipe.publish(INVALIDATION_CHANNEL, key)
+                await pipe.execute()
+            for key in keys:
+                _local.delete(key)
+    except Exception as e:
+        logger.warning("Redis invalidate error: %s", e)
+
+
+_sync_redis: redis.Redis | None = None
+
+
+def get_sync_redis() -> redis.Redis:
+    """Blocking Redis connection for code without an event loop (Celery workers)."""
+    global _sync_redis
+    if _sync_redis is None:
+        _sync_redis = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _sync_redis
+
+
+def invalidate_tags_sync(*tags: str) -> None:
+    """invalidate_tags for code without an event loop (Celery workers)."""
+    if not tags:
+        return
+    try:
+        r = get_sync_redis()
+        for tag in tags:
+            keys = r.smembers(_tag_set_key(tag))
+            pipe = r.pipeline(transaction=False)
+            if keys:
+                pipe.delete(*keys)
+            pipe.delete(_tag_set_key(tag))
+            pipe.incr(_tag_version_key(tag))
+            pipe.expire(_tag_version_key(tag), 86400)
+            for key in keys:
+                pipe.publish(INVALIDATION_CHANNEL, key)
+            pipe.execute()
+            for key in keys:
+                _local.delete(key)
+    except Exception as e:
+        logger.warning("Redis invalidate error: %s", e)
+
+
+def _recent_write_key(user_id: int) -> str:
+    return f"rw:recent:{user_id}"
+
+
+async def mark_recent_writes(user_ids, seconds: float) -> None:
+    """Remember that these users just wrote (read-your-writes routing, shared by all workers)."""
+    try:
+        r = await get_redis()
+        async with r.pipeline(transaction=False) as pipe:
+            for uid in user_ids:
+                pipe.set(_recent_write_key(uid), 1, px=max(int(seconds * 1000), 1))
+            await pipe.execute()
+    except Exception as e:
+        logger.warning("Redis set error: %s", e)
+
+
+async def wrote_recently(user_id: int) -> bool:
+    """True if the user wrote within the sticky window; also True if Redis can't tell us."""
+    try:
+        r = await get_redis()
+        return bool(await r.exists(_recent_write_key(user_id)))
+    except Exception as e:
+        logger.warning("Redis exists error: %s", e)
+        return True
+
+
 async def cache_delete(key: str) -> None:
-    """Delete key from cache."""
+    """Delete key from cache and tell other workers to drop their local copy."""
+    _local.delete(key)
     try:
         r = await get_redis()
         await r.delete(key)
+        await r.publish(INVALIDATION_CHANNEL, key)
     except Exception as e:
         logger.warning("Redis delete error: %s", e)
+
+
+# --- Single-flight cache fill -------------------------------------------------
+# One computation per key: concurrent callers in this process share a future,
+# other workers are held off by a short Redis lock and read the result once it
+# lands. Entries are refreshed early with probability rising towards expiry
+# (XFetch), so hot keys are usually recomputed before they ever go missing.
+# Values are final response bytes, so a hit is served without decoding.
+
+LOCK_TTL_SECONDS = 10
+LOCK_POLL_INTERVAL = 0.05
+_inflight: dict[str, asyncio.Future] = {}
+_redis_bytes: aioredis.Redis | None = None
+
+# Delete the lock only if we still own it
+_RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class CachedBody(NamedTuple):
+    """Serialized body plus what single-flight and conditional GETs need."""
+    body: bytes
+    etag: str
+    delta: float  # seconds the compute took
+    expires_at: float  # epoch seconds
+
+
+async def get_redis_bytes() -> aioredis.Redis:
+    """Redis connection that returns raw bytes (no decode), for cached bodies."""
+    global _redis_bytes
+    if _redis_bytes is None:
+        _redis_bytes = aioredis.from_url(settings.REDIS_URL)
+    return _redis_bytes
+
+
+def _pack(entry: CachedBody) -> bytes:
+    header = f"{entry.expires_at:.3f} {entry.delta:.6f} {entry.etag}\n".encode()
+    return header + entry.body
+
+
+def _unpack(raw: bytes) -> CachedBody | None:
+    header, sep, body = raw.partition(b"\n")
+    try:
+        expires_at, delta, etag = header.decode().split(" ", 2)
+        return CachedBody(body, etag, float(delta), float(expires_at)) if sep else None
+    except ValueError:
+        return None
+
+
+def _should_refresh_early(entry: CachedBody, beta: float) -> bool:
+    """XFetch: recompute before expiry with probability growing as expiry nears."""
+    return time.time() - entry.delta * beta * math.log(random.random() or 1e-12) >= entry.expires_at
+
+
+async def _read_entry(key: str) -> CachedBody | None:
+    entry = _local.get(key)
+    if isinstance(entry, CachedBody):
+        record_cache(key, "local_hit")
+        return entry
+    try:
+        r = await get_redis_bytes()
+        raw = await r.get(key)
+    except Exception as e:
+        logger.warning("Redis get error: %s", e)
+        record_cache(key, "error")
+        return None
+    entry = _unpack(raw) if raw is not None else None
+    if entry is not None:
+        _local.set(key, entry, max(entry.expires_at - time.time(), 0.001))
+    record_cache(key, "hit" if entry is not None else "miss")
+    return entry
+
+
+async def _store_entry(key: str, entry: CachedBody, ttl_seconds: int, tags: tuple[str, ...]) -> None:
+    _local.set(key, entry, ttl_seconds)
+    try:
+        r = await get_redis_bytes()
+        async with r.pipeline(transaction=False) as pipe:
+            pipe.set(key, _pack(entry), ex=ttl_seconds)
+            _track_tags(pipe, key, tags, ttl_seconds)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning("Redis set error: %s", e)
+
+
+async def _fill(
+    key: str,
+    compute: Callable[[], Awaitable[bytes]],
+    ttl_seconds: int,
+    stale: CachedBody | None,
+    tags: tuple[str, ...],
+) -> CachedBody:
+    """Compute under the cross-worker lock and store; wait for another worker if it holds the lock."""
+    token = uuid.uuid4().hex
+    lock_key = f"lock:{key}"
+    try:
+        r = await get_redis()
+        acquired = await r.set(lock_key, token, nx=True, ex=LOCK_TTL_SECONDS)
+    except Exception as e:
+        logger.warning("Redis lock error: %s", e)
+        r, acquired = None, True  # Redis down: compute locally
+
+    if not acquired:
+        if stale is not None:
+            return stale  # someone else is refreshing; serve what we have
+        deadline = time.monotonic() + LOCK_TTL_SECONDS
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            entry = await _read_entry(key)
+            if entry is not None:
+                return entry
+        logger.warning("Timed out waiting for %s; computing locally", key)
+
+    try:
+        versions = await tag_versions(tags)
+        started = time.monotonic()
+        body = await compute()
+        delta = time.monotonic() - started
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        entry = CachedBody(body, etag, delta, time.time() + ttl_seconds)
+        if await tag_versions(tags) == versions:
+            await _store_entry(key, entry, ttl_seconds, tags)
+        # else: invalidated while computing, so don't cache a possibly stale result
+        return entry
+    finally:
+        if acquired and r is not None:
+            try:
+                await r.eval(_RELEASE_LOCK, 1, lock_key, token)
+            except Exception as e:
+                logger.warning("Redis unlock error: %s", e)
+
+
+async def cache_get_or_compute(
+    key: str,
+    compute: Callable[[], Awaitable[bytes]],
+    ttl_seconds: int = 300,
+    beta: float = 1.0,
+    tags: tuple[str, ...] = (),
+) -> CachedBody:
+    """
+    Return the cached body for key, or run compute() once and cache the bytes it returns.
+    Concurrent misses for the same key await a single computation; if the request
+    running it is cancelled, one of the waiters takes over. beta > 1 favours
+    earlier refresh, beta = 0 disables it. Tags make the key removable via invalidate_tags.
+    """
+    entry = await _read_entry(key)
+    if entry is not None and not (beta > 0 and _should_refresh_early(entry, beta)):
+        return entry
+
+    while (fut := _inflight.get(key)) is not None:
+        if entry is not None:
+            return entry  # refresh already running here
+        try:
+            return await asyncio.shield(fut)
+        except asyncio.CancelledError:
+            if not fut.cancelled():
+                raise  # this request was cancelled
+            # The request computing it was cancelled (e.g. client gone): take over
+
+    fut = asyncio.get_running_loop().create_future()
+    _inflight[key] = fut
+    try:
+        entry = await _fill(key, compute, ttl_seconds, entry, tags)
+        fut.set_result(entry)
+        return entry
+    except asyncio.CancelledError:
+        fut.cancel()
+        raise
+    except Exception as e:
+        fut.set_exception(e)
+        fut.exception()  # mark retrieved when nobody else was waiting
+        raise
+    finally:
+        _inflight.pop(key, None)
@@ -0,0 +1,103 @@
+"""
+Login storm: /analytics/* latency while many logins hash passwords.
+
+    python -m benchmarks.bench_login_storm --readers 20 --logins 8 --seconds 10
+
+Runs the app in-process (httpx ASGI transport, one event loop, like a single
+uvicorn worker) against a temp SQLite database seeded with the demo user, and
+uses REDIS_URL for the cache. For each hashing mode -- "inline" (bcrypt on the
+event loop, PASSWORD_HASH_WORKERS=0) and "pool" (the bounded hashing pool) --
+it measures analytics latency with readers only, then with concurrent login
+loops added. Prints p50/p95/p99 per phase as JSON; with the pool, storm p99
+should stay close to the baseline.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.common import percentiles
+
+DEMO_LOGIN = {"email": "demo@example.com", "password": "demo123"}
+ANALYTICS_PATHS = ("/analytics/overview", "/analytics/growth", "/analytics/videos")
+
+
+async def _reader(client, headers, deadline: float, out: list[float]) -> None:
+    i = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        r = await client.get(ANALYTICS_PATHS[i % len(ANALYTICS_PATHS)], headers=headers)
+        r.raise_for_status()
+        out.append(time.perf_counter() - started)
+        i += 1
+
+
+async def _login_loop(client, deadline: float, out: list[float]) -> None:
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        r = await client.post("/auth/login", json=DEMO_LOGIN)
+        r.raise_for_status()
+        out.append(time.perf_counter() - started)
+
+
+async def _phase(client, headers, readers: int, logins: int, seconds: float) -> dict:
+    deadline = time.perf_counter() + seconds
+    reads: list[float] = []
+    login_times: list[float] = []
+    await asyncio.gather(
+        *(_reader(client, headers, deadline, reads) for _ in range(readers)),
+        *(_login_loop(client, deadline, login_times) for _ in range(logins)),
+    )
+    result = {"analytics": percentiles(reads)}
+    if logins:
+        result["logins_per_sec"] = round(len(login_times) / seconds, 1)
+    return result
+
+
+async def run(readers: int, logins: int, seconds: float) -> dict:
+    import httpx
+    from app.core.config import settings
+    from app.main import app
+    from app.auth.password import shutdown_password_pool
+
+    workers = settings.PASSWORD_HASH_WORKERS or min(4, os.cpu_count() or 1)
+    results = {"bcrypt_rounds": settings.BCRYPT_ROUNDS, "readers": readers, "login_loops": logins}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            r = await client.post("/auth/login", json=DEMO_LOGIN)
+            r.raise_for_status()
+            headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+            for mode, pool_size in (("inline", 0), ("pool", workers)):
+                shutdown_password_pool()
+                settings.PASSWORD_HASH_WORKERS = pool_size
+                results[mode] = {
+                    "hash_workers": pool_size,
+                    "baseline": await _phase(client, headers, readers, 0, seconds),
+                    "storm": await _phase(client, headers, readers, logins, seconds),
+                }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=20, help="concurrent /analytics/* clients")
+    parser.add_argument("--logins", type=int, default=8, help="concurrent login loops during the storm")
+    parser.add_argument("--seconds", type=float, default=10, help="duration of each phase")
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    os.remove(path)  # let the app create it, so the demo seed runs
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+    try:
+        print(json.dumps(asyncio.run(run(args.readers, args.logins, args.seconds)), indent=2))
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Metrics overhead: cost of the Prometheus instrumentation per request / query.
+
+    python -m benchmarks.bench_metrics --requests 20000
+
+Drives a minimal FastAPI app through raw ASGI calls (no network, no HTTP
+client) with and without MetricsMiddleware, and runs SELECT 1 on an
+in-memory SQLite engine with and without the cursor-event timers. Each side
+takes the best of --repeat runs; overhead is the difference per call. Prints
+JSON; request_overhead_us is expected to stay under 50.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+
+from app.core.metrics import MetricsMiddleware, instrument_engine, record_cache
+
+
+def _make_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def _drive(app, n: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/items/7", "raw_path": b"/items/7", "root_path": "",
+        "query_string": b"", "headers": [], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / n
+
+
+async def _best_per_request(app, n: int, repeat: int) -> float:
+    await _drive(app, min(n, 1000))  # warm-up (builds the middleware stack)
+    return min([await _drive(app, n) for _ in range(repeat)])
+
+
+def _best_per_query(engine, n: int, repeat: int) -> float:
+    best = float("inf")
+    with engine.connect() as conn:
+        stmt = text("SELECT 1")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(n):
+                conn.execute(stmt)
+            best = min(best, (time.perf_counter() - started) / n)
+    return best
+
+
+def run(n_requests: int, n_queries: int, repeat: int) -> dict:
+    plain = asyncio.run(_best_per_request(_make_app(False), n_requests, repeat))
+    instrumented = asyncio.run(_best_per_request(_make_app(True), n_requests, repeat))
+
+    bare_engine = create_engine("sqlite://")
+    timed_engine = create_engine("sqlite://")
+    instrument_engine(timed_engine, "bench")
+    q_plain = _best_per_query(bare_engine, n_queries, repeat)
+    q_timed = _best_per_query(timed_engine, n_queries, repeat)
+
+    started = time.perf_counter()
+    for _ in range(n_requests):
+        record_cache("analytics:overview:1:30", "hit")
+    cache_us = (time.perf_counter() - started) / n_requests * 1e6
+
+    return {
+        "request_us_plain": round(plain * 1e6, 2),
+        "request_us_instrumented": round(instrumented * 1e6, 2),
+        "request_overhead_us": round((instrumented - plain) * 1e6, 2),
+        "query_overhead_us": round((q_timed - q_plain) * 1e6, 2),
+        "cache_counter_us": round(cache_us, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.requests, args.queries, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
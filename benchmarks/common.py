@@ -0,0 +1,13 @@
+"""Helpers shared by the benchmark scripts."""
+
+
+def percentiles(samples: list[float]) -> dict:
+    """Request count and p50/p95/p99 in milliseconds for latencies in seconds."""
+    if not samples:
+        return {"requests": 0}
+    samples = sorted(samples)
+
+    def pct(p: float) -> float:
+        return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 2)
+
+    return {"requests": len(samples), "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
@@ -0,0 +1,144 @@
+"""
+Shared fixtures: a fresh SQLite database per test, with the app's session
+hooks (rollups, cache invalidation) active. Redis is not needed: commit-time
+invalidation is recorded instead of sent, and tests that exercise the cache
+use `redis_calls` (fakeredis).
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+os.environ.setdefault("METRICS_ENABLED", "false")
+
+import asyncio
+from datetime import datetime
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.core import database
+from app.core.database import Base
+from app.models import ConnectedAccount, User
+from app.services import invalidation, rollups  # noqa: F401 - register session hooks
+from app.utils import redis_client
+
+
+@pytest.fixture(autouse=True)
+def invalidated(monkeypatch) -> list[str]:
+    """Cache tags invalidated by commits during the test."""
+    tags: list[str] = []
+    monkeypatch.setattr(invalidation, "invalidate_tags_sync", lambda *t: tags.extend(t))
+    return tags
+
+
+class CountingRedis(fakeredis.aioredis.FakeRedis):
+    """FakeRedis that counts the commands sent outside pipelines."""
+
+    def __init__(self, calls: dict[str, int], **kwargs):
+        super().__init__(**kwargs)
+        self.calls = calls
+
+    async def execute_command(self, *args, **options):
+        self.calls[args[0]] = self.calls.get(args[0], 0) + 1
+        return await super().execute_command(*args, **options)
+
+
+@pytest.fixture
+def fake_redis_server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def redis_calls(monkeypatch, fake_redis_server) -> dict[str, int]:
+    """Serve the cache from one fake server (clients per event loop); returns the command counts."""
+    calls, clients = {}, {}
+
+    def client(decode: bool):
+        async def get():
+            loop = asyncio.get_running_loop()
+            if (loop, decode) not in clients:
+                clients[loop, decode] = CountingRedis(calls, server=fake_redis_server, decode_responses=decode)
+            return clients[loop, decode]
+        return get
+
+    monkeypatch.setattr(redis_client, "get_redis", client(True))
+    monkeypatch.setattr(redis_client, "get_redis_bytes", client(False))
+    redis_client._local.clear()
+    yield calls
+    redis_client._local.clear()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "test.db"
+
+
+@pytest.fixture
+def engine(db_path):
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session(engine):
+    db = sessionmaker(bind=engine, autoflush=False)()
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def run_async(engine, db_path):
+    """run_async(fn): await fn(async_session) on the same database, from a sync test."""
+    def run(fn):
+        async def main():
+            async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+            try:
+                async with async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)() as db:
+                    return await fn(db)
+            finally:
+                await async_engine.dispose()
+        return asyncio.run(main())
+    return run
+
+
+class TrackedSession(AsyncSession):
+    """AsyncSession that records how many sessions were opened and how many overlapped."""
+    stats: dict[str, int]
+
+    async def __aenter__(self):
+        self.stats["opened"] += 1
+        self.stats["active"] += 1
+        self.stats["peak"] = max(self.stats["peak"], self.stats["active"])
+        return await super().__aenter__()
+
+    async def __aexit__(self, *exc):
+        self.stats["active"] -= 1
+        return await super().__aexit__(*exc)
+
+
+@pytest.fixture
+def app_sessions(monkeypatch, engine, db_path) -> dict[str, int]:
+    """Point the app's primary sessions (session_scope, read_session_scope) at the test database."""
+    stats = {"opened": 0, "active": 0, "peak": 0}
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+    session_class = type("TestSession", (TrackedSession,), {"stats": stats})
+    monkeypatch.setattr(
+        database, "async_session_maker", async_sessionmaker(async_engine, class_=session_class, expire_on_commit=False),
+    )
+    yield stats
+    asyncio.run(async_engine.dispose())
+
+
+@pytest.fixture
+def account_id(session) -> int:
+    user = User(email="creator@example.com", hashed_password="x")
+    account = ConnectedAccount(user=user, platform="youtube", channel_name="Test channel", created_at=datetime(2026, 1, 1))
+    session.add(account)
+    session.commit()
+    return account.id
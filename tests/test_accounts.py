@@ -0,0 +1,57 @@
+import pytest
+
+from app.models import ConnectedAccount, User
+from app.services.accounts import get_account_ids
+from app.utils import redis_client
+
+
+@pytest.fixture
+def users(session) -> dict[int, list[int]]:
+    """user_id -> account ids (oldest first): three users with 0, 1 and 2 accounts."""
+    users = [User(email=f"u{i}@example.com", hashed_password="x") for i in range(3)]
+    session.add_all(users)
+    session.flush()
+    session.add_all([ConnectedAccount(user_id=users[i].id, platform="youtube") for i in (1, 2, 2)])
+    session.commit()
+    return {
+        u.id: sorted(a.id for a in session.query(ConnectedAccount).filter_by(user_id=u.id)) for u in users
+    }
+
+
+def _lookup(run_async, user_ids):
+    async def lookup(db):
+        return await get_account_ids(db, user_ids)
+    return run_async(lookup)
+
+
+def test_lookup_loads_caches_and_reuses_ids(run_async, redis_calls, users):
+    assert _lookup(run_async, list(users)) == users
+    assert redis_calls.get("GET", 0) == 0 and redis_calls["MGET"] == 3  # cache + 2 tag versions
+
+    # Redis tier: one MGET for every user
+    redis_client._local.clear()
+    redis_calls.clear()
+    assert _lookup(run_async, list(users)) == users
+    assert redis_calls == {"MGET": 1}
+
+    # Local tier: no Redis at all
+    redis_calls.clear()
+    assert _lookup(run_async, list(users)) == users
+    assert redis_calls == {}
+
+
+def test_lookup_mixes_tiers(run_async, redis_calls, users):
+    first = next(iter(users))
+    assert _lookup(run_async, [first]) == {first: users[first]}
+    redis_calls.clear()
+    assert _lookup(run_async, list(users)) == users
+    assert redis_calls["MGET"] == 3  # the others' cache keys, then tag versions around the query
+
+
+def test_lookup_works_without_redis(run_async, monkeypatch, users):
+    async def unavailable():
+        raise ConnectionError("redis down")
+    monkeypatch.setattr(redis_client, "get_redis", unavailable)
+    redis_client._local.clear()
+    assert _lookup(run_async, list(users)) == users
+    redis_client._local.clear()
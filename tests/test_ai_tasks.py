@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models import AIInsight, TaskCheckpoint, User
+from app.tasks import ai_tasks
+
+
+@pytest.fixture
+def user_ids(session, engine, monkeypatch) -> list[int]:
+    users = [User(email=f"u{i}@example.com", hashed_password="x") for i in range(7)]
+    session.add_all(users)
+    session.commit()
+    monkeypatch.setattr(ai_tasks, "SessionLocal", sessionmaker(bind=engine, autoflush=False))
+    monkeypatch.setattr(settings, "AI_INSIGHTS_CHUNK", 2)
+    return [u.id for u in users]
+
+
+def _one_insight_each(db, user_ids):
+    return [
+        {"user_id": uid, "insight_type": "engagement", "title": "t", "content": "c", "priority": "high",
+         "is_read": False}
+        for uid in user_ids
+    ]
+
+
+def _insights_per_user(session):
+    return dict(session.execute(select(AIInsight.user_id, func.count()).group_by(AIInsight.user_id)).all())
+
+
+def test_rerun_after_a_crash_resumes_without_duplicates(session, user_ids, monkeypatch):
+    calls = []
+
+    def crash_on_third_chunk(db, ids):
+        calls.append(ids)
+        if len(calls) == 3:
+            raise RuntimeError("worker died")
+        return _one_insight_each(db, ids)
+
+    monkeypatch.setattr(ai_tasks, "_insight_rows", crash_on_third_chunk)
+    with pytest.raises(RuntimeError):
+        ai_tasks.weekly_ai_insights(run_id="2026-W42")
+    assert _insights_per_user(session) == {uid: 1 for uid in user_ids[:4]}
+    assert session.get(TaskCheckpoint, "ai_insights:checkpoint:2026-W42:0:max").last_id == user_ids[3]
+
+    monkeypatch.setattr(ai_tasks, "_insight_rows", _one_insight_each)
+    result = ai_tasks.weekly_ai_insights(run_id="2026-W42")
+    assert (result["created"], result["chunks"]) == (3, 2)
+    session.expire_all()
+    assert _insights_per_user(session) == {uid: 1 for uid in user_ids}
+
+
+def test_checkpoint_rolls_back_with_its_chunk(session, user_ids, monkeypatch):
+    def fail_insert(db, ids):
+        rows = _one_insight_each(db, ids)
+        rows[-1]["title"] = None  # NOT NULL: the chunk's insert fails
+        return rows
+
+    monkeypatch.setattr(ai_tasks, "_insight_rows", fail_insert)
+    with pytest.raises(Exception):
+        ai_tasks.weekly_ai_insights(run_id="2026-W42")
+    assert session.get(TaskCheckpoint, "ai_insights:checkpoint:2026-W42:0:max") is None
+    assert _insights_per_user(session) == {}
+
+
+def test_ranges_and_runs_checkpoint_separately(session, user_ids, monkeypatch):
+    monkeypatch.setattr(ai_tasks, "_insight_rows", _one_insight_each)
+    ai_tasks.weekly_ai_insights(0, user_ids[2], run_id="2026-W42")
+    ai_tasks.weekly_ai_insights(user_ids[2], None, run_id="2026-W42")
+    assert ai_tasks.weekly_ai_insights(run_id="2026-W43")["created"] == len(user_ids)
+    assert sorted(session.execute(select(TaskCheckpoint.name)).scalars()) == [
+        f"ai_insights:checkpoint:2026-W42:0:{user_ids[2]}",
+        f"ai_insights:checkpoint:2026-W42:{user_ids[2]}:max",
+        "ai_insights:checkpoint:2026-W43:0:max",
+    ]
+
+
+def test_old_checkpoints_are_pruned(session, user_ids, monkeypatch):
+    stale = datetime.utcnow() - timedelta(seconds=ai_tasks.CHECKPOINT_TTL + 60)
+    session.add_all([
+        TaskCheckpoint(name="ai_insights:checkpoint:2026-W30:0:max", last_id=5, updated_at=stale),
+        TaskCheckpoint(name="other_task:2026-W30", last_id=5, updated_at=stale),
+    ])
+    session.commit()
+    monkeypatch.setattr(ai_tasks, "_insight_rows", _one_insight_each)
+    ai_tasks.weekly_ai_insights(run_id="2026-W42")
+    session.expire_all()
+    assert sorted(session.execute(select(TaskCheckpoint.name)).scalars()) == [
+        "ai_insights:checkpoint:2026-W42:0:max", "other_task:2026-W30",
+    ]
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from app.utils import redis_client
+from app.utils.redis_client import cache_get_or_compute
+
+
+class Compute:
+    """compute() callback that counts its runs and, if held, waits for release before returning."""
+
+    def __init__(self, body: bytes = b'{"n":1}', error: Exception | None = None, held: bool = True):
+        self.body, self.error = body, error
+        self.runs = 0
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+        if not held:
+            self.release.set()
+
+    async def __call__(self) -> bytes:
+        self.runs += 1
+        self.started.set()
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.body
+
+
+def test_concurrent_misses_compute_once(redis_calls):
+    async def main():
+        compute = Compute()
+        callers = [asyncio.create_task(cache_get_or_compute("k", compute, beta=0)) for _ in range(5)]
+        await compute.started.wait()
+        compute.release.set()
+        entries = await asyncio.gather(*callers)
+        assert compute.runs == 1
+        assert {e.body for e in entries} == {b'{"n":1}'} and len({e.etag for e in entries}) == 1
+        assert redis_client._inflight == {}
+
+        # Cached now, in both tiers
+        assert (await cache_get_or_compute("k", Compute(b"other", held=False), beta=0)).body == b'{"n":1}'
+        redis_client._local.clear()
+        assert (await cache_get_or_compute("k", Compute(b"other", held=False), beta=0)).body == b'{"n":1}'
+    asyncio.run(main())
+
+
+def test_cancelled_leader_does_not_fail_the_waiters(redis_calls):
+    async def main():
+        first = Compute(b"first")
+        leader = asyncio.create_task(cache_get_or_compute("k", first, beta=0))
+        await first.started.wait()
+        second = Compute(b"second", held=False)
+        follower = asyncio.create_task(cache_get_or_compute("k", second, beta=0))
+        await asyncio.sleep(0.01)  # follower is waiting on the leader's fill
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        entry = await asyncio.wait_for(follower, 5)
+        assert entry.body == b"second" and second.runs == 1
+        assert redis_client._inflight == {}
+        # The cancelled leader released its cross-worker lock
+        assert await (await redis_client.get_redis()).get("lock:k") is None
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_does_not_cancel_the_fill(redis_calls):
+    async def main():
+        compute = Compute()
+        leader = asyncio.create_task(cache_get_or_compute("k", compute, beta=0))
+        await compute.started.wait()
+        follower = asyncio.create_task(cache_get_or_compute("k", Compute(b"unused", held=False), beta=0))
+        await asyncio.sleep(0.01)
+
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        compute.release.set()
+        assert (await leader).body == b'{"n":1}'
+        assert compute.runs == 1
+    asyncio.run(main())
+
+
+def test_errors_reach_every_waiter_and_are_not_cached(redis_calls):
+    async def main():
+        failing = Compute(error=ValueError("db down"))
+        callers = [asyncio.create_task(cache_get_or_compute("k", failing, beta=0)) for _ in range(3)]
+        await failing.started.wait()
+        failing.release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        assert failing.runs == 1
+        assert all(isinstance(r, ValueError) for r in results)
+        assert redis_client._inflight == {}
+
+        retry = Compute(held=False)
+        assert (await cache_get_or_compute("k", retry, beta=0)).body == b'{"n":1}'
+        assert retry.runs == 1
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models import AnalyticsSnapshot
+from app.routers.analytics import _build_growth
+from app.services.compaction import compact_accounts
+
+WINDOWS = (7, 30, 90, 91, 365, 730, 731, 1100)
+
+
+@pytest.fixture
+def history(session, account_id):
+    """Three years of daily snapshots (running totals), up to today."""
+    today = datetime.utcnow().replace(hour=6, minute=0, second=0, microsecond=0)
+    session.execute(AnalyticsSnapshot.__table__.insert(), [
+        {
+            "connected_account_id": account_id, "snapshot_date": today - timedelta(days=n),
+            "period_type": "daily", "total_views": 10 * (1200 - n) + n % 7, "total_likes": 1200 - n,
+            "total_comments": (1200 - n) // 3, "subscriber_count": 500 + (1200 - n) // 2,
+        }
+        for n in range(1200)
+    ])
+    session.commit()
+    return account_id
+
+
+def _growth(run_async, account_id):
+    async def build(db):
+        return {days: (await _build_growth(db, account_id, days)).model_dump() for days in WINDOWS}
+    return run_async(build)
+
+
+def _counts(session):
+    return dict(session.execute(
+        select(AnalyticsSnapshot.period_type, func.count()).group_by(AnalyticsSnapshot.period_type)
+    ).all())
+
+
+def test_compaction_keeps_every_growth_window_unchanged(session, run_async, history):
+    before = _growth(run_async, history)
+    compact_accounts(session, [history])
+    session.commit()
+
+    counts = _counts(session)
+    assert counts["daily"] < 100 and counts["weekly"] < 110 and counts["monthly"] >= 39
+    assert _growth(run_async, history) == before
+
+
+def test_compaction_is_idempotent(session, run_async, history):
+    compact_accounts(session, [history])
+    session.commit()
+    counts, growth = _counts(session), _growth(run_async, history)
+
+    assert compact_accounts(session, [history])["pruned"] == 0
+    session.commit()
+    assert _counts(session) == counts
+    assert _growth(run_async, history) == growth
+
+
+def test_compaction_leaves_open_periods_daily(session, history):
+    now = datetime.utcnow()
+    compact_accounts(session, [history], now=now)
+    session.commit()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    rolled_up = session.execute(
+        select(func.max(AnalyticsSnapshot.snapshot_date)).where(AnalyticsSnapshot.period_type == "monthly")
+    ).scalar()
+    assert rolled_up < month_start
@@ -0,0 +1,95 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import orjson
+import pytest
+from starlette.requests import Request
+
+from app.models import AIInsight, AnalyticsSnapshot, ConnectedAccount, Video
+from app.routers.ai_suggestions import build_suggestions
+from app.routers.analytics import _build_growth, _build_overview, _build_videos_page, analytics_dashboard
+from app.utils import redis_client
+
+
+def _request(etag: str | None = None) -> Request:
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "method": "GET", "path": "/analytics/dashboard", "headers": headers})
+
+
+def _dashboard(user_id, etag=None):
+    return asyncio.run(analytics_dashboard(
+        _request(etag), period_days=30, page_size=3, suggestions_limit=2, user_id=user_id,
+    ))
+
+
+@pytest.fixture
+def user_id(session, account_id) -> int:
+    now = datetime.utcnow()
+    for i in range(5):
+        session.add(Video(
+            connected_account_id=account_id, external_id=f"v{i}", title=f"Video {i}",
+            published_at=now - timedelta(days=i), view_count=100 * i, like_count=i, comment_count=1,
+        ))
+    for day in range(3):
+        session.add(AnalyticsSnapshot(
+            connected_account_id=account_id, snapshot_date=now - timedelta(days=day), period_type="daily",
+            total_views=1000 - day, subscriber_count=50 - day,
+        ))
+    user_id = session.get(ConnectedAccount, account_id).user_id
+    for i in range(3):
+        session.add(AIInsight(
+            user_id=user_id, insight_type="engagement", title=f"Tip {i}", content="...",
+            created_at=now - timedelta(hours=i),
+        ))
+    session.commit()
+    return user_id
+
+
+def test_dashboard_fans_out_sections_and_reuses_cached_ones(run_async, app_sessions, redis_calls, account_id, user_id):
+    response = _dashboard(user_id)
+    body = json.loads(response.body)
+
+    # Four section builds plus one shared account lookup, running side by side
+    assert app_sessions["opened"] == 5
+    assert app_sessions["peak"] > 1
+
+    async def standalone(db):
+        sections = {
+            "overview": await _build_overview(db, account_id, 30),
+            "growth": await _build_growth(db, account_id, 30),
+            "videos": await _build_videos_page(db, account_id, 1, 3),
+            "suggestions": await build_suggestions(db, user_id, 2),
+        }
+        return {name: orjson.loads(orjson.dumps(s.model_dump())) for name, s in sections.items()}
+
+    assert body == run_async(standalone)
+    assert len(body["videos"]["items"]) == 3 and len(body["growth"]["data"]) == 3
+    assert [s["title"] for s in body["suggestions"]["items"]] == ["Tip 0", "Tip 1"]
+
+    # Fully cached: no session at all, same body and ETag; a matching ETag gets a 304
+    app_sessions["opened"] = 0
+    again = _dashboard(user_id)
+    assert app_sessions["opened"] == 0
+    assert (again.body, again.headers["etag"]) == (response.body, response.headers["etag"])
+    assert _dashboard(user_id, etag=response.headers["etag"]).status_code == 304
+
+    # One section dropped: only it (and the account lookup it needs) is rebuilt; same data, same ETag
+    asyncio.run(redis_client.cache_delete(f"analytics:overview:{user_id}:30"))
+    redis_client._local.clear()
+    after = _dashboard(user_id)
+    assert app_sessions["opened"] == 2
+    assert (after.body, after.headers["etag"]) == (response.body, response.headers["etag"])
+
+
+def test_dashboard_without_an_account_has_empty_sections(app_sessions, redis_calls, session, account_id, user_id):
+    session.delete(session.get(ConnectedAccount, account_id))
+    session.query(Video).delete()
+    session.query(AnalyticsSnapshot).delete()
+    session.commit()
+
+    body = json.loads(_dashboard(user_id).body)
+
+    assert body["overview"]["total_videos"] == 0
+    assert body["growth"]["data"] == [] and body["videos"]["items"] == []
+    assert body["suggestions"]["total"] == 3
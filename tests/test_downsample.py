@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from app.services.downsample import lttb_indices, reduce_series
+
+
+def reference_lttb(points: list[tuple[float, float]], threshold: int) -> list[int]:
+    """Plain-Python LTTB (Steinarsson 2013) with integer bucket bounds."""
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    def edge(k):  # first index of bucket k; bucket threshold - 2 is the last point alone
+        return k * (n - 2) // (threshold - 2) + 1
+
+    selected, a = [0], 0
+    for k in range(threshold - 2):
+        following = points[edge(k + 1):edge(k + 2)] if k < threshold - 3 else points[n - 1:]
+        avg_x = sum(p[0] for p in following) / len(following)
+        avg_y = sum(p[1] for p in following) / len(following)
+        best_area, best = -1.0, None
+        for i in range(edge(k), edge(k + 1)):
+            area = abs((points[a][0] - avg_x) * (points[i][1] - points[a][1])
+                       - (points[a][0] - points[i][0]) * (avg_y - points[a][1]))
+            if area > best_area:
+                best_area, best = area, i
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+def _series(n):
+    rng = np.random.default_rng(n)
+    return np.cumsum(rng.random(n) + 0.1), np.cumsum(rng.normal(size=n))
+
+
+@pytest.mark.parametrize("n", [5, 97, 1000, 3650])
+def test_lttb_matches_reference(n):
+    x, y = _series(n)
+    points = list(zip(x.tolist(), y.tolist()))
+    for threshold in sorted({3, 4, n // 7, n // 3, n // 2, n - 1}):
+        if threshold >= 3:
+            assert lttb_indices(x, y, threshold).tolist() == reference_lttb(points, threshold), threshold
+
+
+# Bucket edges k * (n - 2) / (threshold - 2) that are whole numbers but come out
+# just below them in floating point
+@pytest.mark.parametrize("n, threshold", [(32, 15), (32, 24), (60, 27), (116, 84), (158, 150)])
+def test_lttb_bucket_edges_are_exact(n, threshold):
+    x, y = _series(n)
+    assert lttb_indices(x, y, threshold).tolist() == reference_lttb(list(zip(x.tolist(), y.tolist())), threshold)
+
+
+def test_lttb_returns_everything_when_nothing_to_drop():
+    x = np.arange(10.0)
+    assert lttb_indices(x, x, 10).tolist() == list(range(10))
+    assert lttb_indices(x, x, 50).tolist() == list(range(10))
+    assert lttb_indices(x, x, 2).tolist() == list(range(10))
+
+
+def test_reduce_series_keeps_ends_and_every_metrics_spike():
+    n = 5000
+    x = np.arange(n, dtype=np.float64)
+    views, subscribers = np.linspace(0, 1e6, n), np.linspace(100, 200, n)
+    views[1234] += 1e6
+    subscribers[3210] -= 90
+
+    keep = reduce_series(x, [views, subscribers], 200)
+    assert len(keep) <= 200
+    assert keep[0] == 0 and keep[-1] == n - 1
+    assert 1234 in keep and 3210 in keep
+    assert np.all(np.diff(keep) > 0)
+    assert len(keep) > 150  # the budget is filled beyond 100 points per metric
+
+
+def test_reduce_series_short_series_untouched():
+    x = np.arange(20.0)
+    assert reduce_series(x, [x, -x], 20).tolist() == list(range(20))
@@ -0,0 +1,111 @@
+import asyncio
+import csv
+import io
+from datetime import datetime, timedelta
+
+import orjson
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.models import AnalyticsSnapshot, ConnectedAccount, Video
+from app.routers.analytics import analytics_export
+from app.services import export
+from app.services.export import iter_export, open_encoder
+
+N_VIDEOS = 10
+CHUNK = 4
+
+
+@pytest.fixture
+def user_id(session, account_id, monkeypatch, redis_calls) -> int:
+    monkeypatch.setattr(settings, "EXPORT_CHUNK_ROWS", CHUNK)
+    start = datetime(2026, 1, 1, 8, 30)
+    for i in range(N_VIDEOS):
+        session.add(Video(
+            connected_account_id=account_id, external_id=f"v{i}", title=f"Video, \"{i}\"",
+            published_at=start + timedelta(days=i), view_count=100 * i, like_count=i, comment_count=i // 2,
+        ))
+    for day in range(3):
+        session.add(AnalyticsSnapshot(
+            connected_account_id=account_id, snapshot_date=start + timedelta(days=day), period_type="daily",
+            total_views=1000 + day, subscriber_count=50 + day,
+        ))
+    session.commit()
+    return session.get(ConnectedAccount, account_id).user_id
+
+
+def _export(user_id, dataset, fmt) -> list[bytes]:
+    async def main():
+        response = await analytics_export(dataset=dataset, fmt=fmt, user_id=user_id)
+        return response, [chunk async for chunk in response.body_iterator]
+    response, chunks = asyncio.run(main())
+    assert response.media_type == export.FORMATS[fmt][0]
+    return chunks
+
+
+def _expected_videos(session) -> list[dict]:
+    return [
+        {"id": v.id, "external_id": v.external_id, "title": v.title, "published_at": v.published_at, "view_count": v.view_count}
+        for v in session.query(Video).order_by(Video.id)
+    ]
+
+
+def _parse(fmt: str, data: bytes) -> list[dict]:
+    """The checked columns of an exported videos file, typed back."""
+    if fmt == "csv":
+        rows = list(csv.DictReader(io.StringIO(data.decode())))
+    elif fmt == "ndjson":
+        rows = [orjson.loads(line) for line in data.splitlines()]
+    else:
+        rows = export.pq.read_table(io.BytesIO(data)).to_pylist()
+    return [
+        {
+            "id": int(r["id"]), "external_id": r["external_id"], "title": r["title"],
+            "published_at": r["published_at"] if isinstance(r["published_at"], datetime)
+            else datetime.fromisoformat(r["published_at"]),
+            "view_count": int(r["view_count"]),
+        }
+        for r in rows
+    ]
+
+
+@pytest.mark.parametrize("fmt", ["csv", "ndjson", "parquet"])
+def test_export_streams_every_row_in_chunks(fmt, session, app_sessions, user_id):
+    if fmt == "parquet" and not export.parquet_available():
+        pytest.skip("pyarrow not installed")
+
+    chunks = _export(user_id, "videos", fmt)
+
+    # One encoded chunk per CHUNK rows, as the cursor is read; plus the CSV header or the Parquet magic and footer
+    partitions = -(-N_VIDEOS // CHUNK)
+    assert len(chunks) == partitions + {"csv": 1, "ndjson": 0, "parquet": 2}[fmt]
+    assert _parse(fmt, b"".join(chunks)) == _expected_videos(session)
+    if fmt == "parquet":
+        assert export.pq.ParquetFile(io.BytesIO(b"".join(chunks))).num_row_groups == partitions
+
+
+def test_sync_export_matches_the_streamed_one(session, app_sessions, account_id, user_id):
+    encoder = open_encoder("snapshots", "ndjson")
+    chunks = list(iter_export(session, "snapshots", account_id, encoder, chunk_rows=2))
+
+    assert [len(c.splitlines()) for c in chunks] == [0, 2, 1, 0]  # begin, two partitions, finish
+    assert encoder.rows == 3
+    assert b"".join(chunks) == b"".join(_export(user_id, "snapshots", "ndjson"))
+    rows = [orjson.loads(line) for line in b"".join(chunks).splitlines()]
+    assert [(r["total_views"], r["subscriber_count"]) for r in rows] == [(1000, 50), (1001, 51), (1002, 52)]
+
+
+def test_export_errors(session, app_sessions, account_id, user_id, monkeypatch):
+    monkeypatch.setattr(export, "pa", None)
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(analytics_export(dataset="videos", fmt="parquet", user_id=user_id))
+    assert e.value.status_code == 400
+
+    session.query(Video).delete()
+    session.query(AnalyticsSnapshot).delete()
+    session.delete(session.get(ConnectedAccount, account_id))
+    session.commit()
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(analytics_export(dataset="videos", fmt="csv", user_id=user_id))
+    assert e.value.status_code == 404
@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.models import AnalyticsSnapshot, ChannelRollup, Video
+from app.services.ingest import upsert_snapshots, upsert_videos
+from app.services.rollups import check_rollups
+
+
+def _videos(session, account_id) -> dict[str, Video]:
+    session.expire_all()
+    return {
+        v.external_id: v
+        for v in session.execute(select(Video).where(Video.connected_account_id == account_id)).scalars()
+    }
+
+
+def _video(account_id, external_id, views, **fields) -> dict:
+    return {
+        "connected_account_id": account_id, "external_id": external_id,
+        "view_count": views, "like_count": views // 10, "comment_count": views // 100, **fields,
+    }
+
+
+def test_upsert_inserts_then_updates_counters(session, account_id):
+    assert upsert_videos(session, [_video(account_id, "a", 100), _video(account_id, "b", 50)]) == 2
+    session.commit()
+    assert upsert_videos(session, [_video(account_id, "a", 150), _video(account_id, "b", 50)]) == 1
+    session.commit()
+
+    videos = _videos(session, account_id)
+    assert (videos["a"].view_count, videos["b"].view_count) == (150, 50)
+    assert check_rollups(session) == []
+
+
+def test_upsert_mixed_key_batch_keeps_fields_a_record_omits(session, account_id):
+    upsert_videos(session, [
+        _video(account_id, "a", 10, title="A", thumbnail_url="a.jpg"),
+        _video(account_id, "b", 10, title="B", thumbnail_url="b.jpg"),
+    ])
+    session.commit()
+
+    # First record without optional fields, a later one with a field the first lacks
+    upsert_videos(session, [
+        _video(account_id, "a", 20),
+        _video(account_id, "b", 30, title="B2"),
+        _video(account_id, "c", 40, duration_seconds=61),
+    ])
+    session.commit()
+
+    videos = _videos(session, account_id)
+    assert (videos["a"].title, videos["a"].thumbnail_url, videos["a"].view_count) == ("A", "a.jpg", 20)
+    assert (videos["b"].title, videos["b"].thumbnail_url, videos["b"].view_count) == ("B2", "b.jpg", 30)
+    assert videos["c"].duration_seconds == 61
+    assert check_rollups(session) == []
+
+
+def test_upsert_merges_repeated_records_field_by_field(session, account_id):
+    upsert_videos(session, [
+        _video(account_id, "a", 10, title="first"),
+        _video(account_id, "a", 12, thumbnail_url="later.jpg"),
+    ])
+    session.commit()
+
+    video = _videos(session, account_id)["a"]
+    assert (video.title, video.thumbnail_url, video.view_count) == ("first", "later.jpg", 12)
+
+
+def test_upsert_snapshots_keeps_values_a_record_omits(session, account_id):
+    day = datetime(2026, 3, 1)
+    upsert_snapshots(session, [{
+        "connected_account_id": account_id, "snapshot_date": day,
+        "total_views": 500, "subscriber_count": 40,
+    }])
+    session.commit()
+    upsert_snapshots(session, [
+        {"connected_account_id": account_id, "snapshot_date": day, "subscriber_count": 45},
+        {"connected_account_id": account_id, "snapshot_date": datetime(2026, 3, 2), "total_views": 520},
+    ])
+    session.commit()
+
+    rows = {
+        s.snapshot_date: s
+        for s in session.execute(select(AnalyticsSnapshot).order_by(AnalyticsSnapshot.snapshot_date)).scalars()
+    }
+    assert (rows[day].total_views, rows[day].subscriber_count, rows[day].period_type) == (500, 45, "daily")
+    assert rows[datetime(2026, 3, 2)].total_views == 520
+    assert check_rollups(session) == []
+
+
+def test_upsert_snapshots_keeps_the_rollups_subscriber_count(session, account_id):
+    day = datetime(2026, 3, 1)
+    upsert_snapshots(session, [{"connected_account_id": account_id, "snapshot_date": day, "subscriber_count": 45}])
+    session.commit()
+    upsert_snapshots(session, [{"connected_account_id": account_id, "snapshot_date": day, "total_views": 900}])
+    session.commit()
+
+    rollup = session.get(ChannelRollup, account_id)
+    assert (rollup.subscriber_count, rollup.latest_snapshot_date) == (45, day)
+
+    # A newer day without a count is stored with the default, and becomes the latest
+    upsert_snapshots(session, [{"connected_account_id": account_id, "snapshot_date": day + timedelta(days=1)}])
+    session.commit()
+    session.refresh(rollup)
+    assert (rollup.subscriber_count, rollup.latest_snapshot_date) == (0, day + timedelta(days=1))
@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.models import AnalyticsSnapshot, ConnectedAccount, User, Video
+from app.services.insight_engine import compute_signals, insights_for_accounts, load_batch
+
+NOW = datetime(2026, 6, 1, 12, 0)
+
+
+def _account(session, name) -> int:
+    account = ConnectedAccount(
+        user=User(email=f"{name}@example.com", hashed_password="x"), platform="youtube", channel_name=name,
+    )
+    session.add(account)
+    session.flush()
+    return account.id
+
+
+def _videos(session, account_id, rows):
+    """rows: (days ago, hour, views, likes, comments, title)"""
+    for i, (ago, hour, views, likes, comments, title) in enumerate(rows):
+        published = (NOW - timedelta(days=ago)).replace(hour=hour, minute=0)
+        session.add(Video(
+            connected_account_id=account_id, external_id=f"{account_id}-{i}", title=title, published_at=published,
+            view_count=views, like_count=likes, comment_count=comments,
+        ))
+
+
+def _snapshots(session, account_id, counts):
+    """counts: (days ago, subscriber_count)"""
+    for ago, subs in counts:
+        session.add(AnalyticsSnapshot(
+            connected_account_id=account_id, snapshot_date=NOW - timedelta(days=ago), period_type="daily",
+            subscriber_count=subs,
+        ))
+
+
+@pytest.fixture
+def channels(session):
+    steady = _account(session, "steady")
+    _videos(session, steady, [
+        (2, 18, 9000, 900, 90, "A long and very descriptive title"),
+        (9, 18, 7000, 630, 70, "Another fairly long descriptive title"),
+        (16, 9, 2000, 160, 20, "Short one"),
+        (23, 9, 1500, 100, 20, "Tiny"),
+        (60, 9, 1000, 60, 10, "Mid length title"),
+        (67, 18, 5000, 250, 50, "Quite a long title here"),
+    ])
+    _snapshots(session, steady, [(40, 500), (28, 1000), (14, 1050), (1, 1100)])
+    lapsed = _account(session, "lapsed")
+    _videos(session, lapsed, [
+        (50, 12, 300, 10, 1, "First"),
+        (45, 12, 200, 8, 0, "Second"),
+    ])
+    _snapshots(session, lapsed, [(20, 2000), (3, 1900)])
+    empty = _account(session, "empty")
+    session.commit()
+    return steady, lapsed, empty
+
+
+def _reference(session, account_id):
+    """Per-account signals computed the straightforward way."""
+    videos = session.query(Video).filter_by(connected_account_id=account_id).all()
+    days = np.array([(v.published_at - NOW).total_seconds() / 86400 for v in videos])
+    views = np.array([v.view_count for v in videos], dtype=float)
+    engagement = np.array([(v.like_count + v.comment_count) / max(v.view_count, 1) for v in videos])
+    by_hour = {}
+    for v in videos:
+        by_hour.setdefault(v.published_at.hour, []).append(v.view_count)
+    best_hour = max(by_hour, key=lambda h: np.mean(by_hour[h]))
+    gaps = np.diff(np.sort(days))
+    return {
+        "n_videos": len(videos),
+        "best_hour": best_hour,
+        "best_hour_lift": np.mean(by_hour[best_hour]) / views.mean(),
+        "engagement_trend": np.polyfit(days, engagement, 1)[0] * 30 / engagement.mean(),
+        "title_corr": np.corrcoef([len(v.title) for v in videos], np.log1p(views))[0, 1],
+        "mean_gap_days": gaps.mean(),
+        "max_gap_days": gaps.max(),
+        "days_since_upload": -days.max(),
+    }
+
+
+def test_batched_signals_match_per_account_computation(session, channels):
+    batch = load_batch(session, list(channels), now=NOW)
+    signals = compute_signals(batch)
+    positions = {a: i for i, a in enumerate(batch.account_ids.tolist())}
+
+    for account_id in channels[:2]:
+        i = positions[account_id]
+        for name, expected in _reference(session, account_id).items():
+            assert getattr(signals, name)[i] == pytest.approx(expected), name
+
+    steady, lapsed, empty = (positions[a] for a in channels)
+    # Only snapshots inside the 30-day window count: 1000 -> 1100, 2000 -> 1900
+    assert signals.subscriber_growth[steady] == pytest.approx(0.10)
+    assert signals.subscriber_growth[lapsed] == pytest.approx(-0.05)
+    assert signals.n_videos[empty] == 0
+    assert signals.days_since_upload[empty] == np.inf
+    assert signals.subscriber_growth[empty] == 0
+
+
+def test_insights_for_accounts_phrases_the_signals(session, channels):
+    steady, lapsed, empty = channels
+    # insights_for_accounts measures from the current time; move the data there, keeping the hours
+    shift = timedelta(days=(datetime.utcnow() - NOW).days)
+    for video in session.query(Video):
+        video.published_at += shift
+    for snapshot in session.query(AnalyticsSnapshot):
+        snapshot.snapshot_date += shift
+    session.commit()
+
+    insights = insights_for_accounts(session, [steady, lapsed, empty])
+
+    assert empty not in insights
+    steady_types = {i[0]: i for i in insights[steady]}
+    assert steady_types["posting_time"][1] == "Post around 6 PM"
+    assert steady_types["growth"][1] == "Strong subscriber growth"
+    assert steady_types["titles"][1] == "Try more descriptive titles"
+    lapsed_titles = [i[1] for i in insights[lapsed]]
+    # Too few videos for the per-video statistics; cadence and growth still apply
+    assert lapsed_titles == ["Time for a new upload", "Subscribers are slipping"]
+    priorities = [i[3] for i in insights[steady]]
+    assert priorities == sorted(priorities, key=["high", "medium", "low"].index)
+    assert insights_for_accounts(session, []) == {}
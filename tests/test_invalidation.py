@@ -0,0 +1,89 @@
+import asyncio
+
+import fakeredis
+
+from app.utils import redis_client
+from app.utils.redis_client import (
+    INVALIDATION_CHANNEL, cache_get, cache_get_or_compute, cache_set, invalidate_tags, user_tag,
+)
+
+TAG = user_tag(1)
+
+
+def _body(body: bytes):
+    async def compute() -> bytes:
+        return body
+    return compute
+
+
+async def _redis_keys(*keys):
+    r = await redis_client.get_redis()
+    return [await r.exists(k) for k in keys]
+
+
+def test_tag_set_outlives_every_tagged_key(redis_calls):
+    async def main():
+        r = await redis_client.get_redis()
+        await cache_get_or_compute("long", _body(b"1"), ttl_seconds=3600, beta=0, tags=(TAG,))
+        await cache_set("short", [1], ttl_seconds=60, tags=(TAG,))
+        assert await r.ttl(f"cache:tag:{TAG}") > 3500  # the shorter write did not shorten it
+
+        await cache_set("longer", [2], ttl_seconds=7200, tags=(TAG,))
+        assert await r.ttl(f"cache:tag:{TAG}") > 7100
+    asyncio.run(main())
+
+
+def test_invalidation_clears_both_tiers(redis_calls):
+    async def main():
+        await cache_get_or_compute("body", _body(b"old"), ttl_seconds=3600, beta=0, tags=(TAG,))
+        await cache_set("value", [1], ttl_seconds=60, tags=(TAG,))
+        await cache_set("other", [2], ttl_seconds=60, tags=(user_tag(2),))
+        assert redis_client._local.get("body") is not None and redis_client._local.get("value") == [1]
+
+        await invalidate_tags(TAG)
+        assert redis_client._local.get("body") is None and redis_client._local.get("value") is None
+        assert await _redis_keys("body", "value", "other") == [0, 0, 1]
+        assert await cache_get("value") is None and await cache_get("other") == [2]
+        assert (await cache_get_or_compute("body", _body(b"new"), beta=0, tags=(TAG,))).body == b"new"
+    asyncio.run(main())
+
+
+def test_sync_invalidation_clears_both_tiers(redis_calls, fake_redis_server, monkeypatch):
+    monkeypatch.setattr(
+        redis_client, "get_sync_redis", lambda: fakeredis.FakeRedis(server=fake_redis_server, decode_responses=True)
+    )
+    asyncio.run(cache_set("value", [1], ttl_seconds=60, tags=(TAG,)))
+
+    redis_client.invalidate_tags_sync(TAG)
+    assert redis_client._local.get("value") is None
+    assert asyncio.run(_redis_keys("value")) == [0]
+
+
+def test_other_workers_evict_local_copies(redis_calls):
+    async def main():
+        redis_client.start_invalidation_listener()
+        try:
+            await asyncio.sleep(0.05)  # subscribed
+            redis_client._local.set("value", [1])  # this worker's copy
+            r = await redis_client.get_redis()
+            await r.publish(INVALIDATION_CHANNEL, "value")  # another worker invalidated it
+            for _ in range(50):
+                if redis_client._local.get("value") is None:
+                    break
+                await asyncio.sleep(0.01)
+            assert redis_client._local.get("value") is None
+        finally:
+            await redis_client.stop_invalidation_listener()
+    asyncio.run(main())
+
+
+def test_fill_racing_an_invalidation_is_not_cached(redis_calls):
+    async def main():
+        async def compute() -> bytes:
+            await invalidate_tags(TAG)  # data changed while this was being computed
+            return b"maybe stale"
+
+        assert (await cache_get_or_compute("body", compute, beta=0, tags=(TAG,))).body == b"maybe stale"
+        assert redis_client._local.get("body") is None
+        assert await _redis_keys("body") == [0]
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core import database
+from app.core.config import settings
+from app.core.database import Replica, read_session_scope, session_scope
+from app.models import AIInsight, ConnectedAccount
+from app.utils.redis_client import mark_recent_writes
+
+
+@pytest.fixture
+def replica(monkeypatch, db_path, app_sessions, redis_calls):
+    """One replica serving the test database; reads on the primary are counted by app_sessions."""
+    replica = Replica(f"sqlite+aiosqlite:///{db_path}")
+    monkeypatch.setattr(database, "replicas", [replica])
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URLS", [str(replica.engine.url)])
+    yield replica
+    asyncio.run(replica.engine.dispose())
+
+
+def _routes(replica, *user_ids) -> list[str]:
+    """Where read_session_scope sends each user's read."""
+    async def main():
+        out = []
+        for user_id in user_ids:
+            async with read_session_scope(user_id) as db:
+                assert replica.in_flight == (1 if db.info.get("replica") else 0)
+                out.append("replica" if db.info.get("replica") else "primary")
+            assert replica.in_flight == 0
+        await replica.engine.dispose()  # its pooled connections belong to this event loop
+        return out
+    return asyncio.run(main())
+
+
+def test_reads_go_to_a_usable_replica(replica, app_sessions):
+    assert _routes(replica, 1) == ["primary"]  # not checked yet: lag unknown
+
+    asyncio.run(replica.check())
+    assert (replica.healthy, replica.lag_seconds) == (True, 0.0)
+    app_sessions["opened"] = 0
+    assert _routes(replica, 1, 2, None) == ["replica"] * 3
+    assert app_sessions["opened"] == 0
+
+
+def test_lagging_or_unhealthy_replica_falls_back_to_the_primary(replica, monkeypatch):
+    replica.healthy, replica.lag_seconds = True, settings.REPLICA_MAX_LAG_SECONDS + 1
+    assert _routes(replica, 1) == ["primary"]
+
+    replica.healthy, replica.lag_seconds = False, 0.0
+    assert _routes(replica, 1) == ["primary"]
+
+    monkeypatch.setattr(replica, "engine", create_async_engine("sqlite+aiosqlite:////nonexistent/dir/db"))
+    replica.healthy = True
+    asyncio.run(replica.check())
+    assert not replica.healthy
+
+
+def test_a_user_who_just_wrote_reads_from_the_primary(replica, session, account_id):
+    replica.healthy, replica.lag_seconds = True, 0.0
+    writer = session.get(ConnectedAccount, account_id).user_id
+
+    async def write():
+        async with session_scope() as db:
+            db.add(AIInsight(user_id=writer, insight_type="engagement", title="Tip", content="..."))
+    asyncio.run(write())
+
+    # The commit pinned the writer to the primary; everyone else still reads from the replica
+    assert _routes(replica, writer, writer + 1) == ["primary", "replica"]
+
+
+def test_sticky_window_expires(replica):
+    replica.healthy, replica.lag_seconds = True, 0.0
+    asyncio.run(mark_recent_writes([1], 0.05))
+    assert _routes(replica, 1) == ["primary"]
+
+    asyncio.run(asyncio.sleep(0.1))
+    assert _routes(replica, 1) == ["replica"]
+
+
+def test_redis_outage_keeps_reads_on_the_primary(replica, monkeypatch):
+    replica.healthy, replica.lag_seconds = True, 0.0
+
+    async def unavailable():
+        raise ConnectionError("redis down")
+    monkeypatch.setattr("app.utils.redis_client.get_redis", unavailable)
+
+    # Can't tell whether the user just wrote: don't risk a stale read
+    assert _routes(replica, 1, None) == ["primary", "replica"]
@@ -0,0 +1,198 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+
+from app.models import AnalyticsSnapshot, ChannelRollup, ConnectedAccount, Video, VideoDailyStat
+from app.routers.analytics import _build_overview
+from app.services.ingest import upsert_videos
+from app.services.rollups import BASELINE_DATE, add_daily_stats, check_rollups
+
+
+def _rollup(session, account_id):
+    rollup = session.get(ChannelRollup, account_id)
+    return (
+        rollup.total_views, rollup.total_likes, rollup.total_comments, rollup.total_videos,
+        rollup.subscriber_count,
+    )
+
+
+def _buckets(session):
+    return session.execute(
+        select(VideoDailyStat.video_id, VideoDailyStat.bucket_date, VideoDailyStat.views)
+        .order_by(VideoDailyStat.video_id, VideoDailyStat.bucket_date)
+    ).all()
+
+
+def _overview(run_async, account_id, period_days):
+    async def build(db):
+        overview = await _build_overview(db, account_id, period_days)
+        await db.commit()  # as session_scope does: keeps a first-read backfill
+        return overview
+    return run_async(build)
+
+
+def test_counters_a_video_arrives_with_are_not_window_gains(session, run_async, account_id):
+    session.add(Video(
+        connected_account_id=account_id, external_id="new", published_at=datetime.utcnow() - timedelta(days=2),
+        view_count=1000, like_count=100, comment_count=10,
+    ))
+    session.commit()
+    upsert_videos(session, [{
+        "connected_account_id": account_id, "external_id": "ingested", "published_at": datetime.utcnow(),
+        "view_count": 500, "like_count": 50, "comment_count": 5,
+    }])
+    session.commit()
+
+    for days in (7, 30):
+        overview = _overview(run_async, account_id, days)
+        assert (overview.total_views, overview.total_likes, overview.total_comments) == (0, 0, 0)
+        assert overview.total_videos == 2
+
+
+def test_windows_count_gains_recorded_inside_them(session, run_async, account_id):
+    video = Video(
+        connected_account_id=account_id, external_id="v", published_at=datetime(2025, 1, 1),
+        view_count=1000, like_count=100, comment_count=10,
+    )
+    session.add(video)
+    session.commit()
+    # A sync 20 days ago, and one today
+    add_daily_stats(session, [{
+        "video_id": video.id, "connected_account_id": account_id,
+        "bucket_date": date.today() - timedelta(days=20), "views": 300, "likes": 30, "comments": 3,
+    }])
+    session.commit()
+    session.refresh(video)
+    video.view_count, video.like_count = 1050, 104
+    session.commit()
+
+    week, month = _overview(run_async, account_id, 7), _overview(run_async, account_id, 30)
+    assert (week.total_views, week.total_likes, week.total_comments) == (50, 4, 0)
+    assert (month.total_views, month.total_likes, month.total_comments) == (350, 34, 3)
+
+
+def test_backfill_books_existing_counters_as_baseline(session, run_async, account_id):
+    # An account from before rollups: videos written without the hooks, no rollup row
+    session.execute(Video.__table__.insert(), [
+        {"connected_account_id": account_id, "external_id": f"old{i}", "published_at": datetime.utcnow(),
+         "view_count": 10, "like_count": 1, "comment_count": 0}
+        for i in range(3)
+    ])
+    session.execute(ChannelRollup.__table__.delete())
+    session.commit()
+
+    overview = _overview(run_async, account_id, 30)
+    assert (overview.total_views, overview.total_videos) == (0, 3)
+    buckets = session.execute(select(VideoDailyStat.bucket_date, VideoDailyStat.views)).all()
+    assert buckets == [(BASELINE_DATE, 10)] * 3
+
+
+def test_rollup_follows_video_inserts_updates_and_deletes(session, account_id):
+    a = Video(connected_account_id=account_id, external_id="a", view_count=100, like_count=10, comment_count=1)
+    b = Video(connected_account_id=account_id, external_id="b", view_count=50, like_count=5, comment_count=0)
+    session.add_all([a, b])
+    session.commit()
+    assert _rollup(session, account_id) == (150, 15, 1, 2, 0)
+
+    session.refresh(a)
+    a.view_count, a.comment_count = 130, 4
+    session.commit()
+    assert _rollup(session, account_id) == (180, 15, 4, 2, 0)
+    assert _buckets(session) == [
+        (a.id, BASELINE_DATE, 100), (a.id, date.today(), 30), (b.id, BASELINE_DATE, 50),
+    ]
+
+    session.delete(a)
+    session.commit()
+    assert _rollup(session, account_id) == (50, 5, 0, 1, 0)
+    assert _buckets(session) == [(b.id, BASELINE_DATE, 50)]
+    assert check_rollups(session) == []
+
+
+def test_rollup_moves_with_a_video_between_accounts(session, account_id):
+    other = ConnectedAccount(user_id=session.get(ConnectedAccount, account_id).user_id, platform="youtube")
+    video = Video(connected_account_id=account_id, external_id="v", view_count=70, like_count=7, comment_count=0)
+    session.add_all([other, video])
+    session.commit()
+
+    video.connected_account_id = other.id
+    session.commit()
+    assert _rollup(session, account_id) == (0, 0, 0, 0, 0)
+    assert _rollup(session, other.id) == (70, 7, 0, 1, 0)
+    assert check_rollups(session) == []
+
+
+def test_subscriber_count_comes_from_the_latest_past_snapshot(session, account_id):
+    now = datetime.utcnow()
+    older, latest, future = (
+        AnalyticsSnapshot(
+            connected_account_id=account_id, snapshot_date=now - timedelta(days=d), period_type="daily",
+            subscriber_count=n,
+        )
+        for d, n in ((2, 100), (1, 120), (-1, 999))
+    )
+    session.add_all([older, latest, future])
+    session.commit()
+    assert _rollup(session, account_id)[4] == 120
+
+    session.delete(latest)
+    session.commit()
+    assert _rollup(session, account_id)[4] == 100
+    assert check_rollups(session) == []
+
+
+def test_check_rollups_reports_and_repairs_drift(session, account_id):
+    session.add(Video(connected_account_id=account_id, external_id="v", view_count=10, like_count=1, comment_count=0))
+    session.commit()
+    # Writes that bypass the ORM hooks
+    session.execute(Video.__table__.update().values(view_count=25))
+    session.execute(ChannelRollup.__table__.update().values(total_videos=5))
+    session.commit()
+
+    assert check_rollups(session) == [account_id]
+    assert _rollup(session, account_id) == (10, 1, 0, 5, 0)  # checking alone changes nothing
+    assert check_rollups(session, repair=True) == [account_id]
+    assert _rollup(session, account_id) == (25, 1, 0, 1, 0)
+    assert check_rollups(session) == []
+
+
+def test_check_rollups_repairs_a_missing_rollup(session, account_id):
+    session.add(Video(connected_account_id=account_id, external_id="v", view_count=10, like_count=1, comment_count=0))
+    session.commit()
+    session.execute(ChannelRollup.__table__.delete())
+    session.commit()
+
+    assert check_rollups(session, repair=True, batch_size=1) == [account_id]
+    assert _rollup(session, account_id) == (10, 1, 0, 1, 0)
+
+
+def test_check_rollups_compares_the_subscriber_count(session, account_id):
+    day = datetime.utcnow() - timedelta(days=1)
+    session.add(AnalyticsSnapshot(connected_account_id=account_id, snapshot_date=day, period_type="daily",
+                                  subscriber_count=45))
+    session.commit()
+    session.execute(ChannelRollup.__table__.update().values(subscriber_count=0))
+    session.commit()
+
+    assert check_rollups(session, repair=True) == [account_id]
+    assert _rollup(session, account_id)[4] == 45
+    assert check_rollups(session) == []
+
+
+def test_compacted_rows_never_become_the_latest_snapshot(session, account_id):
+    now = datetime.utcnow()
+    session.add_all([
+        AnalyticsSnapshot(connected_account_id=account_id, snapshot_date=now - timedelta(days=3),
+                          period_type="daily", subscriber_count=120),
+        # A weekly rollup dated later than the daily row (e.g. this week's start)
+        AnalyticsSnapshot(connected_account_id=account_id, snapshot_date=now - timedelta(days=1),
+                          period_type="weekly", subscriber_count=999),
+    ])
+    session.commit()
+    assert _rollup(session, account_id)[4] == 120
+
+    session.execute(ChannelRollup.__table__.delete())
+    session.commit()
+    assert check_rollups(session, repair=True) == [account_id]
+    assert _rollup(session, account_id)[4] == 120
+    assert check_rollups(session) == []
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from app.models import AnalyticsSnapshot, ConnectedAccount, PeerSketch, User, Video
+from app.services.peer_benchmarks import rebuild_sketches, update_accounts
+from app.services.sketches import DDSketch
+
+
+def _state(sketch: DDSketch):
+    return sketch.positive, sketch.negative, sketch.zero_count
+
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(7)
+    return np.concatenate([rng.lognormal(5, 3, 5000), -rng.lognormal(1, 1, 300), np.zeros(40)])
+
+
+def test_merge_equals_one_sketch_of_everything(values):
+    whole = DDSketch()
+    whole.add_many(values)
+    merged = DDSketch()
+    for part in np.array_split(values, 7):
+        sketch = DDSketch()
+        sketch.add_many(part)
+        merged.merge(sketch)
+    assert _state(merged) == _state(whole)
+
+
+def test_add_and_remove_equal_a_rebuild(values):
+    sketch = DDSketch()
+    for v in values.tolist():
+        sketch.add(v)
+    for v in values[::3].tolist():
+        sketch.remove(v)
+    rebuilt = DDSketch()
+    rebuilt.add_many(np.delete(values, np.arange(0, len(values), 3)))
+    assert _state(sketch) == _state(rebuilt)
+    assert all(n > 0 for n in (*sketch.positive.values(), *sketch.negative.values()))
+
+
+def test_quantiles_within_relative_accuracy(values):
+    sketch = DDSketch()
+    sketch.add_many(values)
+    for q in (0.01, 0.1, 0.5, 0.9, 0.99):
+        exact = np.quantile(values, q, method="lower")
+        assert sketch.quantile(q) == pytest.approx(exact, rel=sketch.relative_accuracy, abs=1e-9)
+
+
+def test_serialization_round_trip(values):
+    sketch = DDSketch()
+    sketch.add_many(values)
+    assert _state(DDSketch.from_bytes(sketch.to_bytes())) == _state(sketch)
+    with pytest.raises(ValueError):
+        sketch.merge(DDSketch(0.02))
+
+
+def _stored_sketches(session):
+    """(metric, cohort) -> bucket state of every non-empty stored sketch."""
+    session.expire_all()
+    return {
+        (r.metric, r.cohort): _state(DDSketch.from_bytes(r.sketch))
+        for r in session.execute(select(PeerSketch)).scalars()
+        if r.count
+    }
+
+
+def test_incremental_peer_updates_equal_a_rebuild(session):
+    now = datetime.utcnow()
+    user = User(email="peers@example.com", hashed_password="x")
+    accounts = [ConnectedAccount(user=user, platform="youtube") for _ in range(30)]
+    session.add_all(accounts)
+    session.flush()
+    for i, account in enumerate(accounts):
+        session.add_all([
+            Video(connected_account_id=account.id, external_id=f"v{j}", view_count=100 * (i + 1) * (j + 1),
+                  like_count=3 * i + j, comment_count=i)
+            for j in range(i % 4 + 1)
+        ])
+        session.add_all([
+            AnalyticsSnapshot(connected_account_id=account.id, snapshot_date=now - timedelta(days=d),
+                              period_type="daily", subscriber_count=200 * (i + 1) ** 2 + 10 * (20 - d))
+            for d in (20, 1)
+        ])
+    session.commit()
+    ids = [a.id for a in accounts]
+    update_accounts(session, ids)
+    session.commit()
+
+    # Values change, a channel moves cohort, another loses every metric
+    for video in session.execute(select(Video).where(Video.connected_account_id.in_(ids[:10]))).scalars():
+        video.view_count += 5000
+    session.add(AnalyticsSnapshot(connected_account_id=ids[3], snapshot_date=now, period_type="daily",
+                                  subscriber_count=2_000_000))
+    for video in session.execute(select(Video).where(Video.connected_account_id == ids[12])).scalars():
+        session.delete(video)
+    session.execute(AnalyticsSnapshot.__table__.delete().where(AnalyticsSnapshot.connected_account_id == ids[12]))
+    session.commit()
+    assert update_accounts(session, ids[:15]) > 0
+    session.commit()
+    incremental = _stored_sketches(session)
+
+    rebuild_sketches(session)
+    session.commit()
+    assert incremental == _stored_sketches(session)
+    assert ("avg_views", "1M+") in incremental
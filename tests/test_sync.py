@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models import AccountSyncState, AnalyticsSnapshot, ChannelRollup, ConnectedAccount, User, Video
+from app.services.providers import VideoStats
+from app.services.video_sync import iter_due_account_ids, sync_account, sync_accounts
+from app.tasks import sync_tasks
+
+
+class FakeProvider:
+    """Adds `gain` views to every video; records each call. Fails for the channels in `broken`."""
+
+    def __init__(self, gain: int = 10, broken=()):
+        self.gain, self.broken = gain, set(broken)
+        self.calls: list[tuple[str | None, list[str], datetime | None]] = []
+
+    def fetch_video_stats(self, channel_id, videos, since):
+        self.calls.append((channel_id, [v.external_id for v in videos], since))
+        if channel_id in self.broken:
+            raise ConnectionError("quota exceeded")
+        return [
+            VideoStats(v.external_id, v.view_count + self.gain * (i % 2), v.like_count, v.comment_count)
+            for i, v in enumerate(videos)
+        ]
+
+    def fetch_subscriber_count(self, channel_id, current):
+        return current + 1
+
+
+@pytest.fixture
+def accounts(session) -> list[int]:
+    """Three accounts with five videos each."""
+    user = User(email="sync@example.com", hashed_password="x")
+    accounts = [ConnectedAccount(user=user, platform="youtube", channel_id=f"UC{i}") for i in range(3)]
+    session.add_all(accounts)
+    session.flush()
+    session.add_all([
+        Video(connected_account_id=a.id, external_id=f"{a.id}-{j}", view_count=100, like_count=1, comment_count=0)
+        for a in accounts for j in range(5)
+    ])
+    session.commit()
+    return [a.id for a in accounts]
+
+
+def test_sync_writes_only_changes_and_advances_the_high_water_mark(session, accounts):
+    account_id, provider = accounts[0], FakeProvider()
+    before = datetime.utcnow()
+    assert sync_account(session, account_id, provider, batch_size=2) == 2  # every other video gained
+
+    # Videos are walked in id batches; the first sync asks for everything
+    assert [len(ids) for _, ids, _ in provider.calls] == [2, 2, 1]
+    assert {since for _, _, since in provider.calls} == {None}
+    state = session.get(AccountSyncState, account_id)
+    assert state.last_synced_at >= before and state.videos_updated == 2 and state.last_error is None
+    rollup = session.get(ChannelRollup, account_id)
+    assert rollup.total_views == 520
+    snapshot = session.execute(select(AnalyticsSnapshot).where(AnalyticsSnapshot.connected_account_id == account_id))
+    assert [(s.total_views, s.period_type) for s in snapshot.scalars()] == [(520, "daily")]
+
+    # The next sync asks for changes since the mark and records no second snapshot today
+    mark = state.last_synced_at
+    provider.calls.clear()
+    sync_account(session, account_id, provider, batch_size=10)
+    assert [since for _, _, since in provider.calls] == [mark]
+    assert session.get(ChannelRollup, account_id).total_views == 540
+    assert session.execute(select(func.count()).select_from(AnalyticsSnapshot)).scalar() == 1
+
+
+def test_a_failing_account_keeps_its_mark_and_the_others_sync(session, accounts):
+    provider = FakeProvider(broken={"UC1"})
+    result = sync_accounts(session, accounts, provider)
+    assert result == {"synced": 2, "failed": 1, "videos_updated": 4}
+
+    states = {s.connected_account_id: s for s in session.execute(select(AccountSyncState)).scalars()}
+    assert states[accounts[1]].last_synced_at is None and "quota" in states[accounts[1]].last_error
+    assert all(states[a].last_synced_at is not None for a in (accounts[0], accounts[2]))
+    assert session.get(ChannelRollup, accounts[1]).total_views == 500  # nothing half-written
+
+
+def test_due_accounts_skip_recent_syncs(session, accounts):
+    session.add_all([
+        AccountSyncState(connected_account_id=accounts[0], last_synced_at=datetime.utcnow() - timedelta(hours=1)),
+        AccountSyncState(connected_account_id=accounts[1], last_synced_at=datetime.utcnow() - timedelta(days=2)),
+    ])
+    session.commit()
+    assert list(iter_due_account_ids(session, 1, min_interval_hours=20)) == [[accounts[1]], [accounts[2]]]
+
+
+def test_daily_sync_fans_out_chunks_that_sync_every_due_account(session, engine, accounts, monkeypatch):
+    monkeypatch.setattr(sync_tasks, "SessionLocal", sessionmaker(bind=engine, autoflush=False))
+    monkeypatch.setattr(sync_tasks, "get_provider", lambda: FakeProvider())
+    monkeypatch.setattr(settings, "SYNC_ACCOUNT_BATCH", 2)
+    queued = []
+    monkeypatch.setattr(sync_tasks.sync_account_chunk, "delay", queued.append)
+
+    assert sync_tasks.daily_sync() == {"status": "ok", "chunks": 2, "accounts": 3}
+    assert queued == [accounts[:2], accounts[2:]]
+    for ids in queued:
+        assert sync_tasks.sync_account_chunk(ids)["synced"] == len(ids)
+
+    session.expire_all()
+    assert all(session.get(AccountSyncState, a).last_synced_at is not None for a in accounts)
+    queued.clear()
+    assert sync_tasks.daily_sync()["accounts"] == 0 and queued == []
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import Video
+from app.routers.analytics import _build_videos_page
+
+
+@pytest.fixture
+def video_ids(session, account_id) -> list[int]:
+    """31 videos: published-date ties in threes, every fifth one undated. Ids in expected page order."""
+    start = datetime(2026, 1, 1)
+    videos = [
+        Video(
+            connected_account_id=account_id, external_id=f"v{i}", title=f"Video {i}",
+            published_at=None if i % 5 == 0 else start + timedelta(days=i // 3),
+            view_count=i, like_count=0, comment_count=0,
+        )
+        for i in range(31)
+    ]
+    session.add_all(videos)
+    session.commit()
+    ordered = sorted(videos, key=lambda v: (v.published_at is None, -(v.published_at or start).timestamp(), -v.id))
+    return [v.id for v in ordered]
+
+
+def _walk(run_async, account_id, page_size) -> list[list[int]]:
+    async def walk(db):
+        pages, cursor = [], None
+        while True:
+            page = await _build_videos_page(db, account_id, 1, page_size, cursor)
+            pages.append([item.id for item in page.items])
+            assert page.total == 31
+            if page.next_cursor is None:
+                return pages
+            cursor = page.next_cursor
+    return run_async(walk)
+
+
+@pytest.mark.parametrize("page_size", [1, 4, 7, 25, 31, 50])
+def test_cursor_walk_visits_every_video_once_in_order(run_async, account_id, video_ids, page_size):
+    pages = _walk(run_async, account_id, page_size)
+    assert [i for page in pages for i in page] == video_ids
+    assert all(len(page) == page_size for page in pages[:-1])
+    assert 0 < len(pages[-1]) <= page_size
+
+
+def test_cursor_pages_match_offset_pages(run_async, account_id, video_ids):
+    async def offset_pages(db):
+        return [
+            [item.id for item in (await _build_videos_page(db, account_id, page, 7)).items]
+            for page in range(1, 6)
+        ]
+    assert _walk(run_async, account_id, 7) == run_async(offset_pages)
+
+
+def test_cursor_from_undated_video_continues_among_undated(run_async, account_id, video_ids):
+    async def after_first_undated(db):
+        first_pages = await _build_videos_page(db, account_id, 1, 25)  # ends inside the undated tail
+        rest = await _build_videos_page(db, account_id, 1, 25, first_pages.next_cursor)
+        return [item.id for item in first_pages.items], [item.id for item in rest.items]
+    first, rest = run_async(after_first_undated)
+    assert first + rest == video_ids
+    assert first[-1] in video_ids[-7:]  # the undated ones come last